@@ -0,0 +1,93 @@
+"""
+Compares the JSON backends of servier.utils.json_codec on silver-like data.
+
+A synthetic cross reference snapshot (drug, journal, title, dates, ingestion timestamp) is
+written with `save_file_as_json` and read back with the gold loader, indented and compact,
+with every available backend. The report gives, per backend, the median time of each
+operation and checks that every backend wrote the same bytes.
+
+Usage:
+    python benchmarks/bench_json.py [--rows 200000] [--repeat 3] [--output json.json]
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import pathlib
+import statistics
+import tempfile
+import time
+
+from servier.gold import _load_json
+from servier.utils import json_codec
+from servier.utils.helpers import save_file_as_json
+
+
+def cross_reference_rows(count: int) -> list[dict]:
+    timestamp = datetime.datetime(2024, 3, 1, 8, 30, 15, 250000)
+    return [
+        {
+            "drug": f"DRUG{i % 97}",
+            "journal": f"Journal of clinical study n°{i % 211}",
+            # titles often hold text like "double-blind", "type-2" or "nullable"
+            "title": (
+                f"Effects of drug{i % 97} on type-2 patients, a double-blind trial ({i})"
+            ),
+            "source_file": ("pubmed", "clinical_trials")[i % 2],
+            "mention_date": datetime.date(2020, 1, 1)
+            + datetime.timedelta(days=i % 365),
+            "ingestion_timestamp": timestamp,
+        }
+        for i in range(count)
+    ]
+
+
+def timed(function, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=pathlib.Path, default=None)
+    options = parser.parse_args()
+
+    rows = cross_reference_rows(options.rows)
+    report, digests = {}, {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in json_codec.available_backends():
+            report[backend] = {}
+            with json_codec.use_backend(backend):
+                for layout, indent in (("indented", 4), ("compact", None)):
+                    file = pathlib.Path(tmp) / f"{backend}_{layout}.json"
+                    dump_s = timed(
+                        lambda: save_file_as_json(file, rows, indent), options.repeat
+                    )
+                    load_s = timed(lambda: _load_json(file), options.repeat)
+                    digests.setdefault(layout, set()).add(
+                        hashlib.sha256(file.read_bytes()).hexdigest()
+                    )
+                    report[backend][layout] = {
+                        "dump_ms": round(dump_s * 1000, 1),
+                        "load_ms": round(load_s * 1000, 1),
+                        "megabytes": round(file.stat().st_size / 2**20, 1),
+                    }
+                    print(
+                        f"{backend:8} {layout:9} dump {dump_s * 1000:8.1f} ms"
+                        f" | load {load_s * 1000:8.1f} ms"
+                    )
+    identical = all(len(layout_digests) == 1 for layout_digests in digests.values())
+    print(f"Identical outputs across backends: {identical}")
+    if options.output:
+        options.output.write_text(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Measures the startup cost of each servier-aggregate subcommand.
+
+Every subcommand is run in a fresh interpreter with `python -X importtime` against empty
+data directories (and a small sales database, with duckdb), so that the measure is
+dominated by interpreter startup and imports. The resident `watch` is timed until it
+reports that it is watching, then stopped. The report gives, per subcommand, the median
+wall-clock time, the cumulative import time and the slowest top-level imports. A
+subcommand of the CLI missing from the benchmark is an error.
+
+Usage:
+    python benchmarks/bench_startup.py [--repeat 5] [--output startup.json]
+"""
+
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from servier.cli import cli
+
+LAUNCHER = "import sys; from servier.cli import cli; cli(sys.argv[1:])"
+# resident subcommands, timed until they print this line
+READY_LINES = {"watch": "Watching"}
+
+
+def sales_database(data_dir: pathlib.Path) -> pathlib.Path:
+    """A small sales database, an empty file (refused by the commands) without duckdb."""
+    db_path = data_dir / "sales.duckdb"
+    try:
+        import duckdb
+
+        from duckdb_env_setup import generate
+    except ImportError:
+        db_path.touch()
+        return db_path
+    with duckdb.connect(str(db_path)) as conn:
+        generate(conn, products=10, transactions=1000, clients=10)
+    return db_path
+
+
+def subcommands(data_dir: pathlib.Path) -> dict[str, list[str]]:
+    for zone in ("publications", "drugs", "silver", "gold", "trash"):
+        (data_dir / zone).mkdir(exist_ok=True)
+    landing = [
+        f"--raw-pubclinical-data={data_dir / 'publications'}",
+        f"--raw-drug-data={data_dir / 'drugs'}",
+    ]
+    silver = [f"--silver-zone-path={data_dir / 'silver'}"]
+    silver_gold = [*silver, f"--gold-zone-path={data_dir / 'gold'}"]
+    trash = [f"--trash-zone-path={data_dir / 'trash'}"]
+    db_path = f"--db-path={sales_database(data_dir)}"
+    return {
+        "--help": ["--help"],
+        "main-pipeline": ["main-pipeline", *landing, *silver, *trash],
+        "run-all": ["run-all", *landing, *silver_gold, *trash],
+        "watch": ["watch", *landing, *silver_gold, *trash],
+        "merge-silver": ["merge-silver", *silver],
+        "journal-with-max-drugs": ["journal-with-max-drugs", *silver_gold],
+        "get-drugs-from-journals-that-mention-a-specific-drug": [
+            "get-drugs-from-journals-that-mention-a-specific-drug",
+            "TETRACYCLINE",
+            *silver_gold,
+        ],
+        "gold-build": ["gold-build", *silver_gold],
+        "journal-activity": ["journal-activity", *silver_gold],
+        "drug-neighbourhood": ["drug-neighbourhood", "TETRACYCLINE", *silver_gold],
+        "sql-benchmark": [
+            "sql-benchmark",
+            db_path,
+            "--repeat=1",
+            "--warmup=0",
+            f"--output={data_dir / 'sql_benchmark.json'}",
+        ],
+        "refresh-sales-aggregates": ["refresh-sales-aggregates", db_path],
+    }
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Parses `-X importtime` lines into (module, self_us, cumulative_us) tuples."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        # drop the space after the separator, nested modules keep their indentation
+        imports.append((module[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def run_once(
+    args: list[str], ready_line: str | None = None
+) -> tuple[float, list[tuple[str, int, int]]]:
+    command = [sys.executable, "-X", "importtime", "-c", LAUNCHER, *args]
+    start = time.perf_counter()
+    if ready_line is None:
+        process = subprocess.run(command, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        return elapsed, parse_importtime(process.stderr)
+    # stderr goes to a file: the resident process is not waited for, a full pipe would block it
+    with tempfile.TemporaryFile("w+") as stderr:
+        with subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=stderr, text=True
+        ) as process:
+            for line in process.stdout:
+                if line.startswith(ready_line):
+                    break
+            elapsed = time.perf_counter() - start
+            process.terminate()
+        stderr.seek(0)
+        return elapsed, parse_importtime(stderr.read())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=pathlib.Path, default=None)
+    options = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        commands = subcommands(pathlib.Path(tmp))
+        missing = sorted(set(cli.commands) - set(commands))
+        if missing:
+            raise SystemExit(f"Subcommands missing from the benchmark: {missing}")
+        for name, args in commands.items():
+            runs = [
+                run_once(args, READY_LINES.get(name)) for _ in range(options.repeat)
+            ]
+            imports = runs[-1][1]
+            top_level = [item for item in imports if not item[0].startswith(" ")]
+            report[name] = {
+                "wall_ms_median": round(
+                    statistics.median(r[0] for r in runs) * 1000, 1
+                ),
+                "import_ms": round(sum(item[1] for item in imports) / 1000, 1),
+                "modules_imported": len(imports),
+                "slowest_imports": [
+                    {"module": module, "cumulative_ms": round(cumulative / 1000, 1)}
+                    for module, _, cumulative in sorted(
+                        top_level, key=lambda item: item[2], reverse=True
+                    )[:5]
+                ],
+            }
+            print(
+                f"{name:55} wall {report[name]['wall_ms_median']:7.1f} ms"
+                f" | imports {report[name]['import_ms']:7.1f} ms"
+            )
+    if options.output:
+        options.output.write_text(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+SELECT DATE, VENTES
+FROM DAILY_SALES
+WHERE DATE BETWEEN '2019-01-01' AND '2019-12-31'
+ORDER BY DATE;
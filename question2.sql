@@ -1,7 +1,7 @@
 SELECT
     CLIENT_ID,
-    SUM(CASE WHEN PRODUCTS.PRODUCT_TYPE = 'MEUBLE' THEN TRANSACTIONS.PROD_PRICE * TRANSACTIONS.PROD_PRICE ELSE 0 END) AS VENTES_MEUBLE,
-    SUM(CASE WHEN PRODUCTS.PRODUCT_TYPE = 'DECO' THEN TRANSACTIONS.PROD_PRICE * TRANSACTIONS.PROD_PRICE ELSE 0 END) AS VENTES_DECO
+    SUM(CASE WHEN PRODUCTS.PRODUCT_TYPE = 'MEUBLE' THEN TRANSACTIONS.PROD_PRICE * TRANSACTIONS.PROD_QTY ELSE 0 END) AS VENTES_MEUBLE,
+    SUM(CASE WHEN PRODUCTS.PRODUCT_TYPE = 'DECO' THEN TRANSACTIONS.PROD_PRICE * TRANSACTIONS.PROD_QTY ELSE 0 END) AS VENTES_DECO
 FROM
     TRANSACTIONS
 JOIN
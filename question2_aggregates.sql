@@ -0,0 +1,13 @@
+SELECT
+    CLIENT_ID,
+    SUM(CASE WHEN PRODUCT_TYPE = 'MEUBLE' THEN VENTES ELSE 0 END) AS VENTES_MEUBLE,
+    SUM(CASE WHEN PRODUCT_TYPE = 'DECO' THEN VENTES ELSE 0 END) AS VENTES_DECO
+FROM
+    CLIENT_PRODUCT_TYPE_SALES
+WHERE
+    DATE BETWEEN '2019-01-01' AND '2019-12-31'
+    AND PRODUCT_TYPE IN ('MEUBLE', 'DECO')
+GROUP BY
+    CLIENT_ID
+ORDER BY
+    CLIENT_ID;
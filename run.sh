@@ -99,16 +99,38 @@ function test:unit-tests {
     python -m pytest -vv -s ${@:-"$THIS_DIR/tests/"}
 }
 
+function benchmark:startup {
+    echo "Measuring servier-aggregate startup time per subcommand..."
+    python "$THIS_DIR/benchmarks/bench_startup.py" "$@"
+}
+
+function benchmark:json {
+    echo "Comparing the JSON backends on silver-like data..."
+    python "$THIS_DIR/benchmarks/bench_json.py" "$@"
+}
+
 function servier-aggregate:main-pipeline {
     virtualenv:create
     echo "Running servier-aggregate main pipeline..."
-    servier-aggregate main-pipeline  --raw-pubclinical-data=data/landing_zone/publications_data --raw-drug-data=data/landing_zone/referential_data --silver-zone-path=data/silver_zone --trash-zone-path=data/corrupted_data
+    servier-aggregate main-pipeline  --raw-pubclinical-data=data/landing_zone/publications_data --raw-drug-data=data/landing_zone/referential_data --silver-zone-path=data/silver_zone --trash-zone-path=data/corrupted_data "$@"
+}
+
+function servier-aggregate:watch {
+    virtualenv:create
+    echo "Running servier-aggregate watch..."
+    servier-aggregate watch --raw-pubclinical-data=data/landing_zone/publications_data --raw-drug-data=data/landing_zone/referential_data --silver-zone-path=data/silver_zone --trash-zone-path=data/corrupted_data --gold-zone-path=data/gold_zone "$@"
+}
+
+function servier-aggregate:merge-silver {
+    virtualenv:create
+    echo "Running servier-aggregate merge-silver..."
+    servier-aggregate merge-silver --silver-zone-path=data/silver_zone "$@"
 }
 
 function servier-aggregate:journal-with-max-drugs {
     virtualenv:create
     echo "Running servier-aggregate journal-with-max-drugs pipeline..."
-    servier-aggregate journal-with-max-drugs --silver-zone-path=data/silver_zone --gold-zone-path=data/gold_zone
+    servier-aggregate journal-with-max-drugs --silver-zone-path=data/silver_zone --gold-zone-path=data/gold_zone "$@"
 }
 
 function servier-aggregate:get-drugs-from-journals-that-mention-a-specific-drug {
@@ -117,6 +139,30 @@ function servier-aggregate:get-drugs-from-journals-that-mention-a-specific-drug
     servier-aggregate get-drugs-from-journals-that-mention-a-specific-drug "$@" --silver-zone-path=data/silver_zone --gold-zone-path=data/gold_zone
 }
 
+function servier-aggregate:gold-build {
+    virtualenv:create
+    echo "Running servier-aggregate gold-build pipeline..."
+    servier-aggregate gold-build --silver-zone-path=data/silver_zone --gold-zone-path=data/gold_zone "$@"
+}
+
+function servier-aggregate:run-all {
+    virtualenv:create
+    echo "Running servier-aggregate run-all pipeline..."
+    servier-aggregate run-all --raw-pubclinical-data=data/landing_zone/publications_data --raw-drug-data=data/landing_zone/referential_data --silver-zone-path=data/silver_zone --trash-zone-path=data/corrupted_data --gold-zone-path=data/gold_zone "$@"
+}
+
+function servier-aggregate:journal-activity {
+    virtualenv:create
+    echo "Running servier-aggregate journal-activity pipeline..."
+    servier-aggregate journal-activity --silver-zone-path=data/silver_zone --gold-zone-path=data/gold_zone "$@"
+}
+
+function servier-aggregate:drug-neighbourhood {
+    virtualenv:create
+    echo "Running servier-aggregate drug-neighbourhood pipeline..."
+    servier-aggregate drug-neighbourhood "$@" --silver-zone-path=data/silver_zone --gold-zone-path=data/gold_zone
+}
+
 # Task execution logic
 if [[ $# -eq 0 ]]; then
     echo "No task provided. Use './run.sh help' for available tasks."
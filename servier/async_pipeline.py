@@ -0,0 +1,225 @@
+import asyncio
+import itertools
+import pathlib
+from typing import Iterator
+
+from pydantic import BaseModel
+
+from .config import (
+    COMPRESSION_EXTENSIONS,
+    DRUGS_FIELD_NAMES,
+    DRUGS_FILE_NAMES,
+    PUBTRIALS_FIELD_NAMES,
+    PUBTRIALS_FILE_NAMES,
+)
+from .main import (
+    cross_reference_models,
+    now,
+    validate_rows,
+)
+from .models import (
+    Drug,
+    PubClinical,
+)
+from .utils.helpers import (
+    JsonArrayWriter,
+    list_files_in_folder,
+    read_raw_data,
+)
+from .utils.rejects import RejectSink
+
+# Stages exchange batches of records through queues, None tells the consumer that the stream is over.
+
+
+def _read_and_validate_batch(
+    rows: Iterator[dict],
+    model: type[BaseModel],
+    label: str,
+    batch_size: int,
+    rejects: RejectSink,
+) -> list[BaseModel] | None:
+    batch = list(itertools.islice(rows, batch_size))
+    if not batch:
+        return None
+    return validate_rows(batch, model, label, rejects)[0]
+
+
+async def _validate_stage(
+    files: list[pathlib.Path],
+    field_names: list[str],
+    model: type[BaseModel],
+    label: str,
+    outputs: list[asyncio.Queue],
+    rejects: RejectSink,
+    batch_size: int,
+) -> None:
+    """
+    Reads and validates the raw files batch by batch and fans the valid records out to `outputs`.
+    Rejected rows are streamed to the trash zone by `rejects` from the validation thread.
+    """
+    rows = itertools.chain.from_iterable(
+        read_raw_data(file, field_names) for file in files
+    )
+    while (
+        valid := await asyncio.to_thread(
+            _read_and_validate_batch, rows, model, label, batch_size, rejects
+        )
+    ) is not None:
+        if valid:
+            for queue in outputs:
+                await queue.put(valid)
+    await asyncio.to_thread(rejects.close)
+    for queue in outputs:
+        await queue.put(None)
+
+
+async def _collect_stage(queue: asyncio.Queue, collected: list) -> None:
+    """Drains a queue into a list, used for the (small) drug referential the matcher needs whole."""
+    while (batch := await queue.get()) is not None:
+        collected.extend(batch)
+
+
+async def _match_stage(
+    pubclinical_input: asyncio.Queue,
+    drugs_ready: asyncio.Task,
+    drugs_data: list[Drug],
+    output: asyncio.Queue,
+    rejects: RejectSink,
+) -> None:
+    """Cross-references each publication batch with the drug referential once it is fully loaded."""
+    await drugs_ready
+    while (batch := await pubclinical_input.get()) is not None:
+        cross_reference, _ = await asyncio.to_thread(
+            cross_reference_models, batch, drugs_data, rejects
+        )
+        if cross_reference:
+            await output.put(cross_reference)
+    await asyncio.to_thread(rejects.close)
+    await output.put(None)
+
+
+async def _write_stage(
+    queue: asyncio.Queue, dest_location: pathlib.Path, indent: int | None
+) -> None:
+    """Streams the batches of a queue to a JSON array file in a worker thread."""
+    writer = JsonArrayWriter(dest_location, indent)
+    await asyncio.to_thread(writer.__enter__)
+    while (batch := await queue.get()) is not None:
+        await asyncio.to_thread(
+            writer.write_all, [item.model_dump(exclude_none=True) for item in batch]
+        )
+    await asyncio.to_thread(writer.__exit__, None, None, None)
+
+
+async def run_async_pipeline(
+    raw_pubclinical_data: pathlib.Path,
+    raw_drug_data: pathlib.Path,
+    silver_zone_path: pathlib.Path,
+    trash_zone_path: pathlib.Path,
+    compression: str | None = None,
+    indent: int | None = 4,
+    batch_size: int = 1000,
+    queue_size: int = 8,
+) -> None:
+    """
+    Runs the main pipeline as concurrent stages connected by bounded queues.
+    Readers/validators, the matcher and the writers run concurrently: the publications
+    of a batch are written while the next batch is validated and cross-referenced.
+    Every queue holds at most `queue_size` batches so a slow writer pauses the readers
+    and memory stays flat. The outputs are the same files as `_main_pipeline`, only
+    the order of the cross reference rows may differ.
+    Args:
+        raw_pubclinical_data (pathlib.Path): Path to the raw public clinical trial data.
+        raw_drug_data (pathlib.Path): Path to the raw drug data.
+        silver_zone_path (pathlib.Path): Path to the directory where valid data should be saved.
+        trash_zone_path (pathlib.Path): Path to the directory where error data should be saved.
+        compression (str | None, optional): One of "gzip", "bz2", "xz" to compress the outputs. Defaults to None.
+        indent (int | None, optional): The JSON indentation of the outputs. Defaults to 4.
+        batch_size (int, optional): The number of raw rows validated per batch. Defaults to 1000.
+        queue_size (int, optional): The maximum number of batches waiting in a queue. Defaults to 8.
+    Returns:
+        None
+    """
+    ext = ".json" + COMPRESSION_EXTENSIONS.get(compression, "")
+
+    def new_queue() -> asyncio.Queue:
+        return asyncio.Queue(maxsize=queue_size)
+
+    pubclinical_to_write, pubclinical_to_match = new_queue(), new_queue()
+    drugs_to_write, drugs_to_match = new_queue(), new_queue()
+    cross_reference_to_write = new_queue()
+    drugs_data: list[Drug] = []
+
+    drugs_ready = asyncio.create_task(_collect_stage(drugs_to_match, drugs_data))
+    tasks = [
+        drugs_ready,
+        asyncio.create_task(
+            _validate_stage(
+                list_files_in_folder(raw_pubclinical_data, PUBTRIALS_FILE_NAMES),
+                PUBTRIALS_FIELD_NAMES,
+                PubClinical,
+                "Pubtrials",
+                [pubclinical_to_write, pubclinical_to_match],
+                RejectSink(
+                    trash_zone_path / f"pubclinical_validation_errors_{now}{ext}",
+                    "Pubtrials",
+                    indent,
+                ),
+                batch_size,
+            )
+        ),
+        asyncio.create_task(
+            _validate_stage(
+                list_files_in_folder(raw_drug_data, DRUGS_FILE_NAMES),
+                DRUGS_FIELD_NAMES,
+                Drug,
+                "Drug",
+                [drugs_to_write, drugs_to_match],
+                RejectSink(
+                    trash_zone_path / f"drugs_validation_errors_{now}{ext}",
+                    "Drug",
+                    indent,
+                ),
+                batch_size,
+            )
+        ),
+        asyncio.create_task(
+            _match_stage(
+                pubclinical_to_match,
+                drugs_ready,
+                drugs_data,
+                cross_reference_to_write,
+                RejectSink(
+                    trash_zone_path / f"cross_reference_errors_{now}{ext}",
+                    "Cross Reference",
+                    indent,
+                ),
+            )
+        ),
+        asyncio.create_task(
+            _write_stage(
+                pubclinical_to_write,
+                silver_zone_path / f"pubclinical_data_{now}{ext}",
+                indent,
+            )
+        ),
+        asyncio.create_task(
+            _write_stage(
+                drugs_to_write, silver_zone_path / f"drugs_data_{now}{ext}", indent
+            )
+        ),
+        asyncio.create_task(
+            _write_stage(
+                cross_reference_to_write,
+                silver_zone_path / f"cross_reference_data_{now}{ext}",
+                indent,
+            )
+        ),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # a failing stage would leave its peers blocked on their queues forever
+        for task in tasks:
+            task.cancel()
+        raise
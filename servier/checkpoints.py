@@ -0,0 +1,214 @@
+import datetime
+import json
+import os
+import pathlib
+import shutil
+import threading
+from typing import Iterable
+
+from .config import (
+    CHECKPOINT_RUNS_KEPT,
+    RUN_DATE,
+)
+from .utils.helpers import (
+    save_file_as_json,
+    temporary_path,
+)
+
+# Checkpoints live in a hidden directory of the silver zone, never matched by the
+# `<dataset>_*.json*` patterns of the gold readers.
+CHECKPOINTS_DIR = ".checkpoints"
+# Index of the stages committed by all the runs of a silver zone, by stage key
+CACHE_INDEX = "cache.json"
+
+
+def fingerprint(files: Iterable[pathlib.Path]) -> list[list | None]:
+    """
+    Identifies files cheaply by path, size and modification time, None for a missing file.
+    Used to check that the outputs of a committed stage were not changed since.
+    """
+    fingerprints = []
+    for file in files:
+        if not file.exists():
+            fingerprints.append(None)
+            continue
+        stat = file.stat()
+        fingerprints.append([str(file), stat.st_size, stat.st_mtime_ns])
+    return fingerprints
+
+
+def _is_intact(outputs: list[list | None]) -> bool:
+    return all(
+        output is None or fingerprint([pathlib.Path(output[0])]) == [output]
+        for output in outputs
+    )
+
+
+def _materialize(committed: list[list | None], outputs: list[pathlib.Path]) -> None:
+    """Makes `outputs` hold the committed files, copying them when they have other names."""
+    for output, file in zip(committed, outputs):
+        if output is None:
+            file.unlink(missing_ok=True)
+        elif pathlib.Path(output[0]) != file:
+            file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_location = temporary_path(file)
+            shutil.copyfile(output[0], tmp_location)
+            os.replace(tmp_location, file)
+
+
+def prune_runs(silver_zone_path: pathlib.Path, keep: int) -> list[str]:
+    """
+    Removes the checkpoints of all but the `keep` most recent runs of a silver zone, with
+    the curated files the star layout keeps there, and returns the ids of the removed runs.
+    Their entries of the index are dropped by the next commit, their outputs being gone.
+    """
+    directory = silver_zone_path / CHECKPOINTS_DIR
+    if not directory.exists():
+        return []
+    # run ids are start times, they sort chronologically
+    runs = sorted(path for path in directory.iterdir() if path.is_dir())
+    removed = runs[: max(len(runs) - keep, 0)]
+    for run in removed:
+        shutil.rmtree(run, ignore_errors=True)
+    return [run.name for run in removed]
+
+
+class RunCheckpoints:
+    """
+    Records the stages of main-pipeline runs that are committed, so that a failed run can
+    be resumed, and a new run can reuse the stages whose inputs did not change.
+    The manifest `<silver zone>/.checkpoints/<run id>/run.json` holds the run date (the
+    suffix of the files of the run), the parameters changing the outputs and, per stage,
+    its key (see `servier.dag.stage_key`) and the fingerprint of its outputs. Every commit
+    is also added to the index `<silver zone>/.checkpoints/cache.json`, shared by the runs.
+    A stage is committed once its outputs are written, which `save_file_as_json` does
+    atomically. Stages may be committed concurrently from several threads.
+    Only the checkpoints of the CHECKPOINT_RUNS_KEPT most recent runs are kept, see `prune_runs`.
+    Usage:
+        checkpoints = RunCheckpoints.start(silver_zone_path, {"compression": None})
+        if not checkpoints.is_committed("drugs", key, outputs):
+            ...
+            checkpoints.commit("drugs", key, outputs)
+    """
+
+    def __init__(self, directory: pathlib.Path, manifest: dict) -> None:
+        self.directory = directory
+        self.manifest = manifest
+        self._lock = threading.Lock()
+
+    @property
+    def run_id(self) -> str:
+        return self.manifest["run_id"]
+
+    @property
+    def run_date(self) -> str:
+        return self.manifest["run_date"]
+
+    @classmethod
+    def start(
+        cls, silver_zone_path: pathlib.Path, parameters: dict
+    ) -> "RunCheckpoints":
+        """
+        Starts a new run, its id is the start time of the run. The checkpoints of the runs
+        older than the CHECKPOINT_RUNS_KEPT most recent ones (this one included) are removed.
+        """
+        run_id = datetime.datetime.now().strftime("%Y_%m_%dT%H%M%S%f")
+        directory = silver_zone_path / CHECKPOINTS_DIR / run_id
+        directory.mkdir(parents=True)
+        prune_runs(silver_zone_path, CHECKPOINT_RUNS_KEPT)
+        checkpoints = cls(
+            directory,
+            {
+                "run_id": run_id,
+                "run_date": RUN_DATE,
+                "parameters": parameters,
+                "stages": {},
+            },
+        )
+        checkpoints._save()
+        return checkpoints
+
+    @classmethod
+    def resume(
+        cls, silver_zone_path: pathlib.Path, run_id: str, parameters: dict
+    ) -> "RunCheckpoints":
+        """
+        Reopens the checkpoints of a previous run.
+        Args:
+            silver_zone_path (pathlib.Path): The silver zone of the run.
+            run_id (str): The id of the run, as printed by main-pipeline.
+            parameters (dict): The parameters of the resumed run, they must be the ones of the run.
+        Raises:
+            FileNotFoundError: If the run has no checkpoints in this silver zone.
+            ValueError: If the parameters differ from the ones of the run.
+        """
+        directory = silver_zone_path / CHECKPOINTS_DIR / run_id
+        manifest_file = directory / "run.json"
+        if not manifest_file.exists():
+            raise FileNotFoundError(
+                f"No checkpoints for run {run_id} in {silver_zone_path}"
+            )
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["parameters"] != parameters:
+            raise ValueError(
+                f"Run {run_id} was started with {manifest['parameters']}, not {parameters}"
+            )
+        return cls(directory, manifest)
+
+    def is_committed(
+        self, stage: str, key: str, outputs: Iterable[pathlib.Path]
+    ) -> bool:
+        """
+        Whether the stage was committed with this key, by this run or by a previous run, and
+        its outputs were not changed since. Outputs committed by a previous run under other
+        names (e.g. another run date) are copied to `outputs`, and the stage is committed to
+        this run.
+        """
+        outputs = list(outputs)
+        with self._lock:
+            candidates = [
+                self.manifest["stages"].get(stage, {}),
+                self._load_index().get(key, {}),
+            ]
+            for committed in candidates:
+                if committed.get("key", key) != key or "outputs" not in committed:
+                    continue
+                if len(committed["outputs"]) == len(outputs) and _is_intact(
+                    committed["outputs"]
+                ):
+                    _materialize(committed["outputs"], outputs)
+                    self._commit(stage, key, outputs)
+                    return True
+        return False
+
+    def commit(self, stage: str, key: str, outputs: Iterable[pathlib.Path]) -> None:
+        """Records that the stage with this key wrote its outputs."""
+        with self._lock:
+            self._commit(stage, key, list(outputs))
+
+    def _commit(self, stage: str, key: str, outputs: list[pathlib.Path]) -> None:
+        committed = {"key": key, "outputs": fingerprint(outputs)}
+        self.manifest["stages"][stage] = {
+            **committed,
+            "committed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        self._save()
+        # entries whose outputs were overwritten or removed can never be reused
+        index = {
+            other_key: entry
+            for other_key, entry in self._load_index().items()
+            if _is_intact(entry["outputs"])
+        }
+        index[key] = committed
+        save_file_as_json(self.directory.parent / CACHE_INDEX, index)
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.directory.parent / CACHE_INDEX, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save(self) -> None:
+        save_file_as_json(self.directory / "run.json", self.manifest)
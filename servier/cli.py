@@ -3,18 +3,22 @@ import pathlib
 import click
 
 from .config import (
+    COMPRESSION_EXTENSIONS,
     CORRUPTED_DATA_ZONE,
     DISPLAY_PATHS,
     DRUGS,
     GOLD_ZONE,
+    GRAPH_EDGE_TYPES,
+    HLL_MAX_PRECISION,
+    HLL_MIN_PRECISION,
+    HLL_PRECISION,
     PUBLICATIONS,
     SILVER_ZONE,
+    SQL_QUERIES,
 )
-from .main import (
-    _get_drugs_from_journals_that_mention_a_specific_drug,
-    _journal_with_max_drugs,
-    _main_pipeline,
-)
+
+# Subcommands import their modules lazily: `servier-aggregate --help` or a gold lookup
+# should not pay for pydantic, dateutil or asyncio. See benchmarks/bench_startup.py.
 
 
 @click.group()
@@ -51,17 +55,414 @@ def cli():
     show_default=f"'{DISPLAY_PATHS['CORRUPTED_DATA_ZONE']}'",
     help="Path to the trash zone for corrupted data.",
 )
+@click.option(
+    "--compression",
+    type=click.Choice(list(COMPRESSION_EXTENSIONS)),
+    default=None,
+    help="Compress the silver and trash outputs with the given codec.",
+)
+@click.option(
+    "--compact/--pretty",
+    default=False,
+    show_default=True,
+    help="Write compact JSON instead of indented JSON.",
+)
+@click.option(
+    "--runner",
+    type=click.Choice(["sync", "async"]),
+    default="sync",
+    show_default=True,
+    help="Run the stages sequentially or as concurrent asyncio stages overlapping I/O and validation.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of processes ingesting the landing files (or shards) in parallel (sync runner).",
+)
+@click.option(
+    "--silver-layout",
+    type=click.Choice(["flat", "star"]),
+    default="flat",
+    show_default=True,
+    help="Write the denormalized cross reference, or publication/drug dimensions and a narrow mention fact (sync runner).",
+)
+@click.option(
+    "--resume",
+    metavar="RUN_ID",
+    default=None,
+    help="Resume a failed run, skipping the stages it already committed (sync runner).",
+)
+@click.option(
+    "--validation-cache",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="SQLite file caching the validation of raw rows across runs, only new or changed rows are validated.",
+)
+@click.option(
+    "--fuzzy-distance",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Also match drug names with up to this many typos in titles (one per 4 characters at most), 0 for exact matching (sync runner).",
+)
+@click.option(
+    "--shard-index",
+    type=click.IntRange(min=0),
+    default=None,
+    help="Only process the publications of this shard, with --shard-count (sync runner).",
+)
+@click.option(
+    "--shard-count",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of shards the publications are split into by a stable hash, see merge-silver.",
+)
 def main_pipeline(
-    raw_pubclinical_data, raw_drug_data, silver_zone_path, trash_zone_path
+    raw_pubclinical_data,
+    raw_drug_data,
+    silver_zone_path,
+    trash_zone_path,
+    compression,
+    compact,
+    runner,
+    workers,
+    silver_layout,
+    resume,
+    validation_cache,
+    fuzzy_distance,
+    shard_index,
+    shard_count,
 ) -> None:
     """Main pipeline to process data."""
+    if runner == "async" and silver_layout == "star":
+        raise click.UsageError("--silver-layout=star requires --runner=sync")
+    if runner == "async" and resume:
+        raise click.UsageError("--resume requires --runner=sync")
+    if runner == "async" and validation_cache:
+        raise click.UsageError("--validation-cache requires --runner=sync")
+    if runner == "async" and fuzzy_distance:
+        raise click.UsageError("--fuzzy-distance requires --runner=sync")
+    if runner == "async" and workers > 1:
+        raise click.UsageError("--workers requires --runner=sync")
+    if (shard_index is None) != (shard_count is None):
+        raise click.UsageError("--shard-index and --shard-count go together")
+    shard = None
+    if shard_count is not None:
+        if shard_index >= shard_count:
+            raise click.UsageError("--shard-index must be lower than --shard-count")
+        if runner == "async":
+            raise click.UsageError("--shard-index requires --runner=sync")
+        shard = (shard_index, shard_count)
     click.echo(f"Processing pubclinical data from {raw_pubclinical_data}")
     click.echo(f"Processing drug data from {raw_drug_data}")
     click.echo(f"Storing results in {silver_zone_path}")
 
-    _main_pipeline(
-        raw_pubclinical_data, raw_drug_data, silver_zone_path, trash_zone_path
+    if runner == "async":
+        import asyncio
+
+        from .async_pipeline import run_async_pipeline
+
+        asyncio.run(
+            run_async_pipeline(
+                raw_pubclinical_data,
+                raw_drug_data,
+                silver_zone_path,
+                trash_zone_path,
+                compression=compression,
+                indent=None if compact else 4,
+            )
+        )
+        return
+    from .main import _main_pipeline
+
+    if resume:
+        from .checkpoints import RunCheckpoints
+
+        try:
+            RunCheckpoints.resume(
+                silver_zone_path,
+                resume,
+                {
+                    "compression": compression,
+                    "indent": None if compact else 4,
+                    "layout": silver_layout,
+                    "fuzzy_distance": fuzzy_distance,
+                    "shard": list(shard) if shard else None,
+                },
+            )
+        except (FileNotFoundError, ValueError) as e:
+            raise click.ClickException(str(e))
+    run_id = _main_pipeline(
+        raw_pubclinical_data,
+        raw_drug_data,
+        silver_zone_path,
+        trash_zone_path,
+        compression=compression,
+        indent=None if compact else 4,
+        workers=workers,
+        layout=silver_layout,
+        resume=resume,
+        validation_cache=validation_cache,
+        fuzzy_distance=fuzzy_distance,
+        shard=shard,
+    )
+    click.echo(f"Run {run_id} completed")
+
+
+@click.command()
+@click.option(
+    "--raw-pubclinical-data",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=PUBLICATIONS,
+    show_default=f"'{DISPLAY_PATHS['PUBLICATIONS']}'",
+    help="Path to the raw pubclinical data.",
+)
+@click.option(
+    "--raw-drug-data",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=DRUGS,
+    show_default=f"'{DISPLAY_PATHS['DRUGS']}'",
+    help="Path to the raw drug data.",
+)
+@click.option(
+    "--silver-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=SILVER_ZONE,
+    show_default=f"'{DISPLAY_PATHS['SILVER_ZONE']}'",
+    help="Path to the silver zone.",
+)
+@click.option(
+    "--trash-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=CORRUPTED_DATA_ZONE,
+    show_default=f"'{DISPLAY_PATHS['CORRUPTED_DATA_ZONE']}'",
+    help="Path to the trash zone for corrupted data.",
+)
+@click.option(
+    "--gold-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=GOLD_ZONE,
+    show_default=f"'{DISPLAY_PATHS['GOLD_ZONE']}'",
+    help="Path to the gold zone.",
+)
+@click.option(
+    "--drug",
+    "drug_names",
+    multiple=True,
+    help="Also build the drugs from journals that mention this drug, repeat the option for each drug.",
+)
+@click.option(
+    "--compression",
+    type=click.Choice(list(COMPRESSION_EXTENSIONS)),
+    default=None,
+    help="Compress the silver and trash outputs with the given codec.",
+)
+@click.option(
+    "--compact/--pretty",
+    default=False,
+    show_default=True,
+    help="Write compact JSON instead of indented JSON.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of processes ingesting the landing files in parallel.",
+)
+@click.option(
+    "--silver-layout",
+    type=click.Choice(["flat", "star"]),
+    default="flat",
+    show_default=True,
+    help="Write the denormalized cross reference, or publication/drug dimensions and a narrow mention fact.",
+)
+@click.option(
+    "--validation-cache",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="SQLite file caching the validation of raw rows across runs, only new or changed rows are validated.",
+)
+@click.option(
+    "--fuzzy-distance",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+    help="Also match drug names with up to this many typos in titles (one per 4 characters at most), 0 for exact matching.",
+)
+def run_all(
+    raw_pubclinical_data,
+    raw_drug_data,
+    silver_zone_path,
+    trash_zone_path,
+    gold_zone_path,
+    drug_names,
+    compression,
+    compact,
+    workers,
+    silver_layout,
+    validation_cache,
+    fuzzy_distance,
+) -> None:
+    """Main pipeline then gold-build, computing the gold outputs from the cross reference in memory."""
+    from .run_all import run_all as _run_all
+
+    results = _run_all(
+        raw_pubclinical_data,
+        raw_drug_data,
+        silver_zone_path,
+        trash_zone_path,
+        gold_zone_path,
+        drug_names,
+        compression=compression,
+        indent=None if compact else 4,
+        workers=workers,
+        layout=silver_layout,
+        validation_cache=validation_cache,
+        fuzzy_distance=fuzzy_distance,
     )
+    for file_name in results or ():
+        click.echo(gold_zone_path / file_name)
+
+
+@click.command()
+@click.option(
+    "--raw-pubclinical-data",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=PUBLICATIONS,
+    show_default=f"'{DISPLAY_PATHS['PUBLICATIONS']}'",
+    help="Path to the raw pubclinical data.",
+)
+@click.option(
+    "--raw-drug-data",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=DRUGS,
+    show_default=f"'{DISPLAY_PATHS['DRUGS']}'",
+    help="Path to the raw drug data.",
+)
+@click.option(
+    "--silver-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=SILVER_ZONE,
+    show_default=f"'{DISPLAY_PATHS['SILVER_ZONE']}'",
+    help="Path to the silver zone.",
+)
+@click.option(
+    "--trash-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=CORRUPTED_DATA_ZONE,
+    show_default=f"'{DISPLAY_PATHS['CORRUPTED_DATA_ZONE']}'",
+    help="Path to the trash zone for corrupted data.",
+)
+@click.option(
+    "--gold-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=GOLD_ZONE,
+    show_default=f"'{DISPLAY_PATHS['GOLD_ZONE']}'",
+    help="Path to the gold zone.",
+)
+@click.option(
+    "--drug",
+    "gold_drugs",
+    multiple=True,
+    help="Also refresh the drugs from journals that mention this drug, repeat the option for each drug.",
+)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0.1),
+    default=2.0,
+    show_default=True,
+    help="Seconds between two polls of the landing zones.",
+)
+@click.option(
+    "--debounce",
+    type=click.FloatRange(min=0),
+    default=2.0,
+    show_default=True,
+    help="Seconds a landing file must stay unchanged before it is processed.",
+)
+@click.option(
+    "--compression",
+    type=click.Choice(list(COMPRESSION_EXTENSIONS)),
+    default=None,
+    help="Compress the silver and trash outputs with the given codec.",
+)
+@click.option(
+    "--compact/--pretty",
+    default=False,
+    show_default=True,
+    help="Write compact JSON instead of indented JSON.",
+)
+def watch(
+    raw_pubclinical_data,
+    raw_drug_data,
+    silver_zone_path,
+    trash_zone_path,
+    gold_zone_path,
+    gold_drugs,
+    interval,
+    debounce,
+    compression,
+    compact,
+) -> None:
+    """Stay resident, ingest new landing files as they arrive and refresh silver and gold."""
+    from .watch import LandingZoneWatcher
+
+    watcher = LandingZoneWatcher(
+        raw_pubclinical_data,
+        raw_drug_data,
+        silver_zone_path,
+        trash_zone_path,
+        gold_zone_path,
+        gold_drugs,
+        debounce,
+        compression,
+        None if compact else 4,
+    )
+    click.echo(
+        f"Watching {raw_pubclinical_data} and {raw_drug_data} every {interval}s, Ctrl+C to stop"
+    )
+    try:
+        watcher.run(interval)
+    except KeyboardInterrupt:
+        click.echo("Stopped")
+
+
+@click.command()
+@click.option(
+    "--silver-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=SILVER_ZONE,
+    show_default=f"'{DISPLAY_PATHS['SILVER_ZONE']}'",
+    help="Path to the silver zone the shards were written to.",
+)
+@click.option(
+    "--run-date",
+    default=None,
+    metavar="YYYY_MM_DD",
+    help="The run date of the shards to merge. Defaults to the latest one.",
+)
+@click.option(
+    "--compact/--pretty",
+    default=False,
+    show_default=True,
+    help="Write compact JSON instead of indented JSON.",
+)
+def merge_silver(silver_zone_path: pathlib.Path, run_date, compact) -> None:
+    """Merge the outputs of a sharded main-pipeline run into a single silver snapshot."""
+    from .shards import merge_silver as _merge_silver
+
+    try:
+        entry = _merge_silver(silver_zone_path, run_date, None if compact else 4)
+    except (FileNotFoundError, ValueError) as e:
+        raise click.ClickException(str(e))
+    for dataset in entry["datasets"].values():
+        click.echo(
+            f"{dataset['file']}: {len(dataset['shards'])} shards, {dataset['rows']:,} rows,"
+            f" {dataset['duplicates']:,} duplicates dropped"
+        )
 
 
 @click.command()
@@ -79,10 +480,51 @@ def main_pipeline(
     show_default=f"'{DISPLAY_PATHS['GOLD_ZONE']}'",
     help="Path to the gold zone.",
 )
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Recompute the result even if the snapshot and the arguments did not change since the last call.",
+)
+@click.option(
+    "--approximate",
+    is_flag=True,
+    default=False,
+    help="Estimate the distinct drugs of each journal with HyperLogLog sketches.",
+)
+@click.option(
+    "--precision",
+    type=click.IntRange(min=HLL_MIN_PRECISION, max=HLL_MAX_PRECISION),
+    default=HLL_PRECISION,
+    show_default=True,
+    help="Sketches of 2**precision registers, with a 1.04 / sqrt(2**precision) standard error (--approximate).",
+)
+@click.option(
+    "--from-shards",
+    is_flag=True,
+    default=False,
+    help="Sketch the shards of the latest sharded run and merge the sketches, without merge-silver (--approximate).",
+)
 def journal_with_max_drugs(
-    silver_zone_path: pathlib.Path, gold_zone_path: pathlib.Path
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    no_cache: bool,
+    approximate: bool,
+    precision: int,
+    from_shards: bool,
 ) -> None:
-    _journal_with_max_drugs(silver_zone_path, gold_zone_path)
+    if from_shards and not approximate:
+        raise click.UsageError("--from-shards requires --approximate")
+    from .gold import _journal_with_max_drugs
+
+    _journal_with_max_drugs(
+        silver_zone_path,
+        gold_zone_path,
+        use_cache=not no_cache,
+        approximate=approximate,
+        precision=precision,
+        from_shards=from_shards,
+    )
 
 
 @click.command()
@@ -101,14 +543,395 @@ def journal_with_max_drugs(
     show_default=f"'{DISPLAY_PATHS['GOLD_ZONE']}'",
     help="Path to the gold zone.",
 )
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Recompute the result even if the snapshot and the arguments did not change since the last call.",
+)
 def get_drugs_from_journals_that_mention_a_specific_drug(
-    silver_zone_path: pathlib.Path, gold_zone_path: pathlib.Path, drug_name: str
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    drug_name: str,
+    no_cache: bool,
 ) -> None:
+    from .gold import _get_drugs_from_journals_that_mention_a_specific_drug
+
     _get_drugs_from_journals_that_mention_a_specific_drug(
-        silver_zone_path, gold_zone_path, drug_name
+        silver_zone_path, gold_zone_path, drug_name, use_cache=not no_cache
+    )
+
+
+@click.command()
+@click.option(
+    "--silver-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=SILVER_ZONE,
+    show_default=f"'{DISPLAY_PATHS['SILVER_ZONE']}'",
+    help="Path to the silver zone.",
+)
+@click.option(
+    "--gold-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=GOLD_ZONE,
+    show_default=f"'{DISPLAY_PATHS['GOLD_ZONE']}'",
+    help="Path to the gold zone.",
+)
+@click.option(
+    "--drug",
+    "drug_names",
+    multiple=True,
+    help="Also build the drugs from journals that mention this drug, repeat the option for each drug.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Recompute the results even if the snapshot and the arguments did not change since the last call.",
+)
+@click.option(
+    "--journal-activity",
+    is_flag=True,
+    default=False,
+    help="Also build the outputs of journal-activity.",
+)
+@click.option(
+    "--days",
+    type=click.IntRange(min=1),
+    default=30,
+    show_default=True,
+    help="Length of the rolling window of the top journals, in days (--journal-activity).",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Number of journals of the rolling window (--journal-activity).",
+)
+@click.option(
+    "--as-of",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Last day of the rolling window (--journal-activity).  [default: today]",
+)
+@click.option(
+    "--neighbourhood",
+    "neighbourhoods",
+    multiple=True,
+    help="Also build the drug-neighbourhood of this drug, repeat the option for each drug.",
+)
+@click.option(
+    "--hops",
+    type=click.IntRange(min=1),
+    default=2,
+    show_default=True,
+    help="Maximum number of edges from the drug (--neighbourhood).",
+)
+@click.option(
+    "--approximate",
+    is_flag=True,
+    default=False,
+    help="Also build the output of journal-with-max-drugs --approximate.",
+)
+@click.option(
+    "--precision",
+    type=click.IntRange(min=HLL_MIN_PRECISION, max=HLL_MAX_PRECISION),
+    default=HLL_PRECISION,
+    show_default=True,
+    help="Sketches of 2**precision registers, with a 1.04 / sqrt(2**precision) standard error (--approximate).",
+)
+def gold_build(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    drug_names: tuple[str, ...],
+    no_cache: bool,
+    journal_activity: bool,
+    days: int,
+    top: int,
+    as_of,
+    neighbourhoods: tuple[str, ...],
+    hops: int,
+    approximate: bool,
+    precision: int,
+) -> None:
+    if neighbourhoods:
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            raise click.ClickException(
+                "--neighbourhood requires numpy: pip install servier[columnar]"
+            )
+    from .gold import _gold_build
+
+    results = _gold_build(
+        silver_zone_path,
+        gold_zone_path,
+        drug_names,
+        use_cache=not no_cache,
+        journal_activity=journal_activity,
+        days=days,
+        top=top,
+        as_of=as_of.date() if as_of else None,
+        neighbourhoods=neighbourhoods,
+        hops=hops,
+        approximate=approximate,
+        precision=precision,
+    )
+    for file_name in results or ():
+        click.echo(gold_zone_path / file_name)
+
+
+@click.command()
+@click.option(
+    "--silver-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=SILVER_ZONE,
+    show_default=f"'{DISPLAY_PATHS['SILVER_ZONE']}'",
+    help="Path to the silver zone.",
+)
+@click.option(
+    "--gold-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=GOLD_ZONE,
+    show_default=f"'{DISPLAY_PATHS['GOLD_ZONE']}'",
+    help="Path to the gold zone.",
+)
+@click.option(
+    "--days",
+    type=click.IntRange(min=1),
+    default=30,
+    show_default=True,
+    help="Length of the rolling window of the top journals, in days.",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Number of journals of the rolling window.",
+)
+@click.option(
+    "--as-of",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Last day of the rolling window.  [default: today]",
+)
+@click.option(
+    "--rebuild",
+    is_flag=True,
+    default=False,
+    help="Drop the aggregates and fold the latest snapshot again, e.g. after drugs were removed from the referential.",
+)
+def journal_activity(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    days: int,
+    top: int,
+    as_of,
+    rebuild: bool,
+) -> None:
+    """Distinct drugs per journal and month, and the top journals of the last days."""
+    from .gold import _journal_activity
+
+    _journal_activity(
+        silver_zone_path,
+        gold_zone_path,
+        days,
+        top,
+        as_of.date() if as_of else None,
+        rebuild,
     )
 
 
+@click.command()
+@click.argument("drug_name", type=str)
+@click.option(
+    "--silver-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=SILVER_ZONE,
+    show_default=f"'{DISPLAY_PATHS['SILVER_ZONE']}'",
+    help="Path to the silver zone.",
+)
+@click.option(
+    "--gold-zone-path",
+    type=click.Path(exists=True, file_okay=False, path_type=pathlib.Path),
+    default=GOLD_ZONE,
+    show_default=f"'{DISPLAY_PATHS['GOLD_ZONE']}'",
+    help="Path to the gold zone.",
+)
+@click.option(
+    "--hops",
+    type=click.IntRange(min=1),
+    default=2,
+    show_default=True,
+    help="Maximum number of edges from the drug.",
+)
+@click.option(
+    "--edge-type",
+    "edge_types",
+    type=click.Choice(list(GRAPH_EDGE_TYPES)),
+    multiple=True,
+    help="Edge type to traverse, repeat the option for each type.  [default: all]",
+)
+@click.option(
+    "--source-file",
+    type=str,
+    default=None,
+    help="Only traverse the mentions of this source, e.g. pubmed.",
+)
+@click.option(
+    "--start-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Only traverse the mentions from this day.",
+)
+@click.option(
+    "--end-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Only traverse the mentions until this day.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Compile the graph again even if the snapshot did not change since the last call.",
+)
+def drug_neighbourhood(
+    drug_name: str,
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    hops: int,
+    edge_types,
+    source_file,
+    start_date,
+    end_date,
+    no_cache: bool,
+) -> None:
+    """Drugs, journals and publications within a few hops of a drug in the cross reference graph."""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        raise click.ClickException(
+            "drug-neighbourhood requires numpy: pip install servier[columnar]"
+        )
+    from .gold import _drug_neighbourhood
+
+    _drug_neighbourhood(
+        silver_zone_path,
+        gold_zone_path,
+        drug_name,
+        hops,
+        list(edge_types) or None,
+        source_file,
+        start_date.date() if start_date else None,
+        end_date.date() if end_date else None,
+        use_cache=not no_cache,
+    )
+
+
+@click.command()
+@click.option(
+    "--db-path",
+    "db_paths",
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+    multiple=True,
+    required=True,
+    help="DuckDB database to benchmark, repeat the option for each scale.",
+)
+@click.option(
+    "--query",
+    "queries",
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+    multiple=True,
+    default=SQL_QUERIES,
+    show_default="'question1.sql', 'question2.sql'",
+    help="SQL file to benchmark, repeat the option for each query.",
+)
+@click.option(
+    "--start-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default="2019-01-01",
+    show_default=True,
+)
+@click.option(
+    "--end-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default="2019-12-31",
+    show_default=True,
+)
+@click.option("--repeat", type=click.IntRange(min=1), default=5, show_default=True)
+@click.option("--warmup", type=click.IntRange(min=0), default=1, show_default=True)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    default="sql_benchmark.json",
+    show_default=True,
+    help="The JSON report, profiles are saved in a '<output>_profiles' directory next to it.",
+)
+def sql_benchmark(
+    db_paths, queries, start_date, end_date, repeat, warmup, output
+) -> None:
+    """Benchmark the sales SQL queries against DuckDB databases of several scales."""
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        raise click.ClickException("sql-benchmark requires duckdb: pip install duckdb")
+    import json
+
+    from .sql_benchmark import run_sql_benchmark
+
+    report = run_sql_benchmark(
+        list(db_paths),
+        list(queries),
+        start_date.date(),
+        end_date.date(),
+        output.with_name(f"{output.stem}_profiles"),
+        repeat,
+        warmup,
+    )
+    output.write_text(json.dumps(report, indent=4))
+    for result in report["results"]:
+        click.echo(
+            f"{result['scale']:>20} {result['query']:>12}"
+            f" p50 {result['latency_ms']['p50']:9.2f} ms"
+            f" p90 {result['latency_ms']['p90']:9.2f} ms"
+            f" rows {result['rows_returned']}"
+        )
+    click.echo(f"Report saved to {output}")
+
+
+@click.command()
+@click.option(
+    "--db-path",
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+    required=True,
+    help="The DuckDB sales database.",
+)
+def refresh_sales_aggregates(db_path: pathlib.Path) -> None:
+    """Fold newly inserted transactions into the daily and client x product type sales aggregates."""
+    try:
+        import duckdb
+    except ImportError:
+        raise click.ClickException(
+            "refresh-sales-aggregates requires duckdb: pip install duckdb"
+        )
+    from .sales_aggregates import refresh_aggregates
+
+    with duckdb.connect(str(db_path)) as conn:
+        count = refresh_aggregates(conn)
+    click.echo(f"{count:,} new transactions folded into the sales aggregates")
+
+
 cli.add_command(main_pipeline)
+cli.add_command(run_all)
+cli.add_command(watch)
+cli.add_command(merge_silver)
 cli.add_command(journal_with_max_drugs)
 cli.add_command(get_drugs_from_journals_that_mention_a_specific_drug)
+cli.add_command(gold_build)
+cli.add_command(journal_activity)
+cli.add_command(drug_neighbourhood)
+cli.add_command(sql_benchmark)
+cli.add_command(refresh_sales_aggregates)
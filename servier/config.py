@@ -1,3 +1,4 @@
+import datetime
 import pathlib
 
 ROOT_DIR = pathlib.Path(__file__).parents[1]
@@ -8,10 +9,54 @@ CORRUPTED_DATA_ZONE = ROOT_DIR / "data" / "corrupted_data"
 PUBLICATIONS = LANDING_ZONE / "publications_data"
 DRUGS = LANDING_ZONE / "referential_data"
 PUBTRIALS_FILE_NAMES = ["clinical_trials.csv", "pubmed.csv", "pubmed.json"]
-SUPPORTED_EXTENSIONS = [".csv", ".json"]
+# sharded deliveries, e.g. pubmed_part-00001.json, belong to the source of pubmed.json
+SHARD_SUFFIX_PATTERN = r"_part-(?P<shard>\d+)$"
+# Parquet landing files are read by DuckDB in batches of rows
+PARQUET_BATCH_ROWS = 65_536
+# stdlib codecs, keyed by the name accepted on the CLI
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
 DRUGS_FILE_NAMES = ["drugs.csv"]
+DRUGS_FIELD_NAMES = ["atccode", "drug"]
+# uncompressed CSV files above this size are parsed in parallel chunks
+CSV_PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+CSV_CHUNK_SIZE = 16 * 1024 * 1024
+# checkpoints of the most recent main-pipeline runs kept in the silver zone, the ones of older
+# runs are removed when a run starts
+CHECKPOINT_RUNS_KEPT = 20
+# entries of the validation cache (--validation-cache), least recently used ones are evicted beyond
+VALIDATION_CACHE_MAX_ENTRIES = 5_000_000
+# cache of the gold results in the gold zone (see --no-cache), least recently used ones are evicted beyond
+GOLD_CACHE_FILE = ".gold_cache.sqlite"
+GOLD_CACHE_MAX_ENTRIES = 1_000
+# time-bucketed aggregates of the journal-activity command, in the gold zone
+JOURNAL_BUCKETS_FILE = ".journal_buckets.sqlite"
+# default precision of the HyperLogLog sketches of journal-with-max-drugs --approximate:
+# 2**12 registers per journal, a 1.6% standard error on the distinct drug counts
+HLL_PRECISION = 12
+HLL_MIN_PRECISION, HLL_MAX_PRECISION = 4, 18
+# compiled graph of the latest snapshot, in the gold zone
+GRAPH_FILE = ".cross_reference_graph.npz"
+# columnar store of the latest snapshot, in the gold zone
+STORE_FILE = ".cross_reference_store.npz"
+# edge types of the graph -> (source node type, target node type), traversed both ways
+GRAPH_EDGE_TYPES = {
+    "mentioned_in": ("drug", "journal"),
+    "mentions": ("publication", "drug"),
+    "published_in": ("publication", "journal"),
+}
 PUBTRIALS_FIELD_NAMES = ["id", "title", "date", "journal"]
+SQL_QUERIES = [ROOT_DIR / "question1.sql", ROOT_DIR / "question2.sql"]
 HEX_PATTERN = r"(\\x[0-9a-fA-F]{2})+"
+# outputs of a sharded main-pipeline run (--shard-index/--shard-count), in a subdirectory of
+# the silver zone until merge-silver combines them
+SHARDS_DIR = "shards"
+SHARD_FILE_SUFFIX = "_shard-{index:05d}-of-{count:05d}"
+SHARD_FILE_PATTERN = (
+    r"(?P<dataset>\w+?)_(?P<run_date>\d{4}_\d{2}_\d{2})"
+    r"_shard-(?P<index>\d+)-of-(?P<count>\d+)(?P<ext>\.json(\.\w+)?)"
+)
+# suffix of the files produced by this run
+RUN_DATE = datetime.datetime.now().strftime("%Y_%m_%d")
 
 # Custom paths for display in CLI help
 DISPLAY_PATHS = {
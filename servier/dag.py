@@ -0,0 +1,167 @@
+import functools
+import hashlib
+import json
+import logging
+import pathlib
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    NamedTuple,
+)
+
+from .checkpoints import RunCheckpoints
+
+PACKAGE_DIR = pathlib.Path(__file__).parent
+
+
+class Stage(NamedTuple):
+    """
+    A step of the pipeline.
+    - inputs: the files the stage reads. A stage depends on the stages producing its inputs.
+    - outputs: the files the stage writes, some may not be created (e.g. an empty trash file).
+    - run: computes the stage, `run(upstream)` where `upstream(name)` returns the result of
+      another stage, writes the outputs and returns the result.
+    - load: rebuilds the result from the outputs, when the stage is skipped.
+    """
+
+    name: str
+    inputs: list[pathlib.Path]
+    outputs: list[pathlib.Path]
+    run: Callable[[Callable[[str], Any]], Any]
+    load: Callable[[], Any]
+
+
+@functools.cache
+def code_version() -> str:
+    """A hash of the source code of the package, any change invalidates the cached stages."""
+    digest = hashlib.sha256()
+    for file in sorted(PACKAGE_DIR.rglob("*.py")):
+        digest.update(file.relative_to(PACKAGE_DIR).as_posix().encode("utf-8"))
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def file_digest(file: pathlib.Path) -> str:
+    """The blake2b digest of the content of a file, read by chunks of 1 MiB."""
+    digest = hashlib.blake2b()
+    with open(file, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dependencies(stages: Iterable[Stage]) -> dict[str, set[str]]:
+    """
+    Returns the stages each stage depends on, i.e. the producers of its inputs.
+    Raises:
+        ValueError: If two stages have the same name or write the same file.
+    """
+    stages = list(stages)
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(
+                    f"{output} is written by both {producers[output]} and {stage.name}"
+                )
+            producers[output] = stage.name
+    if len({stage.name for stage in stages}) != len(stages):
+        raise ValueError("Stage names must be unique")
+    return {
+        stage.name: {producers[file] for file in stage.inputs if file in producers}
+        for stage in stages
+    }
+
+
+def stage_key(
+    stage: Stage,
+    upstream_keys: Iterable[str],
+    parameters: dict,
+    produced: set[pathlib.Path] = frozenset(),
+) -> str:
+    """
+    The cache key of a stage: its name, the code version, the parameters, the name and
+    content of the files it reads from outside the pipeline and the keys of the stages it
+    depends on. The files in `produced`, written by other stages, are identified by the
+    key of their producer rather than hashed again.
+    """
+    payload = {
+        "stage": stage.name,
+        "code_version": code_version(),
+        "parameters": parameters,
+        "upstream": sorted(upstream_keys),
+        "inputs": [
+            [file.name, file_digest(file)]
+            for file in stage.inputs
+            if file not in produced
+        ],
+    }
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def run_stages(
+    stages: list[Stage],
+    checkpoints: RunCheckpoints,
+    max_workers: int | None = None,
+) -> dict[str, str]:
+    """
+    Runs the stages in dependency order, independent stages concurrently in threads.
+    A stage whose key is committed to the checkpoints, by this run or by any previous run
+    (see `RunCheckpoints.is_committed`), is skipped; its result is only loaded from its
+    outputs if a stage that has to run needs it.
+    Args:
+        stages (list[Stage]): The stages of the pipeline.
+        checkpoints (RunCheckpoints): The checkpoints of the run, its parameters are part of the keys.
+        max_workers (int | None, optional): The number of stages run at the same time. Defaults to all.
+    Returns:
+        dict[str, str]: The cache key of each stage.
+    Raises:
+        ValueError: If the stages have a dependency cycle.
+    """
+    depends_on = dependencies(stages)
+    produced = {output for stage in stages for output in stage.outputs}
+    keys: dict[str, str] = {}
+    results: dict[str, Callable[[], Any]] = {}
+
+    def upstream(name: str) -> Any:
+        return results[name]()
+
+    def execute(stage: Stage) -> tuple[str, Callable[[], Any]]:
+        key = stage_key(
+            stage,
+            [keys[name] for name in depends_on[stage.name]],
+            checkpoints.manifest["parameters"],
+            produced,
+        )
+        if checkpoints.is_committed(stage.name, key, stage.outputs):
+            logging.info("Stage %s is up to date, skipped", stage.name)
+            return key, functools.cache(stage.load)
+        result = stage.run(upstream)
+        checkpoints.commit(stage.name, key, stage.outputs)
+        return key, lambda: result
+
+    pending = {stage.name: stage for stage in stages}
+    with ThreadPoolExecutor(max_workers or len(stages) or 1) as pool:
+        running = {}
+        while pending or running:
+            ready = [
+                stage
+                for stage in pending.values()
+                if depends_on[stage.name] <= keys.keys()
+            ]
+            if not ready and not running:
+                raise ValueError(f"Dependency cycle between {sorted(pending)}")
+            for stage in ready:
+                del pending[stage.name]
+                running[pool.submit(execute, stage)] = stage
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                keys[stage.name], results[stage.name] = future.result()
+    return keys
@@ -0,0 +1,1092 @@
+import contextlib
+import datetime
+import hashlib
+import json
+import logging
+import pathlib
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    NamedTuple,
+)
+
+from .config import (
+    GOLD_CACHE_FILE,
+    GRAPH_FILE,
+    HLL_PRECISION,
+    JOURNAL_BUCKETS_FILE,
+    RUN_DATE,
+    SHARDS_DIR,
+    STORE_FILE,
+)
+from .dag import code_version
+from .shards import find_shard_files
+from .utils import json_codec
+from .utils.helpers import (
+    find_silver_files,
+    get_all_drugs_by_journals,
+    get_all_journals_by_drug,
+    journal_with_max_distinct_drugs,
+    open_file,
+    save_files_as_json,
+    sort_and_group_by_journal,
+)
+from .utils.hyperloglog import (
+    HyperLogLog,
+    journal_sketches,
+    journal_with_max_estimated_drugs,
+    merge_journal_sketches,
+    standard_error,
+)
+from .utils.journal_buckets import JournalBuckets
+from .utils.result_cache import ResultCache
+
+now = RUN_DATE
+
+
+def _load_json(file: pathlib.Path) -> list[dict]:
+    with open_file(file, "rb") as f:
+        return json_codec.load(f)
+
+
+def join_star_schema(
+    publications: list[dict], drugs: list[dict], mentions: list[dict]
+) -> list[dict]:
+    """
+    Rebuilds the cross reference rows of a star schema snapshot by joining the mention fact
+    with the publication and drug dimensions on their integer keys.
+    The rows share the strings of the dimensions rather than copying them.
+    """
+    publications_by_id = {row["publication_id"]: row for row in publications}
+    drugs_by_id = {row["drug_id"]: row["drug"] for row in drugs}
+    rows = []
+    for mention in mentions:
+        publication = publications_by_id[mention["publication_id"]]
+        rows.append(
+            {
+                "drug": drugs_by_id[mention["drug_id"]],
+                "journal": publication["journal"],
+                "mention_date": publication["date"],
+                "source_file": publication["source_file"],
+            }
+        )
+    return rows
+
+
+def find_cross_reference_snapshot(
+    silver_zone_path: pathlib.Path,
+) -> list[pathlib.Path] | None:
+    """
+    Finds the files of the latest cross reference snapshot in the silver zone.
+    Both silver layouts are supported: the cross_reference_data file of the flat layout
+    and the publication_dim / drug_dim / mention_fact tables of the star layout. The most
+    recent snapshot wins, flat on a tie.
+    Args:
+        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
+    Returns:
+        list[pathlib.Path] | None: The cross_reference_data file, or the publication_dim,
+            drug_dim and mention_fact files. None if no complete snapshot is found.
+    """
+    flat = find_silver_files(silver_zone_path, "cross_reference_data")
+    star = find_silver_files(silver_zone_path, "mention_fact")
+    if not flat and not star:
+        logging.error(
+            "No cross reference data found, please run the main pipeline first"
+        )
+        return None
+    # file names end with the run date and the same extension, compare what follows the prefix
+    if not star or (
+        flat
+        and flat[-1].name[len("cross_reference_data") :]
+        >= star[-1].name[len("mention_fact") :]
+    ):
+        return [flat[-1]]
+    suffix = star[-1].name[len("mention_fact") :]
+    snapshot = [
+        silver_zone_path / f"publication_dim{suffix}",
+        silver_zone_path / f"drug_dim{suffix}",
+        star[-1],
+    ]
+    missing = [file.name for file in snapshot if not file.exists()]
+    if missing:
+        logging.error(f"Incomplete star schema snapshot, missing {missing}")
+        return None
+    return snapshot
+
+
+def load_cross_reference_snapshot(
+    snapshot: list[pathlib.Path], tables: list[list[dict]] | None = None
+) -> list[dict]:
+    """
+    Loads the cross reference rows of a snapshot found by `find_cross_reference_snapshot`,
+    joining the star schema tables with `join_star_schema`.
+    Compressed snapshots (.json.gz, .json.bz2, .json.xz) are decompressed on the fly.
+    Args:
+        snapshot (list[pathlib.Path]): The files of the snapshot.
+        tables (list[list[dict]] | None, optional): The files of the snapshot already
+            decoded, see `SnapshotLoader`. Defaults to None, the files are decoded.
+    Returns:
+        list[dict]: The cross reference rows.
+    """
+    if tables is None:
+        tables = [_load_json(file) for file in snapshot]
+    if len(tables) == 1:
+        return tables[0]
+    return join_star_schema(*tables)
+
+
+def _read_json_array(
+    file: pathlib.Path, mark: dict | None
+) -> tuple[bytes, bytes | None, dict]:
+    """
+    Reads a JSON array file of the silver zone and its watermark: the length and digest of
+    the array without its closing bracket. When `mark`, the watermark of a previous version
+    of the file, is a prefix of this version (items appended at the end, as the watcher
+    writes snapshots), the JSON array of the appended items is returned as well.
+    Returns:
+        tuple[bytes, bytes | None, dict]: The content of the file, the appended items (None
+            if `mark` is not a prefix) and the watermark of the file.
+    """
+    with open_file(file, "rb") as f:
+        content = f.read()
+    body = content.rstrip()[:-1].rstrip()
+    watermark = {"length": len(body), "digest": hashlib.blake2b(body).hexdigest()}
+    appended = None
+    if mark is not None and mark["length"] <= len(body):
+        prefix = memoryview(body)[: mark["length"]]
+        if hashlib.blake2b(prefix).hexdigest() == mark["digest"]:
+            items = body[mark["length"] :].lstrip().removeprefix(b",")
+            appended = b"[" + items + b"]"
+    return content, appended, watermark
+
+
+def load_appended_cross_reference_rows(
+    snapshot: list[pathlib.Path], watermark: list[dict] | None = None
+) -> tuple[list[dict], list[dict], bool]:
+    """
+    Loads the cross reference rows of a snapshot found by `find_cross_reference_snapshot`
+    appended since the snapshot of `watermark`, for the aggregates folding rows
+    incrementally. Only the appended rows are decoded when each file of the previous
+    snapshot is a prefix of the same file of this one, all the rows otherwise. The
+    dimensions of a star schema snapshot are decoded in full, the mention fact from the
+    watermark.
+    Args:
+        snapshot (list[pathlib.Path]): The files of the snapshot.
+        watermark (list[dict] | None, optional): The watermark returned for a previous
+            snapshot. Defaults to None, all the rows.
+    Returns:
+        tuple[list[dict], list[dict], bool]: The rows, the watermark of this snapshot and
+            whether the rows are only the appended ones.
+    """
+    if watermark is None or len(watermark) != len(snapshot):
+        watermark = [None] * len(snapshot)
+    read = [_read_json_array(file, mark) for file, mark in zip(snapshot, watermark)]
+    appended = all(items is not None for _, items, _ in read)
+    tables = [json_codec.loads(content) for content, _, _ in read[:-1]]
+    content, items, _ = read[-1]
+    tables.append(json_codec.loads(items if appended else content))
+    rows = tables[0] if len(tables) == 1 else join_star_schema(*tables)
+    return rows, [mark for _, _, mark in read], appended
+
+
+class SnapshotLoader:
+    """
+    Decodes the files of a cross reference snapshot found by `find_cross_reference_snapshot`
+    on first use only, so that all the gold outputs of a build share a single load of the
+    snapshot, see `_gold_build`.
+    """
+
+    def __init__(self, snapshot: list[pathlib.Path]) -> None:
+        self.snapshot = snapshot
+        self.watermark: list[dict] | None = None
+        self._tables: list[list[dict]] | None = None
+        self._rows: list[dict] | None = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the files of the snapshot were decoded."""
+        return self._tables is not None
+
+    def tables(self) -> list[list[dict]]:
+        """The decoded files of the snapshot, e.g. the tables of a star schema snapshot."""
+        if self._tables is None:
+            read = [_read_json_array(file, None) for file in self.snapshot]
+            self._tables = [json_codec.loads(content) for content, _, _ in read]
+            self.watermark = [mark for _, _, mark in read]
+        return self._tables
+
+    def rows(self) -> list[dict]:
+        """The cross reference rows of the snapshot, see `load_cross_reference_snapshot`."""
+        if self._rows is None:
+            self._rows = load_cross_reference_snapshot(self.snapshot, self.tables())
+        return self._rows
+
+    def appended_rows(
+        self, watermark: list[dict] | None
+    ) -> tuple[list[dict], list[dict], bool]:
+        """
+        The rows appended since the snapshot of `watermark`, see
+        `load_appended_cross_reference_rows`. All the rows once the snapshot is decoded.
+        """
+        if self.loaded:
+            return self.rows(), self.watermark, False
+        return load_appended_cross_reference_rows(self.snapshot, watermark)
+
+
+def _snapshot_loader(
+    silver_zone_path: pathlib.Path, loader: SnapshotLoader | None
+) -> SnapshotLoader | None:
+    """The loader of the latest snapshot of the silver zone unless one is given, None if there is no snapshot."""
+    if loader is not None:
+        return loader
+    snapshot = find_cross_reference_snapshot(silver_zone_path)
+    return None if snapshot is None else SnapshotLoader(snapshot)
+
+
+def load_cross_reference_data(silver_zone_path: pathlib.Path) -> list[dict] | None:
+    """
+    Loads the latest cross reference snapshot from the silver zone, see
+    `find_cross_reference_snapshot`.
+    Args:
+        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
+    Returns:
+        list[dict] | None: The cross reference rows, None if no snapshot is found.
+    """
+    snapshot = find_cross_reference_snapshot(silver_zone_path)
+    if snapshot is None:
+        return None
+    return load_cross_reference_snapshot(snapshot)
+
+
+def _cache_key(
+    cache: ResultCache, command: str, arguments: dict, snapshot: list[pathlib.Path]
+) -> str:
+    """The result cache key of a command on a snapshot, see `_cached_results`."""
+    payload = {
+        "command": command,
+        "arguments": arguments,
+        "snapshot": [[file.name, cache.digest(file)] for file in snapshot],
+        "code_version": code_version(),
+    }
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+class GoldOutput(NamedTuple):
+    """
+    A gold output computed from the latest cross reference snapshot, see `_build_gold_outputs`.
+    - command, arguments: the name of the output and its normalized arguments (JSON
+      serializable), part of the key of the result in the result cache.
+    - file_name: the file the result is saved to in the gold zone.
+    - compute: `compute(rows, store)` computes the result from the cross reference rows and
+      their CrossReferenceStore (None without NumPy, see `build_cross_reference_store`),
+      returns None when there is no result. Results must be JSON serializable.
+    """
+
+    command: str
+    arguments: dict
+    file_name: str
+    compute: Callable[[list[dict], Any], Any]
+
+
+def _cached_results(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    outputs: list[GoldOutput],
+    use_cache: bool = True,
+    loader: SnapshotLoader | None = None,
+) -> dict[str, Any] | None:
+    """
+    Computes gold outputs from the latest cross reference snapshot, through the result
+    cache of the gold zone (GOLD_CACHE_FILE).
+    Each result is cached under a hash of the content of the snapshot files, of the command,
+    of its normalized arguments and of the code: as long as none of them changes, the
+    snapshot is neither loaded nor aggregated again. The outputs missing from the cache are
+    computed together from the columnar store of the snapshot, see
+    `load_cross_reference_store`, or from a single load of the snapshot without NumPy.
+    Args:
+        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
+        gold_zone_path (pathlib.Path): Path to the gold zone, holding the cache.
+        outputs (list[GoldOutput]): The outputs to compute.
+        use_cache (bool, optional): Whether to use the cache. Defaults to True.
+        loader (SnapshotLoader | None, optional): The loader of the latest snapshot, shared
+            with other outputs. Defaults to None, the snapshot is found in the silver zone.
+    Returns:
+        dict[str, Any] | None: The results by file name, without the outputs that have no
+            result (not cached). None if there is no snapshot.
+    """
+    loader = _snapshot_loader(silver_zone_path, loader)
+    if loader is None:
+        return None
+    snapshot = loader.snapshot
+    with contextlib.ExitStack() as stack:
+        cache = None
+        if use_cache:
+            cache = stack.enter_context(ResultCache(gold_zone_path / GOLD_CACHE_FILE))
+        results, missing = {}, []
+        for output in outputs:
+            key, result = output.file_name, None
+            if cache is not None:
+                key = _cache_key(cache, output.command, output.arguments, snapshot)
+                result = cache.get(key)
+            if result is not None:
+                logging.info(f"{output.command} result read from the cache")
+                results[output.file_name] = result
+            else:
+                missing.append((key, output))
+        if not missing:
+            return results
+        try:
+            store = load_cross_reference_store(gold_zone_path, loader, use_cache)
+        except (TypeError, KeyError):
+            # reported by compute_gold_outputs, encoding the rows again
+            store = None
+        computed = compute_gold_outputs(
+            None if store is not None else loader.rows(),
+            [output for _, output in missing],
+            store,
+        )
+        for key, output in missing:
+            if output.file_name not in computed:
+                continue
+            results[output.file_name] = computed[output.file_name]
+            if cache is not None:
+                cache.put(key, computed[output.file_name])
+    return results
+
+
+def compute_gold_outputs(
+    data: list[dict] | None, outputs: list[GoldOutput], store=None
+) -> dict[str, Any]:
+    """
+    Computes gold outputs from cross reference rows, as loaded from the silver zone or as
+    produced by the pipeline (see `servier.run_all`), the outputs share one columnar store.
+    Args:
+        data (list[dict] | None): The cross reference rows, None with a `store`.
+        outputs (list[GoldOutput]): The outputs to compute.
+        store (CrossReferenceStore | None, optional): The columnar store of the rows.
+            Defaults to None, built from the rows, see `build_cross_reference_store`.
+    Returns:
+        dict[str, Any]: The results by file name, without the outputs that have no result.
+    """
+    if store is None:
+        try:
+            store = build_cross_reference_store(data)
+        except (TypeError, KeyError) as e:
+            # the outputs fall back to the rows, and report the rows they cannot use
+            logging.error(f"Unexpected silver data format {e}")
+            store = None
+    results = {}
+    for output in outputs:
+        result = output.compute(data, store)
+        if result is not None:
+            results[output.file_name] = result
+    return results
+
+
+def save_gold_outputs(gold_zone_path: pathlib.Path, results: dict[str, Any]) -> None:
+    """Saves gold results by file name all at once to the gold zone, see `save_files_as_json`."""
+    save_files_as_json(
+        {gold_zone_path / file_name: result for file_name, result in results.items()}
+    )
+
+
+def _build_gold_outputs(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    outputs: list[GoldOutput],
+    use_cache: bool = True,
+) -> dict[str, Any] | None:
+    """
+    Computes gold outputs, see `_cached_results`, and saves them all at once to the gold
+    zone, see `save_files_as_json`.
+    Returns:
+        dict[str, Any] | None: The results saved by file name, None if there is no snapshot.
+    """
+    results = _cached_results(silver_zone_path, gold_zone_path, outputs, use_cache)
+    if results:
+        save_gold_outputs(gold_zone_path, results)
+    return results
+
+
+def snapshot_digest(gold_zone_path: pathlib.Path, snapshot: list[pathlib.Path]) -> str:
+    """
+    The content digest of a snapshot found by `find_cross_reference_snapshot`, the digests
+    of its files are memoized in the result cache of the gold zone.
+    """
+    with ResultCache(gold_zone_path / GOLD_CACHE_FILE) as cache:
+        files = [[file.name, cache.digest(file)] for file in snapshot]
+    return hashlib.sha256(json.dumps(files).encode("utf-8")).hexdigest()
+
+
+def build_cross_reference_store(data: list[dict]):
+    """
+    Encodes the cross reference rows into a columnar CrossReferenceStore.
+    Returns None when NumPy (`pip install servier[columnar]`) is not installed, the gold
+    commands then fall back to the helpers working on the rows.
+    """
+    try:
+        from .utils.columnar import CrossReferenceStore
+    except ImportError:
+        return None
+    return CrossReferenceStore.from_rows(data)
+
+
+def load_cross_reference_store(
+    gold_zone_path: pathlib.Path, loader: SnapshotLoader, use_cache: bool = True
+):
+    """
+    Encodes a cross reference snapshot into a CrossReferenceStore, see
+    `build_cross_reference_store`.
+    The store is saved to the gold zone (STORE_FILE) and loaded from there as long as the
+    snapshot and the code do not change, instead of loading and encoding the snapshot
+    again: the rows are only decoded to be encoded.
+    Args:
+        gold_zone_path (pathlib.Path): Path to the gold zone, holding the saved store.
+        loader (SnapshotLoader): The loader of the snapshot.
+        use_cache (bool, optional): Whether to reuse the saved store. Defaults to True.
+    Returns:
+        CrossReferenceStore | None: The store, None when NumPy is not installed.
+    """
+    try:
+        from .utils.columnar import CrossReferenceStore
+    except ImportError:
+        return None
+    metadata = {
+        "snapshot": snapshot_digest(gold_zone_path, loader.snapshot),
+        "code_version": code_version(),
+    }
+    store_file = gold_zone_path / STORE_FILE
+    if use_cache and store_file.exists():
+        store, saved_metadata = CrossReferenceStore.load(store_file)
+        if saved_metadata == metadata:
+            logging.info("Cross reference store read from the gold zone")
+            return store
+    store = CrossReferenceStore.from_rows(loader.rows())
+    store.save(store_file, **metadata)
+    return store
+
+
+def compute_journal_with_max_drugs(data: list[dict], store=None) -> str | None:
+    """The journal mentioning the most distinct drugs, from the rows or their store."""
+    try:
+        if store is not None:
+            return store.journal_with_max_distinct_drugs()
+        return journal_with_max_distinct_drugs(sort_and_group_by_journal(data))
+    except (TypeError, KeyError) as e:
+        logging.error(f"Unexpected silver data format {e}")
+        return None
+
+
+def journal_with_max_drugs_output() -> GoldOutput:
+    return GoldOutput(
+        "journal_with_max_drugs",
+        {},
+        f"the_journal_{now}.json",
+        compute_journal_with_max_drugs,
+    )
+
+
+def compute_drugs_from_journals_that_mention_a_specific_drug(
+    data: list[dict], drug_name: str, store=None
+) -> list[str] | None:
+    """
+    The drugs mentioned by pubmed in the journals mentioning a drug, from the rows or their
+    store. None if the drug is not mentioned in any journal.
+    """
+    try:
+        if store is not None:
+            journals = store.journals_by_drug(drug_name)
+        else:
+            journals = get_all_journals_by_drug(data, drug_name)
+    except (TypeError, KeyError, AttributeError) as e:
+        logging.error(f"Unexpected silver data format {e}")
+        return None
+    if not journals:
+        logging.warning(f"DRUG : {drug_name} is not mentionned in any journal")
+        return None
+    if store is not None:
+        drugs_by_journals = store.drugs_by_journals(journals, source_file="pubmed")
+    else:
+        drugs_by_journals = get_all_drugs_by_journals(
+            data, journals, **{"source_file": "pubmed"}
+        )
+    return list(drugs_by_journals)
+
+
+def drugs_from_journals_that_mention_a_specific_drug_output(
+    drug_name: str,
+) -> GoldOutput:
+    return GoldOutput(
+        "drugs_from_journals_that_mention_a_specific_drug",
+        # the drug is matched case insensitively, see get_all_journals_by_drug
+        {"drug_name": drug_name.lower().strip()},
+        f"drugs_by_journals_by_{drug_name}_{now}.json",
+        lambda data, store: compute_drugs_from_journals_that_mention_a_specific_drug(
+            data, drug_name, store
+        ),
+    )
+
+
+def find_shard_snapshots(
+    silver_zone_path: pathlib.Path,
+) -> list[list[pathlib.Path]] | None:
+    """
+    Finds the cross reference snapshot of each shard of the latest sharded main-pipeline
+    run, whether or not `merge-silver` merged them: the cross_reference_data shard, or the
+    publication_dim, drug_dim and mention_fact shards, see `find_cross_reference_snapshot`.
+    Returns:
+        list[list[pathlib.Path]] | None: The snapshots in shard order, None if there are no
+            shard outputs or if some are missing.
+    """
+    shards_path = silver_zone_path / SHARDS_DIR
+    found = find_shard_files(shards_path) if shards_path.is_dir() else {}
+    if not found:
+        logging.error(
+            "No shard outputs found, please run a sharded main pipeline first"
+        )
+        return None
+    run_date = max(found)
+    counts = {count for files in found[run_date].values() for _, count, _ in files}
+    if len(counts) != 1:
+        logging.error(
+            f"Shards of {run_date} have several shard counts {sorted(counts)}"
+        )
+        return None
+    (shard_count,) = counts
+    files = {
+        dataset: {index: file for index, _, file in shards}
+        for dataset, shards in found[run_date].items()
+    }
+    datasets = (
+        ["cross_reference_data"]
+        if "cross_reference_data" in files
+        else ["publication_dim", "drug_dim", "mention_fact"]
+    )
+    missing = [
+        f"{dataset} {index}"
+        for dataset in datasets
+        for index in range(shard_count)
+        if index not in files.get(dataset, {})
+    ]
+    if missing:
+        logging.error(f"Incomplete shard snapshots of {run_date}, missing {missing}")
+        return None
+    return [
+        [files[dataset][index] for dataset in datasets] for index in range(shard_count)
+    ]
+
+
+def _journal_sketches(
+    gold_zone_path: pathlib.Path,
+    loader: SnapshotLoader,
+    precision: int,
+    use_cache: bool = True,
+    lineage: str = "snapshot",
+) -> dict[str, HyperLogLog]:
+    """
+    The HyperLogLog sketches of the distinct drugs of each journal of a snapshot, kept in
+    the result cache of the gold zone under the content of the snapshot: a snapshot (or a
+    shard) is only read and sketched once. The watermark of the last snapshot sketched of
+    a `lineage` (the latest snapshot, or a shard) is kept as well: when a new snapshot
+    extends it, only its appended rows are sketched and merged into the stored sketches,
+    see `load_appended_cross_reference_rows`.
+    """
+    if not use_cache:
+        return journal_sketches(loader.rows(), precision)
+    with ResultCache(gold_zone_path / GOLD_CACHE_FILE) as cache:
+        key = _cache_key(
+            cache, "journal_sketches", {"precision": precision}, loader.snapshot
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            return {
+                journal: HyperLogLog.from_dict(sketch)
+                for journal, sketch in cached.items()
+            }
+        last_key = _cache_key(
+            cache,
+            "journal_sketches_watermark",
+            {"precision": precision, "lineage": lineage},
+            [],
+        )
+        last = cache.get(last_key)
+        # the sketches of the last snapshot may have been evicted from the cache
+        last_sketches = None if last is None else cache.get(last["key"])
+        rows, watermark, appended = loader.appended_rows(
+            None if last_sketches is None else last["watermark"]
+        )
+        sketches = journal_sketches(rows, precision)
+        if appended:
+            logging.info(f"{len(rows)} appended rows sketched")
+            sketches = merge_journal_sketches(
+                [
+                    {
+                        journal: HyperLogLog.from_dict(sketch)
+                        for journal, sketch in last_sketches.items()
+                    },
+                    sketches,
+                ]
+            )
+        cache.put(
+            key, {journal: sketch.to_dict() for journal, sketch in sketches.items()}
+        )
+        cache.put(last_key, {"key": key, "watermark": watermark})
+        return sketches
+
+
+def approximate_journal_results(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    precision: int = HLL_PRECISION,
+    from_shards: bool = False,
+    use_cache: bool = True,
+    loader: SnapshotLoader | None = None,
+) -> dict[str, Any] | None:
+    """
+    The result of `_approximate_journal_with_max_drugs` by file name, without saving it.
+    Args:
+        loader (SnapshotLoader | None, optional): The loader of the latest snapshot, shared
+            with other outputs (not with `from_shards`). Defaults to None, the snapshot is
+            found in the silver zone.
+    Returns:
+        dict[str, Any] | None: The result by file name, None if there is none.
+    """
+    if from_shards:
+        snapshots = find_shard_snapshots(silver_zone_path)
+        loaders = None if snapshots is None else list(map(SnapshotLoader, snapshots))
+    else:
+        loader = _snapshot_loader(silver_zone_path, loader)
+        loaders = None if loader is None else [loader]
+    if loaders is None:
+        return None
+    try:
+        sketches = merge_journal_sketches(
+            _journal_sketches(
+                gold_zone_path,
+                snapshot_loader,
+                precision,
+                use_cache,
+                f"shard {index}" if from_shards else "snapshot",
+            )
+            for index, snapshot_loader in enumerate(loaders)
+        )
+    except (TypeError, KeyError) as e:
+        logging.error(f"Unexpected silver data format {e}")
+        return None
+    the_journal = journal_with_max_estimated_drugs(sketches)
+    if not the_journal:
+        return None
+    return {
+        f"the_journal_approximate_{now}.json": {
+            "journal": the_journal,
+            "estimated_distinct_drugs": sketches[the_journal].count(),
+            "precision": precision,
+            "standard_error": round(standard_error(precision), 4),
+        }
+    }
+
+
+def _approximate_journal_with_max_drugs(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    precision: int = HLL_PRECISION,
+    from_shards: bool = False,
+    use_cache: bool = True,
+) -> None:
+    """
+    Estimates the journal with the maximum number of distinct drugs with one HyperLogLog
+    sketch per journal, and saves it with its estimated count to the_journal_approximate_<date>.json.
+    With `from_shards`, the shards of the latest sharded run are sketched independently
+    and their sketches merged, without merging the shards themselves. The estimated counts
+    are within 1.04 / sqrt(2**precision) of the exact ones (one standard error), when two
+    journals are closer than that the journal found may not be the exact one.
+    """
+    results = approximate_journal_results(
+        silver_zone_path, gold_zone_path, precision, from_shards, use_cache
+    )
+    if results:
+        save_gold_outputs(gold_zone_path, results)
+
+
+def _journal_with_max_drugs(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    use_cache: bool = True,
+    approximate: bool = False,
+    precision: int = HLL_PRECISION,
+    from_shards: bool = False,
+) -> None:
+    """
+    Identifies the journal with the maximum number of distinct drugs from the cross-reference data
+    and saves the result to a JSON file in the gold zone path.
+    Args:
+        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
+        gold_zone_path (pathlib.Path): Path to the directory where the result JSON file will be saved.
+        use_cache (bool, optional): Reuse the result of a previous call on the same snapshot. Defaults to True.
+        approximate (bool, optional): Estimate the distinct drug counts with HyperLogLog sketches,
+            see `_approximate_journal_with_max_drugs`. Defaults to False.
+        precision (int, optional): The precision of the sketches. Defaults to HLL_PRECISION.
+        from_shards (bool, optional): Sketch the shards of the latest sharded run rather than
+            the latest snapshot, only with `approximate`. Defaults to False.
+    Returns:
+        None
+    Logs:
+        - Error if no cross-reference data is found in the silver zone path.
+        - Error if the silver data format is unexpected.
+    """
+    if approximate:
+        _approximate_journal_with_max_drugs(
+            silver_zone_path, gold_zone_path, precision, from_shards, use_cache
+        )
+        return
+    _build_gold_outputs(
+        silver_zone_path, gold_zone_path, [journal_with_max_drugs_output()], use_cache
+    )
+
+
+def _get_drugs_from_journals_that_mention_a_specific_drug(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    drug_name: str,
+    use_cache: bool = True,
+) -> None:
+    """
+    Extracts and saves a list of drugs mentioned in journals that reference a specified drug.
+    This function reads cross-reference data from a JSON file in the silver zone directory,
+    identifies journals that mention the specified drug, and then finds all drugs mentioned
+    in those journals. The resulting list of drugs is saved as a JSON file in the gold zone directory.
+    Args:
+        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
+        gold_zone_path (pathlib.Path): Path to the directory where the output JSON file will be saved.
+        drug_name (str): The name of the drug to search for in the journals.
+        use_cache (bool, optional): Reuse the result of a previous call on the same snapshot
+            and drug, whatever its case. Defaults to True.
+    Returns:
+        None
+    Logs:
+        Error: If no cross-reference data is found or if there is an unexpected data format.
+        Warning: If the specified drug is not mentioned in any journal.
+    """
+
+    _build_gold_outputs(
+        silver_zone_path,
+        gold_zone_path,
+        [drugs_from_journals_that_mention_a_specific_drug_output(drug_name)],
+        use_cache,
+    )
+
+
+def gold_outputs(drug_names: Iterable[str] = ()) -> list[GoldOutput]:
+    """
+    The gold outputs built by `_gold_build`: the journal with the maximum number of distinct
+    drugs, and the drugs of the journals mentioning each drug of `drug_names`.
+    """
+    return [journal_with_max_drugs_output()] + [
+        drugs_from_journals_that_mention_a_specific_drug_output(drug_name)
+        for drug_name in dict.fromkeys(drug_names)
+    ]
+
+
+def _gold_build(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    drug_names: Iterable[str] = (),
+    outputs: list[GoldOutput] | None = None,
+    use_cache: bool = True,
+    journal_activity: bool = False,
+    days: int = 30,
+    top: int = 10,
+    as_of: datetime.date | None = None,
+    neighbourhoods: Iterable[str] = (),
+    hops: int = 2,
+    approximate: bool = False,
+    precision: int = HLL_PRECISION,
+) -> dict[str, Any] | None:
+    """
+    Computes all the gold outputs from a single load of the latest cross reference snapshot
+    and saves them at once to the gold zone: the files of `journal-with-max-drugs` and of
+    `get-drugs-from-journals-that-mention-a-specific-drug` for each drug, and optionally of
+    `journal-activity`, of `drug-neighbourhood` for each drug and of
+    `journal-with-max-drugs --approximate`, with the same names and contents. The results
+    are shared with these commands through the result cache, the compiled graph, the
+    journal activity buckets and the sketches: the snapshot is only loaded, once, if one of
+    the outputs is missing from them, see `SnapshotLoader`.
+    Args:
+        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
+        gold_zone_path (pathlib.Path): Path to the directory where the output JSON files will be saved.
+        drug_names (Iterable[str], optional): The drugs to save the drugs from the journals
+            mentioning them of, one file per drug. Defaults to none.
+        outputs (list[GoldOutput] | None, optional): The outputs to build. Defaults to None,
+            `gold_outputs(drug_names)`.
+        use_cache (bool, optional): Reuse the results of previous calls on the same snapshot. Defaults to True.
+        journal_activity (bool, optional): Also build the outputs of `_journal_activity`. Defaults to False.
+        days (int, optional): The rolling window of `journal_activity`, in days. Defaults to 30.
+        top (int, optional): The number of journals of `journal_activity`. Defaults to 10.
+        as_of (datetime.date | None, optional): The last day of the rolling window. Defaults to today.
+        neighbourhoods (Iterable[str], optional): The drugs to save the neighbourhood of,
+            see `_drug_neighbourhood` (requires NumPy). Defaults to none.
+        hops (int, optional): The maximum number of edges of the neighbourhoods. Defaults to 2.
+        approximate (bool, optional): Also build the output of
+            `_approximate_journal_with_max_drugs`. Defaults to False.
+        precision (int, optional): The precision of the sketches. Defaults to HLL_PRECISION.
+    Returns:
+        dict[str, Any] | None: The results saved by file name, None if there is no snapshot.
+    """
+    if outputs is None:
+        outputs = gold_outputs(drug_names)
+    loader = _snapshot_loader(silver_zone_path, None)
+    if loader is None:
+        return None
+    results = _cached_results(
+        silver_zone_path, gold_zone_path, outputs, use_cache, loader
+    )
+    # the outputs that can fold only the appended rows of the snapshot come last, to reuse
+    # its rows if they were decoded
+    for drug_name in dict.fromkeys(neighbourhoods):
+        results.update(
+            drug_neighbourhood_results(
+                silver_zone_path,
+                gold_zone_path,
+                drug_name,
+                hops,
+                use_cache=use_cache,
+                loader=loader,
+            )
+            or {}
+        )
+    if journal_activity:
+        results.update(
+            journal_activity_results(
+                silver_zone_path, gold_zone_path, days, top, as_of, loader=loader
+            )
+            or {}
+        )
+    if approximate:
+        results.update(
+            approximate_journal_results(
+                silver_zone_path,
+                gold_zone_path,
+                precision,
+                use_cache=use_cache,
+                loader=loader,
+            )
+            or {}
+        )
+    if results:
+        save_gold_outputs(gold_zone_path, results)
+    return results
+
+
+def journal_activity_results(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    days: int = 30,
+    top: int = 10,
+    as_of: datetime.date | None = None,
+    rebuild: bool = False,
+    loader: SnapshotLoader | None = None,
+) -> dict[str, Any] | None:
+    """
+    The results of `_journal_activity` by file name, without saving them.
+    Args:
+        loader (SnapshotLoader | None, optional): The loader of the latest snapshot, shared
+            with other outputs. Defaults to None, the snapshot is found in the silver zone.
+    Returns:
+        dict[str, Any] | None: The results by file name, None if there are none.
+    """
+    loader = _snapshot_loader(silver_zone_path, loader)
+    if loader is None:
+        return None
+    as_of = as_of or datetime.date.today()
+    digest = snapshot_digest(gold_zone_path, loader.snapshot)
+    with JournalBuckets(gold_zone_path / JOURNAL_BUCKETS_FILE) as buckets:
+        if rebuild:
+            buckets.clear()
+        if buckets.folded(digest):
+            logging.info("Snapshot already folded into the journal activity buckets")
+        else:
+            try:
+                rows, watermark, appended = loader.appended_rows(buckets.watermark())
+                changed = buckets.fold(rows, digest, watermark)
+            except (TypeError, KeyError, ValueError) as e:
+                logging.error(f"Unexpected silver data format {e}")
+                return None
+            logging.info(
+                f"{len(rows)} {'appended' if appended else 'snapshot'} rows folded, "
+                f"{changed} journal activity buckets created or extended"
+            )
+        by_month = buckets.distinct_drugs_by_month()
+        top_journals = buckets.top_journals(as_of, days, top)
+    return {
+        f"distinct_drugs_by_journal_by_month_{now}.json": by_month,
+        f"top_journals_last_{days}_days_{now}.json": {
+            "as_of": as_of.isoformat(),
+            "days": days,
+            "journals": top_journals,
+        },
+    }
+
+
+def _journal_activity(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    days: int = 30,
+    top: int = 10,
+    as_of: datetime.date | None = None,
+    rebuild: bool = False,
+) -> None:
+    """
+    Maintains the per journal and month distinct drug aggregates of the gold zone
+    (JOURNAL_BUCKETS_FILE) and saves them, with the journals mentioning the most distinct
+    drugs over the last `days` days, to JSON files in the gold zone path.
+    The latest cross reference snapshot is folded into the aggregates once, see
+    `JournalBuckets`: an unchanged snapshot is not loaded again, a new one only folds the
+    rows appended since the last snapshot folded when it extends it (see
+    `load_appended_cross_reference_rows`, all its rows otherwise), and only writes the
+    buckets of its new mentions. The rolling window is answered from the buckets.
+    Args:
+        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
+        gold_zone_path (pathlib.Path): Path to the directory where the result JSON files will be saved.
+        days (int, optional): The length of the rolling window, in days. Defaults to 30.
+        top (int, optional): The number of journals of the rolling window. Defaults to 10.
+        as_of (datetime.date | None, optional): The last day of the rolling window. Defaults to today.
+        rebuild (bool, optional): Drop the aggregates and fold the snapshot again, for
+            mentions that disappeared from the cross reference. Defaults to False.
+    Returns:
+        None
+    Logs:
+        Error: If no cross-reference data is found or if there is an unexpected data format.
+    """
+    results = journal_activity_results(
+        silver_zone_path, gold_zone_path, days, top, as_of, rebuild
+    )
+    if results:
+        save_gold_outputs(gold_zone_path, results)
+
+
+def load_cross_reference_graph(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    use_cache: bool = True,
+    loader: SnapshotLoader | None = None,
+):
+    """
+    Compiles the latest cross reference snapshot into a CrossReferenceGraph (requires
+    NumPy, `pip install servier[columnar]`).
+    The graph is saved to the gold zone (GRAPH_FILE) and loaded from there as long as the
+    snapshot and the code do not change, instead of loading the snapshot again.
+    Args:
+        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
+        gold_zone_path (pathlib.Path): Path to the gold zone, holding the compiled graph.
+        use_cache (bool, optional): Whether to reuse the compiled graph. Defaults to True.
+        loader (SnapshotLoader | None, optional): The loader of the latest snapshot, shared
+            with other outputs. Defaults to None, the snapshot is found in the silver zone.
+    Returns:
+        CrossReferenceGraph | None: The graph, None if no snapshot is found.
+    """
+    from .utils.graph import CrossReferenceGraph
+
+    loader = _snapshot_loader(silver_zone_path, loader)
+    if loader is None:
+        return None
+    metadata = {
+        "snapshot": snapshot_digest(gold_zone_path, loader.snapshot),
+        "code_version": code_version(),
+    }
+    graph_file = gold_zone_path / GRAPH_FILE
+    if use_cache and graph_file.exists():
+        graph, saved_metadata = CrossReferenceGraph.load(graph_file)
+        if saved_metadata == metadata:
+            logging.info("Cross reference graph read from the gold zone")
+            return graph
+    tables = loader.tables()
+    if len(tables) == 1:
+        graph = CrossReferenceGraph.from_rows(tables[0])
+    else:
+        graph = CrossReferenceGraph.from_star_schema(*tables)
+    graph.save(graph_file, **metadata)
+    return graph
+
+
+def drug_neighbourhood_results(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    drug_name: str,
+    hops: int = 2,
+    edge_types: list[str] | None = None,
+    source_file: str | None = None,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    use_cache: bool = True,
+    loader: SnapshotLoader | None = None,
+) -> dict[str, Any] | None:
+    """
+    The result of `_drug_neighbourhood` by file name, without saving it.
+    Args:
+        loader (SnapshotLoader | None, optional): The loader of the latest snapshot, shared
+            with other outputs. Defaults to None, the snapshot is found in the silver zone.
+    Returns:
+        dict[str, Any] | None: The result by file name, None if there is none.
+    """
+    try:
+        graph = load_cross_reference_graph(
+            silver_zone_path, gold_zone_path, use_cache, loader
+        )
+    except (TypeError, KeyError, ValueError) as e:
+        logging.error(f"Unexpected silver data format {e}")
+        return None
+    if graph is None:
+        return None
+    if not graph.find("drug", drug_name):
+        logging.warning(f"DRUG : {drug_name} is not mentionned in any journal")
+        return None
+    neighbourhood = graph.k_hop(
+        "drug", drug_name, hops, edge_types, source_file, start, end
+    )
+    return {f"neighbourhood_of_{drug_name}_{now}.json": neighbourhood}
+
+
+def _drug_neighbourhood(
+    silver_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    drug_name: str,
+    hops: int = 2,
+    edge_types: list[str] | None = None,
+    source_file: str | None = None,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    use_cache: bool = True,
+) -> None:
+    """
+    Saves the nodes within `hops` edges of a drug in the cross reference graph, with their
+    distance, to a JSON file in the gold zone path, see `CrossReferenceGraph.k_hop`.
+    Args:
+        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
+        gold_zone_path (pathlib.Path): Path to the directory where the output JSON file will be saved.
+        drug_name (str): The drug to start from, matched case insensitively.
+        hops (int, optional): The maximum number of edges from the drug. Defaults to 2.
+        edge_types (list[str] | None, optional): The edge types to traverse. Defaults to all.
+        source_file (str | None, optional): Only traverse the mentions of this source file.
+        start (datetime.date | None, optional): Only traverse the mentions from this day.
+        end (datetime.date | None, optional): Only traverse the mentions until this day.
+        use_cache (bool, optional): Reuse the graph compiled from the same snapshot. Defaults to True.
+    Returns:
+        None
+    Logs:
+        Error: If no cross-reference data is found or if there is an unexpected data format.
+        Warning: If the drug is not in the graph.
+    """
+    results = drug_neighbourhood_results(
+        silver_zone_path,
+        gold_zone_path,
+        drug_name,
+        hops,
+        edge_types,
+        source_file,
+        start,
+        end,
+        use_cache,
+    )
+    if results:
+        save_gold_outputs(gold_zone_path, results)
@@ -1,35 +1,200 @@
-import datetime
-import json
+import itertools
 import logging
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+)
 
-from pydantic import ValidationError
+from pydantic import (
+    BaseModel,
+    ValidationError,
+)
 
+from .checkpoints import RunCheckpoints
 from .config import (
+    COMPRESSION_EXTENSIONS,
+    DRUGS_FIELD_NAMES,
     DRUGS_FILE_NAMES,
+    PUBTRIALS_FIELD_NAMES,
     PUBTRIALS_FILE_NAMES,
+    RUN_DATE,
+    SHARDS_DIR,
+)
+from .dag import (
+    Stage,
+    run_stages,
+)
+from .gold import (  # noqa: F401, re-exported for backward compatibility
+    _get_drugs_from_journals_that_mention_a_specific_drug,
+    _journal_with_max_drugs,
+    join_star_schema,
+    load_cross_reference_data,
 )
 from .models import (
     CrossReference,
     Drug,
     PubClinical,
 )
+from .shards import (
+    in_shard,
+    shard_suffix,
+)
+from .utils import json_codec
+from .utils.fuzzy import fuzzy_mentions
 from .utils.helpers import (
-    get_all_drugs_by_journals,
-    get_all_journals_by_drug,
-    journal_with_max_distinct_drugs,
     list_files_in_folder,
+    open_file,
     read_raw_data,
     save_file_as_json,
-    sort_and_group_by_journal,
+    surrogate_key,
 )
+from .utils.rejects import RejectSink
+from .utils.validation_cache import ValidationCache
+
+now = RUN_DATE
+
+
+def validate_rows(
+    rows: Iterable[dict],
+    model: type[BaseModel],
+    label: str,
+    rejects: RejectSink | None = None,
+    cache: pathlib.Path | None = None,
+) -> tuple[list[BaseModel], RejectSink]:
+    """
+    Validates raw rows against a pydantic model.
+    Args:
+        rows (Iterable[dict]): The raw rows.
+        model (type[BaseModel]): The model to validate the rows with.
+        label (str): How the rows are named in the logs, e.g. "Pubtrials".
+        rejects (RejectSink | None, optional): Where the rows that failed validation go.
+            Defaults to a new in-memory sink.
+        cache (pathlib.Path | None, optional): A validation cache file, rows already
+            validated by a previous run are not validated again, see `ValidationCache`.
+            Defaults to None, no cache.
+    Returns:
+        tuple[list[BaseModel], RejectSink]: The valid model instances and the sink of the rows that failed validation.
+    """
+    if rejects is None:
+        rejects = RejectSink(label=label)
+    valid_data = []
+    if cache is not None:
+        with ValidationCache(cache) as validation_cache:
+            for row, record, error in validation_cache.validate(rows, model):
+                if error is None:
+                    valid_data.append(record)
+                else:
+                    rejects.add(row, error)
+        logging.info(
+            "%s: %d rows read from the validation cache, %d validated",
+            label,
+            validation_cache.hits,
+            validation_cache.misses,
+        )
+        return valid_data, rejects
+    for row in rows:
+        try:
+            valid_data.append(model(**row))
+        except ValidationError as e:
+            rejects.add(row, e)
+    return valid_data, rejects
+
+
+def _read_files(
+    files: Iterable[pathlib.Path],
+    field_names: list[str],
+    shard: tuple[int, int] | None = None,
+) -> Iterator[dict]:
+    rows = itertools.chain.from_iterable(
+        read_raw_data(file, field_names) for file in files
+    )
+    if shard is None:
+        return rows
+    return (row for row in rows if in_shard(row, shard))
+
+
+def _curate_file(
+    file: pathlib.Path,
+    field_names: list[str],
+    model: type[BaseModel],
+    label: str,
+    cache: pathlib.Path | None = None,
+    shard: tuple[int, int] | None = None,
+) -> tuple[list[BaseModel], RejectSink]:
+    # the parent process samples the logging of the rejects of all the files when merging them
+    return validate_rows(
+        _read_files([file], field_names, shard),
+        model,
+        label,
+        RejectSink(label=label, defer_logging=True),
+        cache,
+    )
+
+
+def curate_files(
+    files: list[pathlib.Path],
+    field_names: list[str],
+    model: type[BaseModel],
+    label: str,
+    workers: int = 1,
+    rejects: RejectSink | None = None,
+    cache: pathlib.Path | None = None,
+    shard: tuple[int, int] | None = None,
+) -> tuple[list[BaseModel], RejectSink]:
+    """
+    Reads and validates raw files, optionally ingesting them in parallel worker processes.
+    Each worker opens one file at a time, so thousands of shards never are opened at once.
+    Results are merged in the order of `files` whatever the number of workers.
+    Args:
+        files (list[pathlib.Path]): The raw files, see `list_files_in_folder`.
+        field_names (list[str]): The field names of CSV files.
+        model (type[BaseModel]): The model to validate the rows with.
+        label (str): How the rows are named in the logs.
+        workers (int, optional): The number of worker processes. Defaults to 1 (no parallelism).
+        rejects (RejectSink | None, optional): Where the rows that failed validation go.
+            Defaults to a new in-memory sink.
+        cache (pathlib.Path | None, optional): The validation cache file, shared by the workers. Defaults to None.
+        shard (tuple[int, int] | None, optional): Only keep the rows of the shard (index, count),
+            see `servier.shards.in_shard`. Defaults to None, all the rows.
+    Returns:
+        tuple[list[BaseModel], RejectSink]: The valid model instances and the sink of the rows that failed validation.
+    """
+    if rejects is None:
+        rejects = RejectSink(label=label)
+    if workers <= 1 or len(files) <= 1:
+        return validate_rows(
+            _read_files(files, field_names, shard), model, label, rejects, cache
+        )
+    # imported on first use, multiprocessing is slow to import
+    from .utils.parallel_csv import process_pool
 
-now = datetime.datetime.now().strftime("%Y_%m_%d")
+    valid_data = []
+    with process_pool(workers) as executor:
+        for file_valid_data, file_errors in executor.map(
+            _curate_file,
+            files,
+            itertools.repeat(field_names),
+            itertools.repeat(model),
+            itertools.repeat(label),
+            itertools.repeat(cache),
+            itertools.repeat(shard),
+        ):
+            valid_data.extend(file_valid_data)
+            rejects.merge(file_errors)
+    return valid_data, rejects
 
 
 def curate_pubclinical_data(
     raw_pubtrials_data_files: list[pathlib.Path],
-) -> tuple[list[PubClinical], list[str]]:
+    workers: int = 1,
+    rejects: RejectSink | None = None,
+    cache: pathlib.Path | None = None,
+    shard: tuple[int, int] | None = None,
+) -> tuple[list[PubClinical], RejectSink]:
     """
     Curates raw clinical trial data from a list of files.
 
@@ -40,27 +205,37 @@ def curate_pubclinical_data(
     Args:
         raw_pubtrials_data_files (list[pathlib.Path]): A list of file paths containing
             raw clinical trial data.
+        workers (int, optional): The number of processes ingesting the files in parallel.
+            Defaults to 1.
+        rejects (RejectSink | None, optional): Where the rows that failed validation go.
+            Defaults to a new in-memory sink.
+        cache (pathlib.Path | None, optional): The validation cache file. Defaults to None.
+        shard (tuple[int, int] | None, optional): Only curate the publications of the shard
+            (index, count). Defaults to None, all the publications.
 
     Returns:
-        tuple[list[PubClinical], list[str]]: A tuple where the first element is a list
-            of valid PubClinical objects and the second element is a list of rows that
-            failed validation.
+        tuple[list[PubClinical], RejectSink]: A tuple where the first element is a list
+            of valid PubClinical objects and the second element is the sink of the rows
+            that failed validation.
     """
-    valid_pubtrials_data = []
-    errors = []
-    for file in raw_pubtrials_data_files:
-        for row in read_raw_data(file):
-            try:
-                valid_pubtrials_data.append(PubClinical(**row))
-            except ValidationError as e:
-                logging.error(f"Pubtrials row {row} failed validation: {e}")
-                errors.append(row)
-    return valid_pubtrials_data, errors
+    return curate_files(
+        raw_pubtrials_data_files,
+        PUBTRIALS_FIELD_NAMES,
+        PubClinical,
+        "Pubtrials",
+        workers,
+        rejects,
+        cache,
+        shard,
+    )
 
 
 def curate_drugs_data(
     raw_drugs_data_files: list[pathlib.Path],
-) -> tuple[list[Drug], list[str]]:
+    workers: int = 1,
+    rejects: RejectSink | None = None,
+    cache: pathlib.Path | None = None,
+) -> tuple[list[Drug], RejectSink]:
     """
     Curates raw drugs data from a list of file paths.
 
@@ -70,26 +245,43 @@ def curate_drugs_data(
 
     Args:
         raw_drugs_data_files (list[pathlib.Path]): A list of file paths containing raw drug data.
+        workers (int, optional): The number of processes ingesting the files in parallel. Defaults to 1.
+        rejects (RejectSink | None, optional): Where the rows that failed validation go.
+            Defaults to a new in-memory sink.
+        cache (pathlib.Path | None, optional): The validation cache file. Defaults to None.
 
     Returns:
-        tuple[list[Drug], list[str]]: A tuple where the first element is a list of valid Drug objects,
-                                      and the second element is a list of rows that failed validation.
+        tuple[list[Drug], RejectSink]: A tuple where the first element is a list of valid Drug objects,
+                                       and the second element is the sink of the rows that failed validation.
+    """
+    return curate_files(
+        raw_drugs_data_files, DRUGS_FIELD_NAMES, Drug, "Drug", workers, rejects, cache
+    )
+
+
+def mentions(
+    titles: list[str], drugs: list[str], max_distance: int = 0
+) -> Iterator[tuple[int, int, float | None]]:
+    """
+    The (drug index, title index, score) of the drugs mentioned in titles, by drug then
+    title. The score is None for the exact matching (max_distance=0), where the drug must
+    be a case insensitive substring of the title, see `fuzzy_mentions` otherwise.
     """
-    valid_drugs_data = []
-    errors = []
-    for file in raw_drugs_data_files:
-        for row in read_raw_data(file, ["atccode", "drug"]):
-            try:
-                valid_drugs_data.append(Drug(**row))
-            except ValidationError as e:
-                logging.error(f"Drug row {row} failed validation: {e}")
-                errors.append(row)
-    return valid_drugs_data, errors
+    if max_distance:
+        yield from fuzzy_mentions(titles, drugs, max_distance)
+        return
+    for drug_index, drug in enumerate(drugs):
+        for title_index, title in enumerate(titles):
+            if drug.lower() in title.lower():
+                yield drug_index, title_index, None
 
 
 def cross_reference_models(
-    pubclinical_data: list[PubClinical], drugs_data: list[Drug]
-) -> tuple[list[CrossReference], list[str]]:
+    pubclinical_data: list[PubClinical],
+    drugs_data: list[Drug],
+    rejects: RejectSink | None = None,
+    max_distance: int = 0,
+) -> tuple[list[CrossReference], RejectSink]:
     """
     Cross-references clinical publications with drug data.
     This function takes a list of clinical publication data and a list of drug data,
@@ -98,173 +290,373 @@ def cross_reference_models(
     Args:
         pubclinical_data (list[PubClinical]): A list of PubClinical objects containing publication data.
         drugs_data (list[Drug]): A list of Drug objects containing drug data.
+        rejects (RejectSink | None, optional): Where the rows that failed validation go.
+            Defaults to a new in-memory sink.
+        max_distance (int, optional): Above 0, titles mentioning a drug with up to this
+            many typos also match, with a `match_score`, see `fuzzy_mentions`.
+            Defaults to 0, the drug must be a (case insensitive) substring of the title.
     Returns:
-        tuple[list[CrossReference], list[str]]: A tuple containing two lists:
+        tuple[list[CrossReference], RejectSink]: A tuple containing:
             - A list of CrossReference objects representing the cross-referenced data.
-            - A list of strings representing errors encountered during the cross-referencing process.
+            - The sink of the rows that failed validation during the cross-referencing process.
     """
 
     cross_reference = []
-    cross_reference_errors = []
+    if rejects is None:
+        rejects = RejectSink(label="Cross Reference")
+    for drug_index, pubclinical_index, score in mentions(
+        [pubclinical.title for pubclinical in pubclinical_data],
+        [drug.drug for drug in drugs_data],
+        max_distance,
+    ):
+        drug, pubclinical = drugs_data[drug_index], pubclinical_data[pubclinical_index]
+        row = {
+            "drug": drug.drug,
+            "journal": pubclinical.journal,
+            "mention_date": pubclinical.date,
+            "source_file": pubclinical.source_file,
+        }
+        if score is not None:
+            row["match_score"] = score
+        try:
+            cross_reference.append(CrossReference(**row))
+        except ValidationError as e:
+            rejects.add(row, e)
+
+    return cross_reference, rejects
+
+
+def star_schema_models(
+    pubclinical_data: list[PubClinical], drugs_data: list[Drug], max_distance: int = 0
+) -> tuple[list[dict], list[dict], list[dict]]:
+    """
+    Cross-references publications with drugs as a star schema instead of CrossReference rows.
+    - publication dimension: the publication fields plus a `publication_id` surrogate key
+      derived from (source_file, title, date, journal), duplicates are dropped.
+    - drug dimension: the drug fields plus a `drug_id` surrogate key derived from the
+      atccode, the first drug of an atccode wins.
+    - mention fact: one distinct (publication_id, drug_id) pair per drug mentioned in a title,
+      plus its `match_score` with the fuzzy matching.
+    Args:
+        pubclinical_data (list[PubClinical]): The curated publications.
+        drugs_data (list[Drug]): The curated drugs.
+        max_distance (int, optional): The typos allowed in drug names, see `cross_reference_models`.
+            Defaults to 0.
+    Returns:
+        tuple[list[dict], list[dict], list[dict]]: The publication dimension, the drug
+            dimension and the mention fact.
+    """
+    publications = {}
+    for pubclinical in pubclinical_data:
+        publication_id = surrogate_key(
+            pubclinical.source_file,
+            pubclinical.title,
+            pubclinical.date,
+            pubclinical.journal,
+        )
+        publications.setdefault(
+            publication_id,
+            {"publication_id": publication_id, **pubclinical.model_dump()},
+        )
+
+    drugs = {}
     for drug in drugs_data:
-        for pubclinical in pubclinical_data:
-            if drug.drug.lower() in pubclinical.title.lower():
-                row = {
-                    "drug": drug.drug,
-                    "journal": pubclinical.journal,
-                    "mention_date": pubclinical.date,
-                    "source_file": pubclinical.source_file,
-                }
-                try:
-                    cross_reference.append(CrossReference(**row))
-                except ValidationError as e:
-                    logging.error(
-                        f"Cross Reference Row with {row} failed validation: {e}"
-                    )
-                    cross_reference_errors.append(row)
-
-    return cross_reference, cross_reference_errors
+        drug_id = surrogate_key(drug.atccode)
+        if drug_id in drugs and drugs[drug_id]["drug"] != drug.drug:
+            logging.warning(
+                f"ATCCODE : {drug.atccode} is shared by {drugs[drug_id]['drug']} and {drug.drug}, keeping the first one"
+            )
+        drugs.setdefault(drug_id, {"drug_id": drug_id, **drug.model_dump()})
 
+    publications, drugs = list(publications.values()), list(drugs.values())
+    mention_fact = []
+    for drug_index, publication_index, score in mentions(
+        [publication["title"] for publication in publications],
+        [drug["drug"] for drug in drugs],
+        max_distance,
+    ):
+        mention = {
+            "publication_id": publications[publication_index]["publication_id"],
+            "drug_id": drugs[drug_index]["drug_id"],
+        }
+        if score is not None:
+            mention["match_score"] = score
+        mention_fact.append(mention)
+    return publications, drugs, mention_fact
 
-def _main_pipeline(
-    raw_pubclinical_data, raw_drug_data, silver_zone_path, trash_zone_path
+
+def save_while_consuming(
+    files: dict[pathlib.Path, list[dict]],
+    indent: int | None,
+    consume: Callable[[list[dict]], Any],
+    rows: list[dict],
 ) -> None:
+    """
+    Saves silver files in a background thread while `consume(rows)` runs in this one, and
+    returns once both are done: a stage is only committed once its outputs are written.
+    The rows are the model dumps, dates are datetime.date rather than their string.
+    `consume` gets its own list of the rows, it may reorder it (e.g. `sort_and_group_by_journal`
+    sorts in place) while they are being written.
+    """
+    with ThreadPoolExecutor(1) as pool:
+        saved = [
+            pool.submit(save_file_as_json, file, data, indent)
+            for file, data in files.items()
+        ]
+        consume(list(rows))
+        for future in saved:
+            future.result()
+
+
+def load_curated_data(file: pathlib.Path, model: type[BaseModel]) -> list[BaseModel]:
+    """Reads back curated rows saved by the pipeline, e.g. from a committed checkpoint."""
+    with open_file(file, "rb") as f:
+        return [model.model_validate(row) for row in json_codec.load(f)]
+
+
+def _main_pipeline(
+    raw_pubclinical_data,
+    raw_drug_data,
+    silver_zone_path,
+    trash_zone_path,
+    compression: str | None = None,
+    indent: int | None = 4,
+    workers: int = 1,
+    layout: str = "flat",
+    resume: str | None = None,
+    validation_cache: pathlib.Path | None = None,
+    fuzzy_distance: int = 0,
+    shard: tuple[int, int] | None = None,
+    consume: Callable[[list[dict]], Any] | None = None,
+) -> str:
     """
     Executes the main data processing pipeline.
     This function performs the following steps:
     1. Lists and curates public clinical trial data files.
     2. Saves valid public clinical trial data to the silver zone.
-    3. Saves any validation errors to the trash zone.
+    3. Streams any validation errors to the trash zone, see `RejectSink`.
     4. Lists and curates drug data files.
     5. Saves valid drug data to the silver zone.
     6. Saves any validation errors to the trash zone.
     7. Cross-references the curated publication/clinical trial data with the curated drug data.
     8. Saves the cross-referenced data to the silver zone.
     9. Saves any cross-referencing errors to the trash zone.
+    Each of the three stages (publications, drugs, cross reference) is committed to the
+    checkpoints of the run once its outputs are written, see `RunCheckpoints`. A resumed run
+    skips the stages committed with the same inputs and reads their outputs back instead.
     Args:
         raw_pubclinical_data (str): Path to the raw public clinical trial data.
         raw_drug_data (str): Path to the raw drug data.
         silver_zone_path (str): Path to the directory where valid data should be saved.
         trash_zone_path (str): Path to the directory where error data should be saved.
+        compression (str | None, optional): One of "gzip", "bz2", "xz" to compress the outputs. Defaults to None.
+        indent (int | None, optional): The JSON indentation of the outputs, None for compact JSON. Defaults to 4.
+        workers (int, optional): The number of processes ingesting the landing files in parallel. Defaults to 1.
+        layout (str, optional): "flat" writes the curated publications and drugs and the
+            denormalized cross reference, "star" writes the publication_dim, drug_dim and
+            mention_fact tables instead, see `star_schema_models`. Defaults to "flat".
+        resume (str | None, optional): The id of a failed run to resume. Defaults to None, a new run.
+        validation_cache (pathlib.Path | None, optional): The validation cache file, see `ValidationCache`. Defaults to None.
+        fuzzy_distance (int, optional): The typos allowed in the drug names found in titles,
+            see `cross_reference_models`. Defaults to 0, exact matching.
+        shard (tuple[int, int] | None, optional): Only process the publications of the shard
+            (index, count), see `servier.shards.in_shard`. The outputs are suffixed with the
+            shard and written to the shards directory of the silver zone, `merge-silver`
+            combines them. Defaults to None, all the publications.
+        consume (Callable[[list[dict]], Any] | None, optional): Called with the cross
+            reference rows while they are written to the silver zone, see `pipeline_stages`.
+            Defaults to None.
     Returns:
-        None
+        str: The run id.
+    Raises:
+        FileNotFoundError: If the resumed run has no checkpoints in the silver zone.
+        ValueError: If the resumed run was started with other compression, indent, layout, fuzzy distance or shard.
     """
+    parameters = {
+        "compression": compression,
+        "indent": indent,
+        "layout": layout,
+        "fuzzy_distance": fuzzy_distance,
+        "shard": list(shard) if shard else None,
+    }
+    if resume is None:
+        checkpoints = RunCheckpoints.start(silver_zone_path, parameters)
+    else:
+        checkpoints = RunCheckpoints.resume(silver_zone_path, resume, parameters)
+    stages = pipeline_stages(
+        checkpoints,
+        raw_pubclinical_data,
+        raw_drug_data,
+        silver_zone_path,
+        trash_zone_path,
+        compression,
+        indent,
+        workers,
+        layout,
+        validation_cache,
+        fuzzy_distance,
+        shard,
+        consume,
+    )
+    try:
+        run_stages(stages, checkpoints)
+    except BaseException:
+        logging.error(
+            "Run %s failed, resume it with --resume %s",
+            checkpoints.run_id,
+            checkpoints.run_id,
+        )
+        raise
+    return checkpoints.run_id
+
+
+def pipeline_stages(
+    checkpoints: RunCheckpoints,
+    raw_pubclinical_data,
+    raw_drug_data,
+    silver_zone_path,
+    trash_zone_path,
+    compression: str | None = None,
+    indent: int | None = 4,
+    workers: int = 1,
+    layout: str = "flat",
+    validation_cache: pathlib.Path | None = None,
+    fuzzy_distance: int = 0,
+    shard: tuple[int, int] | None = None,
+    consume: Callable[[list[dict]], Any] | None = None,
+) -> list[Stage]:
+    """
+    The stages of `_main_pipeline`: the curation of the publications and of the drugs,
+    which are independent, then the cross reference (or the star schema) reading both.
+    See `servier.dag.run_stages` for how they are scheduled and cached.
+    With `consume`, the last stage calls `consume(rows)` with the cross reference rows (the
+    star schema joined back, see `join_star_schema`) while its outputs are written in the
+    background, see `save_while_consuming`. It is not called when the stage is skipped.
+    """
+    run_date = checkpoints.run_date
+    ext = shard_suffix(shard) + ".json" + COMPRESSION_EXTENSIONS.get(compression, "")
+    if shard is not None:
+        # kept apart from the snapshots read by the gold commands until merge-silver
+        silver_zone_path = silver_zone_path / SHARDS_DIR
+        silver_zone_path.mkdir(exist_ok=True)
+    # the star layout does not publish the curated rows, they stay with the checkpoints
+    curated_zone_path = silver_zone_path if layout == "flat" else checkpoints.directory
+
     pubtrials_data_files = list_files_in_folder(
         raw_pubclinical_data, PUBTRIALS_FILE_NAMES
     )
-    valid_pubtrials_data, errors = curate_pubclinical_data(pubtrials_data_files)
-    save_file_as_json(
-        silver_zone_path / f"pubclinical_data_{now}.json",
-        [item.model_dump() for item in valid_pubtrials_data],
+    pubclinical_file = curated_zone_path / f"pubclinical_data_{run_date}{ext}"
+    pubclinical_errors_file = (
+        trash_zone_path / f"pubclinical_validation_errors_{run_date}{ext}"
     )
-    if errors:
+
+    def curate_publications(upstream) -> list[PubClinical]:
+        with RejectSink(pubclinical_errors_file, "Pubtrials", indent) as rejects:
+            valid_pubtrials_data, _ = curate_pubclinical_data(
+                pubtrials_data_files, workers, rejects, validation_cache, shard
+            )
         save_file_as_json(
-            trash_zone_path / f"pubclinical_validation_errors_{now}.json",
-            errors,
+            pubclinical_file,
+            [item.model_dump() for item in valid_pubtrials_data],
+            indent,
         )
-        del errors
+        return valid_pubtrials_data
 
     drugs_data_files = list_files_in_folder(raw_drug_data, DRUGS_FILE_NAMES)
-    valid_drugs_data, errors = curate_drugs_data(drugs_data_files)
+    drugs_file = curated_zone_path / f"drugs_data_{run_date}{ext}"
+    drugs_errors_file = trash_zone_path / f"drugs_validation_errors_{run_date}{ext}"
 
-    save_file_as_json(
-        silver_zone_path / f"drugs_data_{now}.json",
-        [item.model_dump() for item in valid_drugs_data],
-    )
-    if errors:
+    def curate_drugs(upstream) -> list[Drug]:
+        with RejectSink(drugs_errors_file, "Drug", indent) as rejects:
+            valid_drugs_data, _ = curate_drugs_data(
+                drugs_data_files, workers, rejects, validation_cache
+            )
         save_file_as_json(
-            trash_zone_path / f"drugs_validation_errors_{now}.json",
-            errors,
+            drugs_file, [item.model_dump() for item in valid_drugs_data], indent
         )
-        del errors
+        return valid_drugs_data
 
-    cross_reference_data, errors = cross_reference_models(
-        valid_pubtrials_data, valid_drugs_data
-    )
-    cross_reference_data_as_dict = [item.model_dump() for item in cross_reference_data]
-    save_file_as_json(
-        silver_zone_path / f"cross_reference_data_{now}.json",
-        cross_reference_data_as_dict,
-    )
-    if errors:
-        save_file_as_json(
-            trash_zone_path / f"cross_reference_errors_{now}.json",
-            errors,
-        )
-        del errors
+    stages = [
+        Stage(
+            "pubclinical",
+            pubtrials_data_files,
+            [pubclinical_file, pubclinical_errors_file],
+            curate_publications,
+            lambda: load_curated_data(pubclinical_file, PubClinical),
+        ),
+        Stage(
+            "drugs",
+            drugs_data_files,
+            [drugs_file, drugs_errors_file],
+            curate_drugs,
+            lambda: load_curated_data(drugs_file, Drug),
+        ),
+    ]
 
+    if layout == "star":
+        tables = ("publication_dim", "drug_dim", "mention_fact")
+        star_files = [silver_zone_path / f"{table}_{run_date}{ext}" for table in tables]
 
-def _journal_with_max_drugs(
-    silver_zone_path: pathlib.Path, gold_zone_path: pathlib.Path
-) -> None:
-    """
-    Identifies the journal with the maximum number of distinct drugs from the cross-reference data
-    and saves the result to a JSON file in the gold zone path.
-    Args:
-        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
-        gold_zone_path (pathlib.Path): Path to the directory where the result JSON file will be saved.
-    Returns:
-        None
-    Logs:
-        - Error if no cross-reference data is found in the silver zone path.
-        - Error if the silver data format is unexpected.
-    """
-    try:
-        file = list(silver_zone_path.glob("cross_reference_data_*.json"))[0]
-    except IndexError:
-        logging.error(
-            "No cross reference data found, please run the main pipeline first"
+        def write_star_schema(upstream) -> None:
+            star_schema = star_schema_models(
+                upstream("pubclinical"), upstream("drugs"), fuzzy_distance
+            )
+            if consume is None:
+                for file, rows in zip(star_files, star_schema):
+                    save_file_as_json(file, rows, indent)
+                return
+            save_while_consuming(
+                dict(zip(star_files, star_schema)),
+                indent,
+                consume,
+                join_star_schema(*star_schema),
+            )
+
+        stages.append(
+            Stage(
+                "star_schema",
+                [pubclinical_file, drugs_file],
+                star_files,
+                write_star_schema,
+                lambda: None,
+            )
         )
-        return
-    with open(file, "r") as f:
-        data = json.load(f)
-    try:
-        sorted_groups_by_journal = sort_and_group_by_journal(data)
-    except (TypeError, KeyError) as e:
-        logging.error(f"Unexpected silver data format {e}")
-    the_journal = journal_with_max_distinct_drugs(sorted_groups_by_journal)
-    if the_journal:
-        save_file_as_json(gold_zone_path / f"the_journal_{now}.json", the_journal)
+        return stages
 
+    cross_reference_file = silver_zone_path / f"cross_reference_data_{run_date}{ext}"
+    cross_reference_errors_file = (
+        trash_zone_path / f"cross_reference_errors_{run_date}{ext}"
+    )
 
-def _get_drugs_from_journals_that_mention_a_specific_drug(
-    silver_zone_path: pathlib.Path, gold_zone_path: pathlib.Path, drug_name: str
-) -> None:
-    """
-    Extracts and saves a list of drugs mentioned in journals that reference a specified drug.
-    This function reads cross-reference data from a JSON file in the silver zone directory,
-    identifies journals that mention the specified drug, and then finds all drugs mentioned
-    in those journals. The resulting list of drugs is saved as a JSON file in the gold zone directory.
-    Args:
-        silver_zone_path (pathlib.Path): Path to the directory containing the silver zone data.
-        gold_zone_path (pathlib.Path): Path to the directory where the output JSON file will be saved.
-        drug_name (str): The name of the drug to search for in the journals.
-    Returns:
-        None
-    Logs:
-        Error: If no cross-reference data is found or if there is an unexpected data format.
-        Warning: If the specified drug is not mentioned in any journal.
-    """
-    try:
-        file = list(silver_zone_path.glob("cross_reference_data_*.json"))[0]
-    except IndexError:
-        logging.error(
-            "No cross reference data found, please run the main pipeline first"
+    def cross_reference(upstream) -> None:
+        with RejectSink(
+            cross_reference_errors_file, "Cross Reference", indent
+        ) as rejects:
+            cross_reference_data, _ = cross_reference_models(
+                upstream("pubclinical"), upstream("drugs"), rejects, fuzzy_distance
+            )
+        cross_reference_data_as_dict = [
+            item.model_dump(exclude_none=True) for item in cross_reference_data
+        ]
+        if consume is None:
+            save_file_as_json(
+                cross_reference_file, cross_reference_data_as_dict, indent
+            )
+            return
+        save_while_consuming(
+            {cross_reference_file: cross_reference_data_as_dict},
+            indent,
+            consume,
+            cross_reference_data_as_dict,
+        )
+
+    stages.append(
+        Stage(
+            "cross_reference",
+            [pubclinical_file, drugs_file],
+            [cross_reference_file, cross_reference_errors_file],
+            cross_reference,
+            lambda: None,
         )
-        return
-    with open(file, "r") as f:
-        data = json.load(f)
-    try:
-        journals = get_all_journals_by_drug(data, drug_name)
-    except (TypeError, KeyError) as e:
-        logging.error(f"Unexpected silver data format {e}")
-    if not journals:
-        logging.warning(f"DRUG : {drug_name} is not mentionned in any journal")
-        return
-    drugs_by_journals = get_all_drugs_by_journals(
-        data, journals, **{"source_file": "pubmed"}
-    )
-    save_file_as_json(
-        gold_zone_path / f"drugs_by_journals_by_{drug_name}_{now}.json",
-        list(drugs_by_journals),
     )
+    return stages
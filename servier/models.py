@@ -31,7 +31,10 @@ class PubClinical(BaseModel):
     source_file: str
     source_file_type: str
 
-    model_config = ConfigDict(extra="ignore")
+    # the validators of the models are only built on first use, so importing this module
+    # stays cheap; worker processes are not forked while a build may be running, see
+    # `servier.utils.parallel_csv.process_pool`
+    model_config = ConfigDict(extra="ignore", defer_build=True)
 
 
 class Drug(BaseModel):
@@ -40,6 +43,8 @@ class Drug(BaseModel):
     source_file: str = "drugs.csv"
     source_file_type: str = "csv"
 
+    model_config = ConfigDict(defer_build=True)
+
 
 class CrossReference(BaseModel):
     drug: NonEmptyStr
@@ -47,3 +52,7 @@ class CrossReference(BaseModel):
     mention_date: Date
     source_file: str
     ingestion_timestamp: datetime.datetime = datetime.datetime.now()
+    # only set by the fuzzy matching, dumped with exclude_none otherwise
+    match_score: float | None = None
+
+    model_config = ConfigDict(defer_build=True)
@@ -0,0 +1,84 @@
+import logging
+import pathlib
+from typing import (
+    Any,
+    Iterable,
+)
+
+from .gold import (
+    GoldOutput,
+    _gold_build,
+    compute_gold_outputs,
+    gold_outputs,
+    save_gold_outputs,
+)
+from .main import _main_pipeline
+
+
+def run_all(
+    raw_pubclinical_data: pathlib.Path,
+    raw_drug_data: pathlib.Path,
+    silver_zone_path: pathlib.Path,
+    trash_zone_path: pathlib.Path,
+    gold_zone_path: pathlib.Path,
+    drug_names: Iterable[str] = (),
+    outputs: list[GoldOutput] | None = None,
+    compression: str | None = None,
+    indent: int | None = 4,
+    workers: int = 1,
+    layout: str = "flat",
+    validation_cache: pathlib.Path | None = None,
+    fuzzy_distance: int = 0,
+) -> dict[str, Any] | None:
+    """
+    Runs the main pipeline and builds the gold outputs in the same process, without reading
+    the silver snapshot back: the gold outputs are computed from the cross reference rows
+    in memory while the silver outputs are written in the background, see
+    `servier.main.save_while_consuming`. The gold files are those of `_gold_build`, they
+    are saved once the silver outputs are written and the run committed.
+    When the cross reference stage is up to date (e.g. the landing files did not change
+    since the last run) it is skipped, the gold outputs are then built from the silver zone.
+    Usage:
+        run_all(publications, drugs, silver, trash, gold, drug_names=["ASPIRIN"])
+    Args:
+        raw_pubclinical_data (pathlib.Path): Path to the raw public clinical trial data.
+        raw_drug_data (pathlib.Path): Path to the raw drug data.
+        silver_zone_path (pathlib.Path): Path to the directory where valid data should be saved.
+        trash_zone_path (pathlib.Path): Path to the directory where error data should be saved.
+        gold_zone_path (pathlib.Path): Path to the directory where the gold outputs are saved.
+        drug_names (Iterable[str], optional): The drugs to save the drugs from the journals
+            mentioning them of, see `gold_outputs`. Defaults to none.
+        outputs (list[GoldOutput] | None, optional): The gold outputs to build. Defaults to
+            None, `gold_outputs(drug_names)`.
+        The other arguments are those of `_main_pipeline`.
+    Returns:
+        dict[str, Any] | None: The gold results saved by file name, None if there is no
+            cross reference.
+    """
+    if outputs is None:
+        outputs = gold_outputs(drug_names)
+    results = None
+
+    def consume(rows: list[dict]) -> None:
+        nonlocal results
+        results = compute_gold_outputs(rows, outputs)
+
+    run_id = _main_pipeline(
+        raw_pubclinical_data,
+        raw_drug_data,
+        silver_zone_path,
+        trash_zone_path,
+        compression=compression,
+        indent=indent,
+        workers=workers,
+        layout=layout,
+        validation_cache=validation_cache,
+        fuzzy_distance=fuzzy_distance,
+        consume=consume,
+    )
+    if results is None:
+        logging.info(f"Run {run_id}: cross reference up to date, gold read from silver")
+        return _gold_build(silver_zone_path, gold_zone_path, outputs=outputs)
+    if results:
+        save_gold_outputs(gold_zone_path, results)
+    return results
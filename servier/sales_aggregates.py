@@ -0,0 +1,119 @@
+import datetime
+import logging
+
+# Aggregates of the sales warehouse built by duckdb_env_setup.py. They are kept at the
+# day grain so that any date range of question1.sql / question2.sql can be answered
+# from them, see question1_aggregates.sql and question2_aggregates.sql.
+CREATE_AGGREGATES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS DAILY_SALES (
+        date DATE PRIMARY KEY,
+        ventes DECIMAL(38, 2)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS CLIENT_PRODUCT_TYPE_SALES (
+        date DATE,
+        client_id INT,
+        product_type VARCHAR(20),
+        ventes DECIMAL(38, 2),
+        PRIMARY KEY (date, client_id, product_type)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS AGGREGATES_WATERMARK (
+        last_order_id BIGINT,
+        refreshed_at TIMESTAMP
+    )
+    """,
+]
+
+REFRESH_DAILY_SALES_SQL = """
+    INSERT INTO DAILY_SALES
+    SELECT date, SUM(prod_price * prod_qty)
+    FROM TRANSACTIONS
+    WHERE order_id > $low AND order_id <= $high
+    GROUP BY date
+    ON CONFLICT (date) DO UPDATE SET ventes = ventes + EXCLUDED.ventes
+"""
+
+REFRESH_CLIENT_PRODUCT_TYPE_SALES_SQL = """
+    INSERT INTO CLIENT_PRODUCT_TYPE_SALES
+    SELECT TRANSACTIONS.date, TRANSACTIONS.client_id, PRODUCTS.product_type,
+           SUM(TRANSACTIONS.prod_price * TRANSACTIONS.prod_qty)
+    FROM TRANSACTIONS
+    JOIN PRODUCTS ON TRANSACTIONS.prod_id = PRODUCTS.product_id
+    WHERE TRANSACTIONS.order_id > $low AND TRANSACTIONS.order_id <= $high
+    GROUP BY ALL
+    ON CONFLICT (date, client_id, product_type) DO UPDATE SET ventes = ventes + EXCLUDED.ventes
+"""
+
+
+AGGREGATE_TABLES = ["DAILY_SALES", "CLIENT_PRODUCT_TYPE_SALES", "AGGREGATES_WATERMARK"]
+
+
+def drop_aggregates(conn) -> None:
+    """Drops the aggregate tables and the watermark, the next refresh rebuilds them."""
+    for table in AGGREGATE_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def create_aggregates(conn) -> None:
+    """Creates the aggregate tables and the watermark if they do not exist yet."""
+    for sql in CREATE_AGGREGATES_SQL:
+        conn.execute(sql)
+
+
+def get_watermark(conn) -> int:
+    """Returns the highest order_id already folded into the aggregates, 0 if none."""
+    row = conn.execute("SELECT max(last_order_id) FROM AGGREGATES_WATERMARK").fetchone()
+    return row[0] or 0
+
+
+def refresh_aggregates(conn) -> int:
+    """
+    Folds the transactions inserted since the last refresh into the aggregate tables.
+    New transactions are found with a high-water mark on `order_id`, which assumes that
+    TRANSACTIONS is append-only with increasing order ids: updated or deleted transactions,
+    or products changing type, require a rebuild (`drop_aggregates` and refresh).
+    The aggregates are rebuilt when the watermark is above the highest order_id, e.g.
+    after TRANSACTIONS was generated again with fewer rows.
+    The aggregates and the watermark are updated in a single transaction.
+    Args:
+        conn (duckdb.DuckDBPyConnection): The connection to the sales database.
+    Returns:
+        int: The number of transactions folded into the aggregates.
+    """
+    create_aggregates(conn)
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        low = get_watermark(conn)
+        (last_order_id,) = conn.execute(
+            "SELECT max(order_id) FROM TRANSACTIONS"
+        ).fetchone()
+        if low > (last_order_id or 0):
+            logging.warning(
+                f"Aggregates watermark {low} above the last order_id {last_order_id}, "
+                "rebuilding the aggregates"
+            )
+            drop_aggregates(conn)
+            create_aggregates(conn)
+            low = 0
+        high, count = conn.execute(
+            "SELECT max(order_id), count(*) FROM TRANSACTIONS WHERE order_id > $low",
+            {"low": low},
+        ).fetchone()
+        if count:
+            bounds = {"low": low, "high": high}
+            conn.execute(REFRESH_DAILY_SALES_SQL, bounds)
+            conn.execute(REFRESH_CLIENT_PRODUCT_TYPE_SALES_SQL, bounds)
+            conn.execute("DELETE FROM AGGREGATES_WATERMARK")
+            conn.execute(
+                "INSERT INTO AGGREGATES_WATERMARK VALUES ($high, $now)",
+                {"high": high, "now": datetime.datetime.now()},
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return count
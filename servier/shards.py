@@ -0,0 +1,178 @@
+import datetime
+import json
+import logging
+import pathlib
+import re
+
+from .config import (
+    SHARD_FILE_PATTERN,
+    SHARD_FILE_SUFFIX,
+    SHARDS_DIR,
+)
+from .utils import json_codec
+from .utils.helpers import (
+    open_file,
+    save_file_as_json,
+    surrogate_key,
+)
+
+# Index of the merged shard snapshots, in the shards directory of the silver zone
+SHARD_CATALOG = "catalog.json"
+# The datasets in the order they are merged: the fact / cross reference last, so that the
+# gold readers never see it before the tables it references.
+DATASETS = [
+    "pubclinical_data",
+    "drugs_data",
+    "publication_dim",
+    "drug_dim",
+    "cross_reference_data",
+    "mention_fact",
+]
+
+
+def shard_suffix(shard: tuple[int, int] | None) -> str:
+    """The suffix of the files written by a shard (index, count), "" without sharding."""
+    if shard is None:
+        return ""
+    index, count = shard
+    return SHARD_FILE_SUFFIX.format(index=index, count=count)
+
+
+def in_shard(row: dict, shard: tuple[int, int]) -> bool:
+    """
+    Whether a raw publication belongs to the shard (index, count).
+    Publications are assigned by a stable hash of their natural key, so every node computes
+    the same split of the same landing files, and identical publications land in the same
+    shard.
+    """
+    index, count = shard
+    key = surrogate_key(
+        row.get("source_file"), row.get("title"), row.get("date"), row.get("journal")
+    )
+    return key % count == index
+
+
+def _dedup_key(dataset: str, row: dict) -> str | tuple | None:
+    if dataset == "publication_dim":
+        return row["publication_id"]
+    if dataset == "drug_dim":
+        return row["drug_id"]
+    if dataset == "mention_fact":
+        return row["publication_id"], row["drug_id"]
+    if dataset == "drugs_data":
+        return json.dumps(row, sort_keys=True)
+    # the publications and their cross reference rows are partitioned by the shards, and
+    # have no key: identical rows come from distinct publications, as in an unsharded run
+    return None
+
+
+def merge_shard_rows(dataset: str, shards: list[list[dict]]) -> tuple[list[dict], int]:
+    """
+    Concatenates the rows of the shards of a dataset in shard order, dropping the rows
+    already contributed by another shard: the drugs every node curated, and the dimension
+    and fact rows whose key was already merged. Duplicates within a shard are kept, as in
+    an unsharded run.
+    Returns:
+        tuple[list[dict], int]: The merged rows and the number of duplicates dropped.
+    """
+    owner, merged, duplicates = {}, [], 0
+    for index, rows in enumerate(shards):
+        for row in rows:
+            key = _dedup_key(dataset, row)
+            if key is None or owner.setdefault(key, index) == index:
+                merged.append(row)
+            else:
+                duplicates += 1
+    return merged, duplicates
+
+
+def find_shard_files(shards_path: pathlib.Path) -> dict[str, dict[str, list]]:
+    """
+    Lists the shard files by run date then dataset.
+    Returns:
+        dict[str, dict[str, list]]: {run_date: {dataset: [(index, count, file), ...]}}
+    """
+    found = {}
+    for file in shards_path.glob("*_shard-*"):
+        match = re.fullmatch(SHARD_FILE_PATTERN, file.name)
+        if match is None:
+            continue
+        found.setdefault(match["run_date"], {}).setdefault(match["dataset"], []).append(
+            (int(match["index"]), int(match["count"]), file)
+        )
+    return found
+
+
+def merge_silver(
+    silver_zone_path: pathlib.Path, run_date: str | None = None, indent: int | None = 4
+) -> dict:
+    """
+    Merges the outputs of the shards of a sharded main-pipeline run into a single silver
+    snapshot, as an unsharded run would have written it, see `merge_shard_rows`.
+    The merged files keep the run date and the compression of the shards, and the merge is
+    recorded in the shard catalog `<silver zone>/shards/catalog.json`.
+    Args:
+        silver_zone_path (pathlib.Path): The silver zone the shards were written to.
+        run_date (str | None, optional): The run date of the shards to merge. Defaults to the latest one.
+        indent (int | None, optional): The JSON indentation of the outputs. Defaults to 4.
+    Returns:
+        dict: The catalog entry of the merge.
+    Raises:
+        FileNotFoundError: If there are no shard files (for this run date).
+        ValueError: If shards are missing or the shards disagree on the shard count.
+    """
+    shards_path = silver_zone_path / SHARDS_DIR
+    found = find_shard_files(shards_path) if shards_path.is_dir() else {}
+    if run_date is None and found:
+        run_date = max(found)
+    if run_date not in found:
+        raise FileNotFoundError(f"No shard outputs to merge in {shards_path}")
+    datasets = found[run_date]
+    counts = {count for files in datasets.values() for _, count, _ in files}
+    if len(counts) != 1:
+        raise ValueError(
+            f"Shards of {run_date} have several shard counts {sorted(counts)}"
+        )
+    (shard_count,) = counts
+    for dataset, files in datasets.items():
+        missing = set(range(shard_count)) - {index for index, _, _ in files}
+        if missing:
+            raise ValueError(
+                f"Missing shards {sorted(missing)} of {dataset} for {run_date}"
+            )
+
+    entry = {
+        "shard_count": shard_count,
+        "merged_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "datasets": {},
+    }
+    for dataset in DATASETS:
+        if dataset not in datasets:
+            continue
+        files = [file for _, _, file in sorted(datasets[dataset])]
+        shards = []
+        for file in files:
+            with open_file(file, "rb") as f:
+                shards.append(json_codec.load(f))
+        rows, duplicates = merge_shard_rows(dataset, shards)
+        ext = re.fullmatch(SHARD_FILE_PATTERN, files[0].name)["ext"]
+        output = silver_zone_path / f"{dataset}_{run_date}{ext}"
+        save_file_as_json(output, rows, indent)
+        logging.info(
+            f"{dataset}: {len(files)} shards merged into {output.name}, {duplicates} duplicates dropped"
+        )
+        entry["datasets"][dataset] = {
+            "file": output.name,
+            "shards": [file.name for file in files],
+            "rows": len(rows),
+            "duplicates": duplicates,
+        }
+
+    catalog_file = shards_path / SHARD_CATALOG
+    catalog = {}
+    if catalog_file.exists():
+        with open(catalog_file, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+    catalog[run_date] = entry
+    save_file_as_json(catalog_file, catalog)
+    return entry
@@ -0,0 +1,137 @@
+import datetime
+import math
+import pathlib
+import re
+import statistics
+import time
+
+DATE_RANGE_PATTERN = re.compile(
+    r"BETWEEN\s+'\d{4}-\d{2}-\d{2}'\s+AND\s+'\d{4}-\d{2}-\d{2}'", re.IGNORECASE
+)
+
+
+def render_query(sql: str, start_date: datetime.date, end_date: datetime.date) -> str:
+    """
+    Replaces the date range of a sales query (`BETWEEN 'YYYY-MM-DD' AND 'YYYY-MM-DD'`).
+    Dates are inlined as literals rather than bound as parameters so that DuckDB can
+    use them for filter pushdown exactly as in the original query.
+    Args:
+        sql (str): The query, e.g. the content of question1.sql.
+        start_date (datetime.date): The first day of the range.
+        end_date (datetime.date): The last day of the range.
+    Returns:
+        str: The query with the new date range.
+    Raises:
+        ValueError: If the query has no date range to replace.
+    """
+    rendered, count = DATE_RANGE_PATTERN.subn(
+        f"BETWEEN '{start_date.isoformat()}' AND '{end_date.isoformat()}'", sql
+    )
+    if not count:
+        raise ValueError("No BETWEEN 'YYYY-MM-DD' AND 'YYYY-MM-DD' date range found")
+    return rendered
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Returns the nearest-rank percentile `q` (0-100) of a non empty list of values."""
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def benchmark_query(
+    conn, sql: str, repeat: int = 5, warmup: int = 1
+) -> tuple[dict[str, float], int, str]:
+    """
+    Times a query and captures its EXPLAIN ANALYZE profile.
+    The profile is captured in a separate run so that profiling does not skew the timings.
+    Args:
+        conn (duckdb.DuckDBPyConnection): The connection to the database.
+        sql (str): The query.
+        repeat (int, optional): The number of timed runs. Defaults to 5.
+        warmup (int, optional): The number of untimed runs executed first. Defaults to 1.
+    Returns:
+        tuple[dict[str, float], int, str]: The latency statistics in milliseconds,
+            the number of rows returned and the EXPLAIN ANALYZE profile.
+    """
+    for _ in range(warmup):
+        conn.execute(sql).fetchall()
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = conn.execute(sql).fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    profile = "\n".join(
+        row[-1] for row in conn.execute(f"EXPLAIN ANALYZE {sql}").fetchall()
+    )
+    latency_ms = {
+        "min": min(latencies),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+        "mean": statistics.fmean(latencies),
+    }
+    return {k: round(v, 3) for k, v in latency_ms.items()}, len(rows), profile
+
+
+def run_sql_benchmark(
+    db_paths: list[pathlib.Path],
+    queries: list[pathlib.Path],
+    start_date: datetime.date,
+    end_date: datetime.date,
+    profile_dir: pathlib.Path,
+    repeat: int = 5,
+    warmup: int = 1,
+) -> dict:
+    """
+    Benchmarks the sales queries against DuckDB databases of different scales.
+    Each database is a scale, e.g. generated with `duckdb_env_setup.py --transactions N`.
+    The EXPLAIN ANALYZE profile of each (scale, query) run is saved in `profile_dir`.
+    Args:
+        db_paths (list[pathlib.Path]): The DuckDB databases, one per scale.
+        queries (list[pathlib.Path]): The SQL files, e.g. question1.sql and question2.sql.
+        start_date (datetime.date): The first day of the date range of the queries.
+        end_date (datetime.date): The last day of the date range of the queries.
+        profile_dir (pathlib.Path): Where the EXPLAIN ANALYZE profiles are saved.
+        repeat (int, optional): The number of timed runs per query. Defaults to 5.
+        warmup (int, optional): The number of untimed runs per query. Defaults to 1.
+    Returns:
+        dict: The report, comparable between runs since it records the parameters used.
+    """
+    import duckdb
+
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    results = []
+    for db_path in db_paths:
+        with duckdb.connect(str(db_path), read_only=True) as conn:
+            (transactions,) = conn.execute(
+                "SELECT count(*) FROM TRANSACTIONS"
+            ).fetchone()
+            for query in queries:
+                sql = render_query(query.read_text(), start_date, end_date)
+                latency_ms, rows_returned, profile = benchmark_query(
+                    conn, sql, repeat, warmup
+                )
+                profile_file = profile_dir / f"{db_path.stem}_{query.stem}.txt"
+                profile_file.write_text(profile)
+                results.append(
+                    {
+                        "scale": db_path.stem,
+                        "db_path": str(db_path),
+                        "transactions": transactions,
+                        "query": query.stem,
+                        "rows_returned": rows_returned,
+                        "latency_ms": latency_ms,
+                        "profile": str(profile_file),
+                    }
+                )
+    return {
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "duckdb_version": duckdb.__version__,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "repeat": repeat,
+        "warmup": warmup,
+        "results": results,
+    }
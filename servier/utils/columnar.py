@@ -0,0 +1,178 @@
+import bisect
+import json
+import logging
+import pathlib
+from typing import (
+    Iterable,
+    NamedTuple,
+)
+
+import numpy as np
+
+from .helpers import atomic_open
+
+# The cross reference columns kept by the store, ingestion_timestamp is not used by the
+# gold zone and is dropped.
+COLUMNS = ("drug", "journal", "source_file", "mention_date")
+
+
+class Column(NamedTuple):
+    """A dictionary encoded column: `values[codes[i]]` is the value of row i."""
+
+    values: list
+    codes: np.ndarray
+
+    def code_of(self, value) -> int:
+        """Returns the code of a value, -1 if the value is not in the dictionary."""
+        # values are sorted, see _encode
+        index = bisect.bisect_left(self.values, _sort_key(value), key=_sort_key)
+        if index < len(self.values) and self.values[index] == value:
+            return index
+        return -1
+
+    def decode(self, codes: Iterable[int]) -> list:
+        return [self.values[code] for code in codes]
+
+
+def _sort_key(value) -> tuple:
+    # None (missing value) sorts last
+    return value is None, value or ""
+
+
+def _encode(values: list) -> Column:
+    """Encodes a column, the dictionary is sorted so that code order is value order."""
+    dictionary = sorted(dict.fromkeys(values), key=_sort_key)
+    index = {value: code for code, value in enumerate(dictionary)}
+    codes = np.fromiter(map(index.__getitem__, values), np.int32, len(values))
+    return Column(dictionary, codes)
+
+
+def _json_array(value) -> np.ndarray:
+    # names are stored as JSON bytes rather than fixed width unicode arrays
+    return np.frombuffer(json.dumps(value).encode("utf-8"), np.uint8)
+
+
+def _from_json_array(array: np.ndarray):
+    return json.loads(array.tobytes().decode("utf-8"))
+
+
+def _distinct(codes: np.ndarray) -> np.ndarray:
+    """Sorted distinct codes, np.sort + neighbour comparison is much faster than np.unique."""
+    codes = np.sort(codes)
+    if len(codes):
+        codes = codes[np.concatenate(([True], codes[1:] != codes[:-1]))]
+    return codes
+
+
+class CrossReferenceStore:
+    """
+    Columnar, dictionary encoded view of a cross reference snapshot.
+    Each column is stored once as its distinct values plus one int32 code per row, instead
+    of one dict per row repeating the drug, journal, source file and date strings.
+    The gold aggregations then run as NumPy operations on the code arrays.
+    """
+
+    def __init__(self, columns: dict[str, Column]):
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> "CrossReferenceStore":
+        """
+        Encodes cross reference rows, e.g. as loaded by `load_cross_reference_data`.
+        Rows without a drug or a journal are skipped, missing source files and dates are
+        encoded as None.
+        Args:
+            rows (Iterable[dict]): The cross reference rows.
+        Returns:
+            CrossReferenceStore: The encoded rows.
+        """
+        valid_rows = []
+        for row in rows:
+            if "drug" in row and "journal" in row:
+                valid_rows.append(row)
+            else:
+                logging.error(f"KeyError: {'journal' if 'drug' in row else 'drug'}")
+        return cls(
+            {name: _encode([row.get(name) for row in valid_rows]) for name in COLUMNS}
+        )
+
+    def __len__(self) -> int:
+        return len(self.columns["drug"].codes)
+
+    def save(self, path: pathlib.Path, **metadata) -> None:
+        """Saves the store to an uncompressed .npz file, with JSON serializable metadata, see `atomic_open`."""
+        arrays = {"metadata": _json_array(metadata)}
+        for name, column in self.columns.items():
+            arrays[f"{name}.values"] = _json_array(column.values)
+            arrays[f"{name}.codes"] = column.codes
+        with atomic_open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> tuple["CrossReferenceStore", dict]:
+        """Loads a store saved by `save`, returns it with its metadata."""
+        with np.load(path) as arrays:
+            store = cls(
+                {
+                    name: Column(
+                        _from_json_array(arrays[f"{name}.values"]),
+                        arrays[f"{name}.codes"],
+                    )
+                    for name in COLUMNS
+                }
+            )
+            return store, _from_json_array(arrays["metadata"])
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the code arrays."""
+        return sum(column.codes.nbytes for column in self.columns.values())
+
+    def journal_with_max_distinct_drugs(self) -> str | None:
+        """
+        Determines the journal that mentions the maximum number of distinct drugs.
+        Ties are broken by taking the first journal in alphabetical order, as
+        `journal_with_max_distinct_drugs` does on the sorted groups.
+        Returns:
+            str | None: The journal, None if the store is empty.
+        """
+        if not len(self):
+            return None
+        drugs, journals = self.columns["drug"], self.columns["journal"]
+        # one int64 per distinct (journal, drug) pair
+        pairs = _distinct(
+            journals.codes.astype(np.int64) * len(drugs.values) + drugs.codes
+        )
+        distinct_drugs = np.bincount(
+            pairs // len(drugs.values), minlength=len(journals.values)
+        )
+        return journals.values[int(np.argmax(distinct_drugs))]
+
+    def journals_by_drug(self, drug: str) -> set[str]:
+        """Same as `get_all_journals_by_drug`: journals mentioning the drug, case insensitive."""
+        drugs, journals = self.columns["drug"], self.columns["journal"]
+        drug = drug.lower().strip()
+        matches = [
+            code for code, value in enumerate(drugs.values) if value.lower() == drug
+        ]
+        mask = np.isin(drugs.codes, matches)
+        return set(journals.decode(_distinct(journals.codes[mask])))
+
+    def drugs_by_journals(self, journals: Iterable[str], **extra_filters) -> set[str]:
+        """
+        Same as `get_all_drugs_by_journals`: drugs mentioned in the given journals.
+        Args:
+            journals (Iterable[str]): The journal names.
+            **extra_filters: Additional filters to apply. Currently supports:
+                - source_file (str): Only include drugs mentioned in this source file.
+        Returns:
+            set[str]: The drug names.
+        """
+        drugs, journal_column = self.columns["drug"], self.columns["journal"]
+        journal_codes = [journal_column.code_of(journal) for journal in journals]
+        mask = np.isin(journal_column.codes, journal_codes)
+        source_file = extra_filters.get("source_file")
+        if source_file:
+            source_files = self.columns["source_file"]
+            mask &= source_files.codes == source_files.code_of(source_file)
+        return set(drugs.decode(_distinct(drugs.codes[mask])))
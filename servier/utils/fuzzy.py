@@ -0,0 +1,174 @@
+import collections
+import re
+from typing import Iterator
+
+TOKEN_PATTERN = re.compile(r"\w+")
+# length of the character n-grams of the index
+NGRAM_SIZE = 3
+
+
+def edit_distance(pattern: str, text: str, max_distance: int | None = None) -> int:
+    """
+    Levenshtein distance between two strings, with the bit-parallel algorithm of Myers
+    (1999) in the formulation of Hyyrö (2001): the column of the dynamic programming
+    matrix is held as bit vectors of vertical deltas, updated once per character of `text`
+    with a handful of integer operations, whatever the length of `pattern`.
+    Args:
+        pattern (str): The first string.
+        text (str): The second string.
+        max_distance (int | None, optional): Stop as soon as the distance is known to be
+            above it, `max_distance + 1` is then returned. Defaults to None, no bound.
+    Returns:
+        int: The distance, or `max_distance + 1` if it is above `max_distance`.
+    """
+    length = len(pattern)
+    if not length:
+        distance = len(text)
+        return distance if max_distance is None else min(distance, max_distance + 1)
+    peq = collections.defaultdict(int)
+    for i, char in enumerate(pattern):
+        peq[char] |= 1 << i
+    mask = (1 << length) - 1
+    last = 1 << (length - 1)
+    pv, mv, distance = mask, 0, length
+    remaining = len(text)
+    for char in text:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            distance += 1
+        elif mh & last:
+            distance -= 1
+        remaining -= 1
+        # the last row decreases by at most one per remaining character
+        if max_distance is not None and distance - remaining > max_distance:
+            return max_distance + 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    if max_distance is not None and distance > max_distance:
+        return max_distance + 1
+    return distance
+
+
+def ngrams(token: str) -> set[str]:
+    """The distinct character n-grams of a token, padded with a space on each side."""
+    padded = f" {token} "
+    return {
+        padded[i : i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)
+    } or {padded}
+
+
+def match_score(distance: int, drug: str) -> float:
+    """1.0 for an exact match, decreasing with the edit distance relative to the drug length."""
+    return round(1 - distance / len(drug), 4)
+
+
+class TitleIndex:
+    """
+    Character n-gram index over the distinct tokens of publication titles, to find the
+    titles mentioning a drug with typos ("diphenhydramin", "betametasone").
+    A drug is compared with the windows of as many consecutive title tokens as it has
+    words. Comparing it with all the windows would be far too slow, so candidates are
+    first selected with the index: an edit changes at most NGRAM_SIZE n-grams, so a window
+    within `k` edits of the drug shares at least `len(ngrams(drug)) - k * NGRAM_SIZE` of
+    its n-grams, and differs in length by at most `k`. The candidates are then verified
+    with `edit_distance`.
+    Usage:
+        index = TitleIndex(titles)
+        for title_index, score in index.matches("betamethasone", 2).items():
+            ...
+    """
+
+    def __init__(self, titles: list[str]) -> None:
+        self.tokens = [TOKEN_PATTERN.findall(title.lower()) for title in titles]
+        # per window size (number of words): window -> titles, n-gram -> windows
+        self._windows: dict[int, dict[str, set[int]]] = {}
+        self._postings: dict[int, dict[str, list[str]]] = {}
+
+    def _index(self, size: int) -> None:
+        if size in self._windows:
+            return
+        windows = collections.defaultdict(set)
+        for title_index, tokens in enumerate(self.tokens):
+            for i in range(len(tokens) - size + 1):
+                windows[" ".join(tokens[i : i + size])].add(title_index)
+        postings = collections.defaultdict(list)
+        for window in windows:
+            for gram in ngrams(window):
+                postings[gram].append(window)
+        self._windows[size], self._postings[size] = windows, postings
+
+    def candidates(self, drug: str, max_distance: int) -> list[str]:
+        """The windows passing the n-gram count and length filters for a (lowercase) drug."""
+        size = len(drug.split(" "))
+        self._index(size)
+        grams = ngrams(drug)
+        threshold = len(grams) - max_distance * NGRAM_SIZE
+        if threshold <= 0:
+            # too short for the filter to be exact, only the length filter applies
+            windows = self._windows[size]
+        else:
+            counts = collections.Counter(
+                window
+                for gram in grams
+                for window in self._postings[size].get(gram, ())
+            )
+            windows = [window for window, count in counts.items() if count >= threshold]
+        return [
+            window for window in windows if abs(len(window) - len(drug)) <= max_distance
+        ]
+
+    def matches(self, drug: str, max_distance: int) -> dict[int, float]:
+        """
+        Finds the titles with a window of tokens within `max_distance` edits of the drug.
+        Args:
+            drug (str): The drug name, matched case insensitively.
+            max_distance (int): The maximum edit distance.
+        Returns:
+            dict[int, float]: The best `match_score` of each matching title, by title index.
+        """
+        drug = " ".join(TOKEN_PATTERN.findall(drug.lower()))
+        if not drug:
+            return {}
+        scores = {}
+        for window in self.candidates(drug, max_distance):
+            distance = edit_distance(drug, window, max_distance)
+            if distance > max_distance:
+                continue
+            score = match_score(distance, drug)
+            for title_index in self._windows[len(drug.split(" "))][window]:
+                scores[title_index] = max(score, scores.get(title_index, score))
+        return scores
+
+
+def fuzzy_mentions(
+    titles: list[str], drugs: list[str], max_distance: int
+) -> Iterator[tuple[int, int, float]]:
+    """
+    Finds the drugs mentioned in titles, allowing typos.
+    A drug whose name is a substring of a title matches it with a score of 1.0, as in the
+    exact matching. Otherwise, it matches the titles with a window of tokens within
+    `max_distance` edits of its name, see `TitleIndex`. Short names are matched with fewer
+    edits: at most one edit per 4 characters, so that "ASA" does not match "USA".
+    Args:
+        titles (list[str]): The publication titles.
+        drugs (list[str]): The drug names.
+        max_distance (int): The maximum edit distance.
+    Yields:
+        tuple[int, int, float]: (drug index, title index, score), by drug then title index.
+    """
+    index = TitleIndex(titles)
+    lower_titles = [title.lower() for title in titles]
+    for drug_index, drug in enumerate(drugs):
+        lower_drug = drug.lower()
+        scores = index.matches(drug, min(max_distance, len(drug) // 4))
+        for title_index, title in enumerate(lower_titles):
+            if lower_drug in title:
+                scores[title_index] = 1.0
+        for title_index in sorted(scores):
+            yield drug_index, title_index, scores[title_index]
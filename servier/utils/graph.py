@@ -0,0 +1,369 @@
+import datetime
+import pathlib
+from typing import (
+    Iterable,
+    NamedTuple,
+)
+
+import numpy as np
+
+from ..config import GRAPH_EDGE_TYPES
+from .columnar import (
+    Column,
+    _encode,
+    _from_json_array,
+    _json_array,
+    _sort_key,
+)
+from .helpers import atomic_open
+
+NODE_TYPES = ("drug", "journal", "publication")
+EDGE_TYPES = GRAPH_EDGE_TYPES
+
+
+class Adjacency(NamedTuple):
+    """
+    CSR adjacency of an edge type in one direction: the edges of the source node `v` are
+    the positions `indptr[v]:indptr[v + 1]` of the target, date and source file arrays,
+    sorted by target.
+    """
+
+    indptr: np.ndarray
+    targets: np.ndarray
+    dates: np.ndarray
+    source_files: np.ndarray
+
+    @classmethod
+    def from_edges(
+        cls,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        dates: np.ndarray,
+        source_files: np.ndarray,
+        node_count: int,
+    ) -> "Adjacency":
+        order = np.lexsort((targets, sources))
+        indptr = np.zeros(node_count + 1, np.int64)
+        np.cumsum(np.bincount(sources, minlength=node_count), out=indptr[1:])
+        return cls(indptr, targets[order], dates[order], source_files[order])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self)
+
+
+def _distinct_edges(*columns: np.ndarray) -> list[np.ndarray]:
+    """Drops the repeated edges, e.g. a drug mentioned twice by a journal the same day."""
+    edges = np.unique(np.stack([column.astype(np.int64) for column in columns]), axis=1)
+    return [edge.astype(column.dtype) for edge, column in zip(edges, columns)]
+
+
+def _publication_nodes(publications: list[dict]) -> Column:
+    """
+    One node per publication, named by its title. Titles may repeat (e.g. a trial in pubmed
+    and in clinical_trials): the publications sharing one are ordered by id and all found
+    by `CrossReferenceGraph.find`.
+    """
+    order = sorted(
+        range(len(publications)),
+        key=lambda i: (
+            _sort_key(publications[i]["title"]),
+            publications[i]["publication_id"],
+        ),
+    )
+    codes = np.empty(len(publications), np.int32)
+    codes[order] = np.arange(len(publications), dtype=np.int32)
+    return Column([publications[i]["title"] for i in order], codes)
+
+
+def _dates(values: list) -> np.ndarray:
+    # dates are written as YYYY-MM-DD, missing ones become NaT
+    return np.array(values, dtype="datetime64[D]")
+
+
+class CrossReferenceGraph:
+    """
+    Compact graph of the drugs, journals and publications of a cross reference snapshot.
+    Nodes are integer ids per node type, the index of their name in the sorted `nodes`
+    columns. Each edge type is stored as two CSR `Adjacency` arrays, one per direction,
+    whose edges carry the date and the source file of the mention. Traversals only read
+    the slices of the nodes they visit, so they run in time proportional to the size of
+    the neighbourhood, not of the graph.
+    - mentioned_in: drug -> journal, one edge per distinct (date, source file).
+    - mentions: publication -> drug, and published_in: publication -> journal, only with
+      the star schema layout: the flat cross reference rows do not identify publications.
+    Usage:
+        graph = CrossReferenceGraph.from_rows(rows)
+        graph.k_hop("drug", "ASPIRIN", 2, source_file="pubmed")
+    """
+
+    def __init__(
+        self,
+        nodes: dict[str, Column],
+        source_files: list,
+        adjacency: dict[tuple[str, bool], Adjacency],
+    ) -> None:
+        self.nodes = nodes
+        self.source_files = source_files
+        self.adjacency = adjacency
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> "CrossReferenceGraph":
+        """Compiles cross reference rows (flat layout) into drug and journal nodes."""
+        rows = list(rows)
+        drugs = _encode([row["drug"] for row in rows])
+        journals = _encode([row["journal"] for row in rows])
+        source_files = _encode([row.get("source_file") for row in rows])
+        dates = _dates([row.get("mention_date") for row in rows])
+        nodes = {
+            "drug": drugs,
+            "journal": journals,
+            "publication": _encode([]),
+        }
+        edges = {
+            "mentioned_in": _distinct_edges(
+                drugs.codes, journals.codes, dates, source_files.codes
+            )
+        }
+        return cls._from_edges(nodes, source_files.values, edges)
+
+    @classmethod
+    def from_star_schema(
+        cls, publications: list[dict], drugs: list[dict], mentions: list[dict]
+    ) -> "CrossReferenceGraph":
+        """Compiles the tables of a star schema snapshot, see `star_schema_models`."""
+        publication_index = {
+            row["publication_id"]: index for index, row in enumerate(publications)
+        }
+        drug_names = {row["drug_id"]: row["drug"] for row in drugs}
+        publication_nodes = _publication_nodes(publications)
+        journals = _encode([row["journal"] for row in publications])
+        source_files = _encode([row.get("source_file") for row in publications])
+        dates = _dates([row.get("date") for row in publications])
+        drug_nodes = _encode(list(drug_names.values()))
+        drug_code = dict(zip(drug_names, drug_nodes.codes.tolist()))
+        # per mention, the position of its publication and the code of its drug
+        mentioned = np.fromiter(
+            (publication_index[row["publication_id"]] for row in mentions),
+            np.int64,
+            len(mentions),
+        )
+        mentioned_drugs = np.fromiter(
+            (drug_code[row["drug_id"]] for row in mentions), np.int32, len(mentions)
+        )
+        nodes = {
+            "drug": drug_nodes,
+            "journal": journals,
+            "publication": publication_nodes,
+        }
+        edges = {
+            "mentioned_in": _distinct_edges(
+                mentioned_drugs,
+                journals.codes[mentioned],
+                dates[mentioned],
+                source_files.codes[mentioned],
+            ),
+            "mentions": _distinct_edges(
+                publication_nodes.codes[mentioned],
+                mentioned_drugs,
+                dates[mentioned],
+                source_files.codes[mentioned],
+            ),
+            "published_in": [
+                publication_nodes.codes,
+                journals.codes,
+                dates,
+                source_files.codes,
+            ],
+        }
+        return cls._from_edges(nodes, source_files.values, edges)
+
+    @classmethod
+    def _from_edges(
+        cls,
+        nodes: dict[str, Column],
+        source_files: list,
+        edges: dict[str, list[np.ndarray]],
+    ) -> "CrossReferenceGraph":
+        adjacency = {}
+        for edge_type in EDGE_TYPES:
+            source_type, target_type = EDGE_TYPES[edge_type]
+            sources, targets, dates, files = edges.get(
+                edge_type,
+                [
+                    np.empty(0, np.int32),
+                    np.empty(0, np.int32),
+                    _dates([]),
+                    np.empty(0, np.int32),
+                ],
+            )
+            adjacency[edge_type, False] = Adjacency.from_edges(
+                sources, targets, dates, files, len(nodes[source_type].values)
+            )
+            adjacency[edge_type, True] = Adjacency.from_edges(
+                targets, sources, dates, files, len(nodes[target_type].values)
+            )
+        return cls(nodes, source_files, adjacency)
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the adjacency arrays."""
+        return sum(adjacency.nbytes for adjacency in self.adjacency.values())
+
+    def edge_count(self, edge_type: str) -> int:
+        return len(self.adjacency[edge_type, False].targets)
+
+    def find(self, node_type: str, name: str) -> list[int]:
+        """
+        The ids of the nodes with this name, drugs are matched case insensitively as in the
+        gold commands and publications by title (every publication with the title).
+        """
+        column = self.nodes[node_type]
+        if node_type == "drug":
+            name = name.lower().strip()
+            return [
+                code
+                for code, value in enumerate(column.values)
+                if value.lower() == name
+            ]
+        # names are sorted, the nodes sharing one (publications only) are consecutive
+        code = column.code_of(name)
+        codes = []
+        while 0 <= code < len(column.values) and column.values[code] == name:
+            codes.append(code)
+            code += 1
+        return codes
+
+    def neighbours(
+        self,
+        edge_type: str,
+        node: int,
+        reverse: bool = False,
+        source_file: str | None = None,
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> np.ndarray:
+        """
+        The distinct neighbours of a node through an edge type, optionally restricted to the
+        edges of a source file and of a date range (both bounds included).
+        Args:
+            edge_type (str): One of EDGE_TYPES.
+            node (int): The id of a node of the source type of the edge type, or of its
+                target type when `reverse` is True.
+            reverse (bool, optional): Traverse the edges from their target. Defaults to False.
+        Returns:
+            np.ndarray: The sorted ids of the neighbours.
+        """
+        adjacency = self.adjacency[edge_type, reverse]
+        edges = slice(adjacency.indptr[node], adjacency.indptr[node + 1])
+        targets = adjacency.targets[edges]
+        mask = np.ones(len(targets), bool)
+        if source_file is not None:
+            try:
+                code = self.source_files.index(source_file)
+            except ValueError:
+                return targets[:0]
+            mask &= adjacency.source_files[edges] == code
+        if start is not None:
+            mask &= adjacency.dates[edges] >= np.datetime64(start, "D")
+        if end is not None:
+            mask &= adjacency.dates[edges] <= np.datetime64(end, "D")
+        # the targets of a node are sorted, keep the first of each run
+        targets = targets[mask]
+        if len(targets):
+            targets = targets[np.concatenate(([True], targets[1:] != targets[:-1]))]
+        return targets
+
+    def k_hop(
+        self,
+        node_type: str,
+        name: str,
+        hops: int,
+        edge_types: Iterable[str] | None = None,
+        source_file: str | None = None,
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> dict[str, dict[str, int]]:
+        """
+        Breadth-first traversal of the neighbourhood of a node, e.g. the drugs within 2 hops
+        of "ASPIRIN" through the journals of pubmed mentions:
+        `k_hop("drug", "ASPIRIN", 2, ["mentioned_in"], source_file="pubmed")`.
+        Args:
+            node_type (str): The type of the start node, one of NODE_TYPES.
+            name (str): The name of the start node, see `find`.
+            hops (int): The maximum number of edges from the start node.
+            edge_types (Iterable[str] | None, optional): The edge types to traverse, in both
+                directions. Defaults to None, all of them.
+            source_file (str | None, optional): Only traverse the edges of this source file.
+            start (datetime.date | None, optional): Only traverse edges dated from this day.
+            end (datetime.date | None, optional): Only traverse edges dated until this day.
+        Returns:
+            dict[str, dict[str, int]]: The nodes reached, start node(s) included, with their
+                distance: {node type: {name: hops}}, the nearest of the publications
+                sharing a title.
+        """
+        edge_types = list(EDGE_TYPES if edge_types is None else edge_types)
+        frontier = [(node_type, node) for node in self.find(node_type, name)]
+        distances = dict.fromkeys(frontier, 0)
+        for hop in range(1, hops + 1):
+            reached = []
+            for current_type, node in frontier:
+                for edge_type in edge_types:
+                    source_type, target_type = EDGE_TYPES[edge_type]
+                    for reverse, from_type, to_type in (
+                        (False, source_type, target_type),
+                        (True, target_type, source_type),
+                    ):
+                        if from_type != current_type:
+                            continue
+                        for target in self.neighbours(
+                            edge_type, node, reverse, source_file, start, end
+                        ).tolist():
+                            if (to_type, target) not in distances:
+                                distances[to_type, target] = hop
+                                reached.append((to_type, target))
+            frontier = reached
+        result = {node_type: {} for node_type in NODE_TYPES}
+        for (reached_type, node), distance in distances.items():
+            # nodes are reached by increasing distance
+            result[reached_type].setdefault(
+                self.nodes[reached_type].values[node], distance
+            )
+        return result
+
+    def save(self, path: pathlib.Path, **metadata) -> None:
+        """Saves the graph to an uncompressed .npz file, with JSON serializable metadata, see `atomic_open`."""
+        arrays = {}
+        for node_type, column in self.nodes.items():
+            arrays[f"nodes.{node_type}"] = _json_array(column.values)
+        arrays["source_files"] = _json_array(self.source_files)
+        arrays["metadata"] = _json_array(metadata)
+        for (edge_type, reverse), adjacency in self.adjacency.items():
+            for field, array in adjacency._asdict().items():
+                arrays[f"{edge_type}.{int(reverse)}.{field}"] = array
+        with atomic_open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> tuple["CrossReferenceGraph", dict]:
+        """Loads a graph saved by `save`, returns it with its metadata."""
+        with np.load(path) as arrays:
+            nodes = {
+                node_type: Column(
+                    _from_json_array(arrays[f"nodes.{node_type}"]),
+                    np.empty(0, np.int32),
+                )
+                for node_type in NODE_TYPES
+            }
+            adjacency = {
+                (edge_type, reverse): Adjacency(
+                    *(
+                        arrays[f"{edge_type}.{int(reverse)}.{field}"]
+                        for field in Adjacency._fields
+                    )
+                )
+                for edge_type in EDGE_TYPES
+                for reverse in (False, True)
+            }
+            graph = cls(nodes, _from_json_array(arrays["source_files"]), adjacency)
+            return graph, _from_json_array(arrays["metadata"])
@@ -1,18 +1,144 @@
+import bz2
+import contextlib
 import csv
+import gzip
+import hashlib
 import itertools
-import json
 import logging
+import lzma
+import os
 import pathlib
+import re
+import textwrap
 from typing import (
+    IO,
+    Any,
+    Callable,
     Iterable,
     Iterator,
     List,
 )
 
 from ..config import (
+    COMPRESSION_EXTENSIONS,
+    CSV_PARALLEL_MIN_BYTES,
+    PARQUET_BATCH_ROWS,
     PUBTRIALS_FIELD_NAMES,
-    SUPPORTED_EXTENSIONS,
+    SHARD_SUFFIX_PATTERN,
 )
+from . import json_codec
+
+_OPENERS = {
+    COMPRESSION_EXTENSIONS["gzip"]: gzip.open,
+    COMPRESSION_EXTENSIONS["bz2"]: bz2.open,
+    COMPRESSION_EXTENSIONS["xz"]: lzma.open,
+}
+
+
+def strip_compression_suffix(file_name: str) -> str:
+    """
+    Removes a trailing compression extension (.gz, .bz2, .xz) from a file name.
+    Args:
+        file_name (str): The file name, e.g. "pubmed.csv.gz".
+    Returns:
+        str: The file name without its compression extension, e.g. "pubmed.csv".
+    """
+    suffix = pathlib.PurePath(file_name).suffix
+    if suffix in _OPENERS:
+        return file_name[: -len(suffix)]
+    return file_name
+
+
+def data_suffix(file: pathlib.Path) -> str:
+    """Returns the data format extension of a file, ignoring any compression extension."""
+    return pathlib.PurePath(strip_compression_suffix(file.name)).suffix
+
+
+def _split_shard(file: pathlib.Path) -> tuple[str, int]:
+    stem = pathlib.PurePath(strip_compression_suffix(file.name)).stem
+    match = re.search(SHARD_SUFFIX_PATTERN, stem)
+    if match is None:
+        return stem, -1
+    return stem[: match.start()], int(match.group("shard"))
+
+
+def source_name(file: pathlib.Path) -> str:
+    """
+    Returns the logical source name of a file, compression and shard suffixes excluded.
+    e.g. "pubmed" for "pubmed.csv.gz" or "pubmed_part-00042.json".
+    """
+    return _split_shard(file)[0]
+
+
+def logical_file_name(file: pathlib.Path) -> str:
+    """Returns the file name of the logical source, e.g. "pubmed.json" for "pubmed_part-00042.json.gz"."""
+    return source_name(file) + data_suffix(file)
+
+
+def group_files_by_source(
+    files: Iterable[pathlib.Path],
+) -> dict[str, list[pathlib.Path]]:
+    """
+    Groups landing files by logical source, the shards of a source being sorted by shard number.
+    Args:
+        files (Iterable[pathlib.Path]): The landing files, sharded or not.
+    Returns:
+        dict[str, list[pathlib.Path]]: The files of each source, keyed by source name in alphabetical order.
+    """
+    groups: dict[str, list[pathlib.Path]] = {}
+    for file in sorted(files, key=lambda file: (*_split_shard(file), file.name)):
+        groups.setdefault(source_name(file), []).append(file)
+    return dict(sorted(groups.items()))
+
+
+def open_file(file: pathlib.Path, mode: str = "r", **kwargs) -> IO:
+    """
+    Opens a file, transparently (de)compressing it according to its extension.
+    Compressed files are streamed through the stdlib codecs, no temporary file is written.
+    Args:
+        file (pathlib.Path): The path to the file.
+        mode (str, optional): The mode as for the builtin `open`. Defaults to "r".
+        **kwargs: Extra arguments forwarded to the opener (encoding, newline...).
+    Returns:
+        IO: A file object.
+    """
+    opener = _OPENERS.get(pathlib.PurePath(file).suffix)
+    if opener is None:
+        return open(file, mode, **kwargs)
+    if "b" not in mode and "t" not in mode:
+        mode += "t"
+    return opener(file, mode, **kwargs)
+
+
+def find_silver_files(
+    silver_zone_path: pathlib.Path, prefix: str
+) -> list[pathlib.Path]:
+    """
+    Lists the JSON files of a silver dataset, compressed or not, sorted by name.
+    Since file names end with the run date, the latest snapshot is the last element.
+    Args:
+        silver_zone_path (pathlib.Path): The path to the silver zone.
+        prefix (str): The dataset prefix, e.g. "cross_reference_data".
+    Returns:
+        list[pathlib.Path]: The matching files sorted by name.
+    """
+    return sorted(
+        file
+        for file in silver_zone_path.glob(f"{prefix}_*.json*")
+        if data_suffix(file) == ".json"
+    )
+
+
+def surrogate_key(*natural_key) -> int:
+    """
+    Returns a stable integer key for a natural key, e.g. (source_file, title, date, journal).
+    The key only depends on the values, so a row gets the same key in every run whatever
+    the order in which the rows are read. It fits in a signed 64 bit integer.
+    """
+    digest = hashlib.blake2b(
+        "\x1f".join(str(part) for part in natural_key).encode("utf-8"), digest_size=8
+    ).digest()
+    return int.from_bytes(digest, "big") >> 1
 
 
 def list_files_in_folder(
@@ -22,6 +148,12 @@ def list_files_in_folder(
     List specific files in a given folder.
     This function iterates through all files in the specified landing zone directory,
     checks if each file is a regular file and if its name is in the PUBTRIALS list.
+    Compressed variants of the supported names (e.g. pubmed.csv.gz) are accepted as well,
+    so are shards of a supported name (e.g. pubmed_part-00001.json for pubmed.json), and
+    the sources of the supported names in any format of RAW_READERS (e.g. pubmed.parquet).
+    Compressed files of a format that compresses its own data (UNCOMPRESSED_ONLY_SUFFIXES,
+    e.g. pubmed.parquet.gz) cannot be read: they are skipped with a warning.
+    Files are returned grouped by source and in shard order so that ingestion is deterministic.
     Args:
         landing_zone (pathlib.Path): The path to the directory to be scanned.
         supported_file_names (list[str]): A list of file names to be searched for.
@@ -29,11 +161,45 @@ def list_files_in_folder(
         list[pathlib.Path]: A list of pathlib.Path objects representing the files
                             that meet the specified conditions.
     """
+    sources = {source_name(pathlib.Path(name)) for name in supported_file_names}
     files = []
     for file in landing_zone.iterdir():
-        if file.is_file() and file.name in supported_file_names:
+        if not file.is_file():
+            continue
+        if logical_file_name(file) in supported_file_names or (
+            source_name(file) in sources and data_suffix(file) in RAW_READERS
+        ):
+            if (
+                data_suffix(file) in UNCOMPRESSED_ONLY_SUFFIXES
+                and strip_compression_suffix(file.name) != file.name
+            ):
+                logging.warning(
+                    f"Skipping {file.name}: compressed {data_suffix(file)} files are not "
+                    f"supported, decompress it to {strip_compression_suffix(file.name)}"
+                )
+                continue
             files.append(file)
-    return files
+    return list(itertools.chain.from_iterable(group_files_by_source(files).values()))
+
+
+# key of the values of a CSV row that has more or fewer values than field names
+RAGGED_VALUES_KEY = "values"
+
+
+def csv_record(
+    field_names: list[str], values: tuple[str, ...] | list[str], metadata: dict
+) -> dict:
+    """
+    Maps the values of a CSV row to the field names, plus the metadata of the file.
+    A row with more or fewer values than field names (e.g. an unquoted comma in a title)
+    cannot be mapped: its values are kept under RAGGED_VALUES_KEY instead, so that it misses
+    every field and is rejected by the validation, whichever reader parsed it.
+    """
+    if len(values) != len(field_names):
+        return {RAGGED_VALUES_KEY: list(values), **metadata}
+    record = dict(zip(field_names, values))
+    record.update(metadata)
+    return record
 
 
 def read_csv(file: pathlib.Path, field_names: list[str]) -> Iterator[dict[str, str]]:
@@ -47,20 +213,40 @@ def read_csv(file: pathlib.Path, field_names: list[str]) -> Iterator[dict[str, s
                                   Each dictionary contains the row data and additional metadata:
                                   - "source_file": The stem of the file name (without extension).
                                   - "source_file_type": The type of the source file ("csv").
+                                  Rows with a wrong number of values are kept apart, see `csv_record`.
+    Large uncompressed files are memory-mapped and parsed in parallel chunks, see `read_csv_chunks`.
     """
+    if file.suffix == ".csv" and file.stat().st_size >= CSV_PARALLEL_MIN_BYTES:
+        # imported on first use, multiprocessing is slow to import
+        from .parallel_csv import read_csv_chunks
 
-    with open(file, "r") as f:
-        data = csv.DictReader(f, field_names)
-        next(data)
+        for chunk in read_csv_chunks(file, source_file=source_name(file)):
+            metadata = {
+                "source_file": chunk.source_file,
+                "source_file_type": chunk.source_file_type,
+            }
+            for row in chunk.rows:
+                yield csv_record(field_names, row, metadata)
+        return
+
+    metadata = {"source_file": source_name(file), "source_file_type": "csv"}
+    with open_file(file, "r", newline="") as f:
+        data = csv.reader(f)
+        next(data, None)
         for row in data:
-            yield ({**row, "source_file": file.stem, "source_file_type": "csv"})
+            # blank lines are skipped, as by the chunked reader
+            if row:
+                yield csv_record(field_names, row, metadata)
 
 
-def read_json(file: pathlib.Path) -> Iterator[dict[str, str]]:
+def read_json(
+    file: pathlib.Path, field_names: list[str] | None = None
+) -> Iterator[dict[str, str]]:
     """
     Reads a JSON file and yields each row as a dictionary with additional metadata.
     Args:
         file (pathlib.Path): The path to the JSON file.
+        field_names (list[str] | None, optional): Unused, the rows keep the keys of the file.
     Yields:
         Iterator[dict[str, str]]: An iterator of dictionaries, each representing a row in the JSON file,
                                   with added keys 'source_file' and 'source_file_type'.
@@ -68,10 +254,118 @@ def read_json(file: pathlib.Path) -> Iterator[dict[str, str]]:
                                   - "source_file_type": The type of the source file ("json").
     """
 
-    with open(file, "r") as f:
-        data = json.load(f)
+    with open_file(file, "rb") as f:
+        data = json_codec.load(f)
         for row in data:
-            yield ({**row, "source_file": file.stem, "source_file_type": "json"})
+            yield (
+                {**row, "source_file": source_name(file), "source_file_type": "json"}
+            )
+
+
+def read_ndjson(
+    file: pathlib.Path, field_names: list[str] | None = None
+) -> Iterator[dict[str, str]]:
+    """
+    Reads a newline-delimited JSON file (one object per line) and yields each row as a
+    dictionary with additional metadata, without loading the whole file as `read_json` does.
+    Args:
+        file (pathlib.Path): The path to the NDJSON file.
+        field_names (list[str] | None, optional): Unused, the rows keep the keys of the file.
+    Yields:
+        Iterator[dict[str, str]]: The rows, with added keys 'source_file' and 'source_file_type' ("ndjson").
+    """
+    with open_file(file, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield (
+                    {
+                        **json_codec.loads(line),
+                        "source_file": source_name(file),
+                        "source_file_type": "ndjson",
+                    }
+                )
+
+
+def read_parquet(
+    file: pathlib.Path, field_names: list[str] | None = None
+) -> Iterator[dict[str, str]]:
+    """
+    Reads a Parquet file with DuckDB (`pip install servier[sql]`), in batches of
+    PARQUET_BATCH_ROWS rows, and yields each row as a dictionary with additional metadata.
+    Only the columns of `field_names` are read, the others are not even decompressed.
+    Values are read as strings, NULL as an empty string, as `read_csv` yields them: e.g. a
+    DATE is read as "2024-11-13" and a row with a NULL title fails validation.
+    Args:
+        file (pathlib.Path): The path to the Parquet file, Parquet compresses its own pages.
+        field_names (list[str] | None, optional): The columns to read, those missing from the
+            file are ignored. Defaults to None, all the columns.
+    Returns:
+        Iterator[dict[str, str]]: The rows, with added keys 'source_file' and 'source_file_type' ("parquet").
+    Raises:
+        ValueError: If the file is compressed (e.g. pubmed.parquet.gz).
+        ImportError: If DuckDB is not installed.
+    """
+    if file.suffix != ".parquet":
+        raise ValueError(f"Compressed Parquet files are not supported: {file.name}")
+    try:
+        import duckdb
+    except ImportError:
+        raise ImportError(
+            "Reading Parquet files requires duckdb: pip install servier[sql]"
+        )
+    return _read_parquet_batches(duckdb, file, field_names)
+
+
+def _read_parquet_batches(
+    duckdb, file: pathlib.Path, field_names: list[str] | None
+) -> Iterator[dict[str, str]]:
+    metadata = {"source_file": source_name(file), "source_file_type": "parquet"}
+    with duckdb.connect() as conn:
+        columns = [
+            column[0]
+            for column in conn.execute(
+                "SELECT * FROM read_parquet(?) LIMIT 0", [str(file)]
+            ).description
+            if field_names is None or column[0] in field_names
+        ]
+        if not columns:
+            raise ValueError(f"{file.name} has none of the columns {field_names}")
+        projection = ", ".join(
+            "COALESCE(CAST({0} AS VARCHAR), '') AS {0}".format(
+                '"{}"'.format(column.replace('"', '""'))
+            )
+            for column in columns
+        )
+        result = conn.execute(f"SELECT {projection} FROM read_parquet(?)", [str(file)])
+        while batch := result.fetchmany(PARQUET_BATCH_ROWS):
+            for row in batch:
+                record = dict(zip(columns, row))
+                record.update(metadata)
+                yield record
+
+
+RawReader = Callable[[pathlib.Path, list[str]], Iterator[dict]]
+
+# readers of the landing files by data extension, see `register_reader`
+RAW_READERS: dict[str, RawReader] = {
+    ".csv": read_csv,
+    ".json": read_json,
+    ".ndjson": read_ndjson,
+    ".jsonl": read_ndjson,
+    ".parquet": read_parquet,
+}
+# formats that compress their own data and are read from the file itself, not a stream
+UNCOMPRESSED_ONLY_SUFFIXES = {".parquet"}
+
+
+def register_reader(suffix: str, reader: RawReader) -> None:
+    """
+    Registers the reader of the landing files with a data extension, e.g. ".avro", used by
+    `read_raw_data` and accepted by `list_files_in_folder`. A reader takes the file and the
+    CSV field names and yields the rows of the file with their "source_file" (see
+    `source_name`) and "source_file_type".
+    """
+    RAW_READERS[suffix] = reader
 
 
 def read_raw_data(
@@ -79,6 +373,8 @@ def read_raw_data(
 ) -> Iterator[dict[str, str]]:
     """
     Reads raw data from a file and returns an iterator of dictionaries.
+    The reader is picked by the data extension of the file, see RAW_READERS.
+    Files compressed with gzip, bz2 or xz (e.g. pubmed.csv.gz) are decompressed on the fly.
     Args:
         raw_data_file (pathlib.Path): The path to the raw data file.
         field_names (list[str], optional): The list of field names for CSV files. Defaults to PUBTRIALS_FIELD_NAMES.
@@ -88,28 +384,133 @@ def read_raw_data(
         ValueError: If the file format is not supported.
         FileNotFoundError: If the file does not exist.
     """
-    if raw_data_file.suffix not in SUPPORTED_EXTENSIONS:
+    reader = RAW_READERS.get(data_suffix(raw_data_file))
+    if reader is None:
         raise ValueError("Unsupported file format")
     if not raw_data_file.is_file():
         raise FileNotFoundError(f"The file {raw_data_file} is not a file.")
-    if raw_data_file.suffix == ".csv":
-        return read_csv(raw_data_file, field_names)
-    elif raw_data_file.suffix == ".json":
-        return read_json(raw_data_file)
+    return reader(raw_data_file, field_names)
 
 
-def save_file_as_json(dest_location: pathlib.Path, data: Iterable) -> None:
+def temporary_path(dest_location: pathlib.Path) -> pathlib.Path:
+    """
+    Returns where `dest_location` is written before being renamed into place.
+    The temporary file sits in the same directory, so that the rename is atomic, keeps the
+    extension (and so the codec) of the destination and starts with a dot, so that it is
+    never matched by `find_silver_files` or `list_files_in_folder`.
+    """
+    return dest_location.with_name(
+        f".{dest_location.name}.{os.getpid()}.tmp{dest_location.suffix}"
+    )
+
+
+@contextlib.contextmanager
+def atomic_open(dest_location: pathlib.Path, mode: str = "w", **kwargs) -> Iterator[IO]:
+    """
+    Opens a temporary file with `open_file` and renames it to `dest_location` on success.
+    Readers see either the previous file or the complete new one, never a half-written
+    file; on failure the temporary file is removed.
+    """
+    tmp_location = temporary_path(dest_location)
+    try:
+        with open_file(tmp_location, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp_location, dest_location)
+    finally:
+        tmp_location.unlink(missing_ok=True)
+
+
+def save_file_as_json(
+    dest_location: pathlib.Path, data: Iterable, indent: int | None = 4
+) -> None:
     """
     Save the given data to a JSON file at the specified destination location.
+    If the destination ends with .gz, .bz2 or .xz the JSON is streamed through the matching codec.
+    The file is written atomically, see `atomic_open`.
     Args:
         dest_location (pathlib.Path): The path where the JSON file will be saved.
         data (Iterable): The data to be saved in the JSON file.
+        indent (int | None, optional): The JSON indentation, None writes compact JSON. Defaults to 4.
     Returns:
         None
     """
 
-    with open(dest_location, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, default=str, ensure_ascii=False)
+    with atomic_open(dest_location, "wb") as f:
+        json_codec.dump(data, f, indent)
+
+
+def save_files_as_json(files: dict[pathlib.Path, Any], indent: int | None = 4) -> None:
+    """
+    Saves several JSON files at once, see `save_file_as_json`: all the files are written to
+    temporary files first, and only renamed into place once all of them are complete. If
+    one fails, none is published.
+    Args:
+        files (dict[pathlib.Path, Any]): The data to save, by destination.
+        indent (int | None, optional): The JSON indentation, None writes compact JSON. Defaults to 4.
+    """
+    written = []
+    try:
+        for dest_location, data in files.items():
+            tmp_location = temporary_path(dest_location)
+            written.append((tmp_location, dest_location))
+            with open_file(tmp_location, "wb") as f:
+                json_codec.dump(data, f, indent)
+        for tmp_location, dest_location in written:
+            os.replace(tmp_location, dest_location)
+    finally:
+        for tmp_location, _ in written:
+            tmp_location.unlink(missing_ok=True)
+
+
+def encode_json_item(item, indent: int | None = 4) -> str:
+    """Encodes an item of a JSON array as `JsonArrayWriter` writes it, see `write_encoded`."""
+    text = json_codec.dumps(item, indent)
+    if indent is not None:
+        # JSON lines are never blank, so this is textwrap.indent, without a regex per line
+        margin = "\n" + " " * indent
+        text = margin + text.replace("\n", margin)
+    return text
+
+
+class JsonArrayWriter:
+    """
+    Streams items to a JSON array file, one item at a time, so that the whole array
+    never has to be held in memory. The output is equivalent to `save_file_as_json`, and is
+    only renamed into place when the block exits without an exception, see `atomic_open`.
+    Usage:
+        with JsonArrayWriter(dest_location) as writer:
+            writer.write_all(items)
+    """
+
+    def __init__(self, dest_location: pathlib.Path, indent: int | None = 4) -> None:
+        self.dest_location = dest_location
+        self.indent = indent
+        self.count = 0
+        self._context = None
+        self._file = None
+
+    def __enter__(self) -> "JsonArrayWriter":
+        self._context = atomic_open(self.dest_location, "w", encoding="utf-8")
+        self._file = self._context.__enter__()
+        self._file.write("[")
+        return self
+
+    def write(self, item) -> None:
+        self.write_encoded(encode_json_item(item, self.indent))
+
+    def write_encoded(self, text: str) -> None:
+        """Writes an item already encoded by `encode_json_item` with the same indent."""
+        self._file.write(("," if self.count else "") + text)
+        self.count += 1
+
+    def write_all(self, items: Iterable) -> None:
+        for item in items:
+            self.write(item)
+
+    def __exit__(self, *exc_info) -> None:
+        if exc_info[0] is None:
+            self._file.write("\n]" if self.count and self.indent is not None else "]")
+        self._context.__exit__(*exc_info)
 
 
 def sort_and_group_by_journal(cross_reference_data: List[dict[str, str]]) -> Iterable[tuple[str, Iterator]]:
@@ -0,0 +1,216 @@
+import datetime
+import json
+import pathlib
+import sqlite3
+import time
+from typing import Iterable
+
+SCHEMA = [
+    # one row per journal, month and drug mentioned that month, with the days of the
+    # month it was mentioned on as a bit mask (bit 0 for the 1st)
+    """
+    CREATE TABLE IF NOT EXISTS buckets (
+        month TEXT NOT NULL,
+        journal TEXT NOT NULL,
+        drug TEXT NOT NULL,
+        days INTEGER NOT NULL,
+        PRIMARY KEY (month, journal, drug)
+    ) WITHOUT ROWID
+    """,
+    # content digests of the snapshots already folded into the buckets
+    """
+    CREATE TABLE IF NOT EXISTS snapshots (
+        digest TEXT PRIMARY KEY,
+        folded_at REAL NOT NULL
+    )
+    """,
+    # the watermark of the last snapshot folded, see `servier.gold.load_appended_cross_reference_rows`
+    """
+    CREATE TABLE IF NOT EXISTS watermark (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        marks TEXT NOT NULL
+    )
+    """,
+    # the buckets of the rows being folded, joined with the stored ones
+    """
+    CREATE TEMP TABLE IF NOT EXISTS folding (
+        month TEXT NOT NULL,
+        journal TEXT NOT NULL,
+        drug TEXT NOT NULL,
+        days INTEGER NOT NULL,
+        PRIMARY KEY (month, journal, drug)
+    ) WITHOUT ROWID
+    """,
+]
+
+# the buckets of the rows being folded that are new or extended with new days, in key order
+FOLD_SQL = """
+    INSERT OR REPLACE INTO buckets
+    SELECT folding.month, folding.journal, folding.drug,
+        folding.days | coalesce(buckets.days, 0)
+    FROM folding LEFT JOIN buckets USING (month, journal, drug)
+    WHERE buckets.days IS NULL OR folding.days | buckets.days != buckets.days
+    ORDER BY folding.month, folding.journal, folding.drug
+"""
+
+TOP_JOURNALS_SQL = """
+    WITH days_window (month, days) AS (VALUES {values})
+    SELECT journal, count(DISTINCT drug) AS distinct_drugs
+    FROM buckets JOIN days_window USING (month)
+    WHERE buckets.days & days_window.days
+    GROUP BY journal
+    ORDER BY distinct_drugs DESC, journal
+    LIMIT ?
+"""
+
+
+def month_buckets(rows: Iterable[dict]) -> dict[tuple[str, str, str], int]:
+    """
+    Reduces cross reference rows to their (month, journal, drug) buckets and the mask of
+    the days of the month they were mentioned on.
+    """
+    buckets = {}
+    for row in rows:
+        # mention dates are written as YYYY-MM-DD
+        mention_date = str(row["mention_date"])
+        key = mention_date[:7], row["journal"], row["drug"]
+        buckets[key] = buckets.get(key, 0) | 1 << (int(mention_date[8:10]) - 1)
+    return buckets
+
+
+def window_masks(as_of: datetime.date, days: int) -> dict[str, int]:
+    """The months of the `days` days ending on `as_of` (included), with the mask of their days in the window."""
+    masks = {}
+    day = as_of - datetime.timedelta(days=days - 1)
+    while day <= as_of:
+        month = day.strftime("%Y-%m")
+        masks[month] = masks.get(month, 0) | 1 << (day.day - 1)
+        day += datetime.timedelta(days=1)
+    return masks
+
+
+class JournalBuckets:
+    """
+    Time-bucketed aggregates of the cross reference, maintained incrementally in a SQLite file.
+    The distinct drugs mentioned by a journal are kept per month, each with the days of the
+    month it was mentioned on. Folding rows is an idempotent union (a bitwise OR of the day
+    masks): only the buckets of new mentions are written, folding rows already folded
+    writes nothing, and only the stored buckets of the folded rows are read. Folding records
+    the watermark of the snapshot, so that the next one only folds the rows appended since.
+    Rolling windows are answered by combining the month buckets, the months at the edges of
+    the window restricted to its days by their mask.
+    Rows are never removed from the buckets: when mentions disappear from the cross
+    reference (e.g. a drug is removed from the referential), `clear` and fold again.
+    Usage:
+        with JournalBuckets(path) as buckets:
+            buckets.fold(rows)
+            buckets.top_journals(datetime.date.today(), days=30)
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+
+    def __enter__(self) -> "JournalBuckets":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        (count,) = self._conn.execute("SELECT count(*) FROM buckets").fetchone()
+        return count
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def clear(self) -> None:
+        """Drops all the buckets and the record of the snapshots folded."""
+        with self._conn:
+            self._conn.execute("DELETE FROM buckets")
+            self._conn.execute("DELETE FROM snapshots")
+            self._conn.execute("DELETE FROM watermark")
+
+    def folded(self, digest: str) -> bool:
+        """Whether the snapshot with this content digest was already folded."""
+        row = self._conn.execute(
+            "SELECT 1 FROM snapshots WHERE digest = ?", (digest,)
+        ).fetchone()
+        return row is not None
+
+    def watermark(self) -> list[dict] | None:
+        """The watermark of the last snapshot folded, None if none was recorded."""
+        row = self._conn.execute("SELECT marks FROM watermark").fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def fold(
+        self,
+        rows: Iterable[dict],
+        digest: str | None = None,
+        watermark: list[dict] | None = None,
+    ) -> int:
+        """
+        Folds cross reference rows into the buckets.
+        Args:
+            rows (Iterable[dict]): Rows with a drug, a journal and a mention_date.
+            digest (str | None, optional): The content digest of the snapshot the rows come
+                from, recorded in the same transaction, see `folded`. Defaults to None.
+            watermark (list[dict] | None, optional): The watermark of the snapshot the rows
+                come from, recorded in the same transaction, see `watermark`. Defaults to None.
+        Returns:
+            int: The number of buckets created or extended with new days.
+        """
+        buckets = month_buckets(rows)
+        with self._conn:
+            # the buckets are read and written in the same write transaction, so that a
+            # concurrent fold cannot lose days
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT INTO folding VALUES (?, ?, ?, ?)",
+                ((*key, days) for key, days in buckets.items()),
+            )
+            changes = self._conn.execute(FOLD_SQL).rowcount
+            self._conn.execute("DELETE FROM folding")
+            if digest is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO snapshots VALUES (?, ?)",
+                    (digest, time.time()),
+                )
+            if watermark is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO watermark VALUES (0, ?)",
+                    (json.dumps(watermark),),
+                )
+        return changes
+
+    def distinct_drugs_by_month(self) -> dict[str, dict[str, int]]:
+        """The number of distinct drugs mentioned by each journal, per month: {journal: {"YYYY-MM": count}}."""
+        result = {}
+        for journal, month, count in self._conn.execute(
+            """
+            SELECT journal, month, count(*) FROM buckets
+            GROUP BY journal, month ORDER BY journal, month
+            """
+        ):
+            result.setdefault(journal, {})[month] = count
+        return result
+
+    def top_journals(
+        self, as_of: datetime.date, days: int = 30, limit: int = 10
+    ) -> list[dict]:
+        """
+        The journals mentioning the most distinct drugs in the `days` days ending on `as_of`.
+        Returns:
+            list[dict]: Up to `limit` {"journal", "distinct_drugs"}, by decreasing count then name.
+        """
+        masks = window_masks(as_of, days)
+        sql = TOP_JOURNALS_SQL.format(values=", ".join("(?, ?)" for _ in masks))
+        parameters = [value for item in masks.items() for value in item]
+        return [
+            {"journal": journal, "distinct_drugs": count}
+            for journal, count in self._conn.execute(sql, (*parameters, limit))
+        ]
@@ -0,0 +1,200 @@
+import contextlib
+import itertools
+import json
+import os
+import re
+from typing import (
+    IO,
+    Any,
+    Iterator,
+)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# Forces a backend ("orjson" or "json"), by default the fastest installed one is used
+JSON_BACKEND_ENV = "SERVIER_JSON_BACKEND"
+JSON_BACKENDS = ("orjson", "json")
+# orjson writes some floats otherwise than json: 1e16 for 1e+16, 0.00001 for 1e-05, null for
+# NaN and the infinities, i.e. the floats json writes with an exponent or by name. A byte
+# scan first rules out the outputs that cannot hold one, it also matches text ("type-2",
+# "nullable") and None: only then are the floats of the object looked at, see
+# `_has_divergent_float` (an exponent is always followed by - or 1-9).
+_ORJSON_EXPONENT = re.compile(rb"e[-1-9]")
+
+
+def _orjson_may_differ(data: bytes) -> bool:
+    return (
+        b"null" in data or b".0000" in data or _ORJSON_EXPONENT.search(data) is not None
+    )
+
+
+def _is_divergent_float(value: float) -> bool:
+    # float.__repr__ switches to an exponent below 1e-4 and from 1e16 on
+    return not (value == 0.0 or 1e-4 <= abs(value) < 1e16)
+
+
+def _has_divergent_float(obj: Any, keys: bool = False) -> bool:
+    """
+    Whether an object holds a float orjson writes otherwise than json, in its values or,
+    with `keys` (non-string keys written as strings), in its dict keys.
+    The object is walked a level at a time: the types of a level are collected by `map`,
+    only the floats and the containers are then looked at one by one, so rows of strings
+    and dates cost a fraction of json itself.
+    """
+    level = [obj]
+    while level:
+        kinds = set(map(type, level))
+        if any(issubclass(kind, float) for kind in kinds) and any(
+            _is_divergent_float(value) for value in level if isinstance(value, float)
+        ):
+            return True
+        if not any(issubclass(kind, (dict, list, tuple)) for kind in kinds):
+            return False
+        containers = [
+            value for value in level if isinstance(value, (dict, list, tuple))
+        ]
+        level = list(
+            itertools.chain.from_iterable(
+                value.values() if isinstance(value, dict) else value
+                for value in containers
+            )
+        )
+        if keys:
+            level.extend(
+                itertools.chain.from_iterable(
+                    value for value in containers if isinstance(value, dict)
+                )
+            )
+    return False
+
+
+def available_backends() -> list[str]:
+    """The backends that can be used in this environment, fastest first."""
+    return [name for name in JSON_BACKENDS if name != "orjson" or orjson is not None]
+
+
+def _default_backend() -> str:
+    name = os.environ.get(JSON_BACKEND_ENV)
+    if name is None:
+        return available_backends()[0]
+    if name not in available_backends():
+        raise ValueError(
+            f"{JSON_BACKEND_ENV}={name} is not available, use one of {available_backends()}"
+        )
+    return name
+
+
+_backend = _default_backend()
+
+
+def backend() -> str:
+    """The name of the backend in use."""
+    return _backend
+
+
+@contextlib.contextmanager
+def use_backend(name: str) -> Iterator[None]:
+    """Switches to another backend for the duration of the block, e.g. to compare them."""
+    global _backend
+    if name not in available_backends():
+        raise ValueError(
+            f"JSON backend {name} is not available, use one of {available_backends()}"
+        )
+    previous, _backend = _backend, name
+    try:
+        yield
+    finally:
+        _backend = previous
+
+
+def _reindent(text: bytes, indent: int) -> bytes:
+    # orjson only indents by 2 spaces. Strings cannot hold a raw newline, so the spaces
+    # after a newline are structural. They are swapped for a NUL per level (escaped in
+    # strings, so never in the text), deepest level first so that a line is only matched
+    # once, then each NUL for `indent` spaces: a few bytes.replace, instead of a regex
+    # substitution per line.
+    if indent == 2:
+        return text
+    depth = 0
+    while b"\n" + b"  " * (depth + 1) in text:
+        depth += 1
+    for level in range(depth, 0, -1):
+        text = text.replace(b"\n" + b"  " * level, b"\n" + b"\0" * level)
+    return text.replace(b"\0", b" " * indent)
+
+
+def _orjson_encode(obj: Any, indent: int | None) -> bytes | None:
+    """The output of orjson, None if it cannot be the one of json (see `encode`)."""
+    option = orjson.OPT_PASSTHROUGH_DATETIME
+    if indent is not None:
+        option |= orjson.OPT_INDENT_2
+    keys_in_strings = False
+    try:
+        data = orjson.dumps(obj, default=str, option=option)
+    except orjson.JSONEncodeError:
+        # integer keys are written as strings, as json does. The option slows down
+        # every dict, so it is only used when needed.
+        try:
+            data = orjson.dumps(
+                obj, default=str, option=option | orjson.OPT_NON_STR_KEYS
+            )
+        except orjson.JSONEncodeError:
+            # e.g. an integer beyond 64 bits
+            return None
+        keys_in_strings = True
+    if _orjson_may_differ(data) and _has_divergent_float(obj, keys_in_strings):
+        return None
+    return data if indent is None else _reindent(data, indent)
+
+
+def encode(obj: Any, indent: int | None = 4) -> bytes:
+    """
+    Encodes an object to UTF-8 as `json.dumps(obj, indent=indent, default=str,
+    ensure_ascii=False)` does, compact (no spaces) when `indent` is None.
+    Whatever the backend, the bytes are the same: dates and datetimes are written as `str`
+    writes them ("2020-01-01", "2020-01-01 10:00:00"), orjson is only asked not to use its
+    own ISO 8601 format, and json encodes what orjson writes otherwise (floats in exponent
+    notation, NaN and the infinities, integers beyond 64 bits).
+    """
+    if _backend == "orjson":
+        data = _orjson_encode(obj, indent)
+        if data is not None:
+            return data
+    return _json_dumps(obj, indent).encode("utf-8")
+
+
+def dumps(obj: Any, indent: int | None = 4) -> str:
+    """Encodes an object to a string, see `encode`."""
+    if _backend == "orjson":
+        return encode(obj, indent).decode("utf-8")
+    return _json_dumps(obj, indent)
+
+
+def _json_dumps(obj: Any, indent: int | None) -> str:
+    return json.dumps(
+        obj,
+        indent=indent,
+        separators=(",", ":") if indent is None else None,
+        default=str,
+        ensure_ascii=False,
+    )
+
+
+def loads(data: str | bytes) -> Any:
+    """Decodes a JSON document."""
+    if _backend == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load(f: IO) -> Any:
+    """Decodes the JSON document of a file object opened in text or binary mode."""
+    return loads(f.read())
+
+
+def dump(obj: Any, f: IO, indent: int | None = 4) -> None:
+    """Encodes an object to a file object opened in binary mode, see `encode`."""
+    f.write(encode(obj, indent))
@@ -1,11 +1,6 @@
 import datetime
 from typing import Any
 
-from dateutil.parser import (
-    ParserError,
-    parse,
-)
-
 
 def replace_hex_sequences(match):
 
@@ -20,6 +15,12 @@ def replace_hex_sequences(match):
 
 def parse_date(value: Any) -> datetime.date:
     if isinstance(value, str):
+        # imported on first use, dateutil is slow to import
+        from dateutil.parser import (
+            ParserError,
+            parse,
+        )
+
         try:
             return parse(value).date()
         except ParserError as ex:
@@ -0,0 +1,162 @@
+import collections
+import csv
+import io
+import mmap
+import multiprocessing
+import os
+import pathlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Iterator,
+    NamedTuple,
+)
+
+from ..config import CSV_CHUNK_SIZE
+
+
+class CsvChunk(NamedTuple):
+    """A slice of consecutive CSV rows, the source metadata is carried once per chunk."""
+
+    source_file: str
+    source_file_type: str
+    rows: list[tuple[str, ...]]
+
+
+# set in the workers of `process_pool`, which do not start pools of their own
+_pool_worker = False
+
+
+def _mark_pool_worker() -> None:
+    global _pool_worker
+    _pool_worker = True
+
+
+def in_pool_worker() -> bool:
+    """Whether this process is a worker of a `process_pool`."""
+    return _pool_worker
+
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    A process pool whose workers are started by a fork server (spawned where there is
+    none) instead of being forked. The pools are created from the threads running the
+    pipeline stages, and a process forked while another thread holds a lock (e.g. pydantic
+    building a model) inherits a lock that is never released.
+    The workers know they are (see `in_pool_worker`): the pool already spreads the work
+    over the CPUs, a pool started by each worker would run workers² processes.
+    """
+    method = (
+        "forkserver"
+        if "forkserver" in multiprocessing.get_all_start_methods()
+        else "spawn"
+    )
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(method),
+        initializer=_mark_pool_worker,
+    )
+
+
+def _next_record_start(mm: mmap.mmap, record_start: int, target: int) -> int:
+    """
+    Finds the offset of the first record starting at or after `target`.
+    A newline only ends a record when the number of quotes read since `record_start`
+    is even, quoted fields can therefore span several lines. Escaped quotes ("")
+    do not change the parity.
+    Args:
+        mm (mmap.mmap): The memory-mapped file.
+        record_start (int): An offset known to be the start of a record.
+        target (int): The offset from which a newline is searched.
+    Returns:
+        int: The offset right after the newline ending the record, or the file size.
+    """
+    quotes = mm[record_start:target].count(b'"')
+    newline = mm.find(b"\n", target)
+    while newline != -1:
+        quotes += mm[target:newline].count(b'"')
+        if quotes % 2 == 0:
+            return newline + 1
+        target = newline
+        newline = mm.find(b"\n", target + 1)
+    return len(mm)
+
+
+def chunk_boundaries(
+    mm: mmap.mmap, start: int, chunk_size: int = CSV_CHUNK_SIZE
+) -> list[tuple[int, int]]:
+    """
+    Splits a memory-mapped CSV file into (start, end) byte ranges of about `chunk_size` bytes.
+    Every range starts at the beginning of a record, newlines inside quoted fields are never
+    used as split points.
+    Args:
+        mm (mmap.mmap): The memory-mapped file.
+        start (int): The offset of the first record (i.e. right after the header).
+        chunk_size (int, optional): The approximate size of a chunk in bytes. Defaults to CSV_CHUNK_SIZE.
+    Returns:
+        list[tuple[int, int]]: The byte ranges in file order.
+    """
+    size = len(mm)
+    boundaries = []
+    while start < size:
+        end = (
+            _next_record_start(mm, start, start + chunk_size)
+            if size - start > chunk_size
+            else size
+        )
+        boundaries.append((start, end))
+        start = end
+    return boundaries
+
+
+def _parse_chunk(task: tuple[pathlib.Path, int, int, str]) -> list[tuple[str, ...]]:
+    # Runs in a worker process, the file is mapped again instead of shipping bytes around.
+    file, start, end, encoding = task
+    with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode(encoding)
+    return [tuple(row) for row in csv.reader(io.StringIO(text, newline="")) if row]
+
+
+def read_csv_chunks(
+    file: pathlib.Path,
+    chunk_size: int = CSV_CHUNK_SIZE,
+    workers: int | None = None,
+    encoding: str = "utf-8",
+    source_file: str | None = None,
+) -> Iterator[CsvChunk]:
+    """
+    Reads an uncompressed CSV file in parallel, skipping its header line.
+    The file is memory-mapped, split at record boundaries and each chunk is parsed in a
+    worker process. Chunks are yielded in file order and only a bounded number of them
+    is in flight at any time. In a worker of a `process_pool` (e.g. one file of
+    `servier.main.curate_files`), the chunks are parsed in the worker itself.
+    Args:
+        file (pathlib.Path): The path to the CSV file.
+        chunk_size (int, optional): The approximate size of a chunk in bytes. Defaults to CSV_CHUNK_SIZE.
+        workers (int | None, optional): The number of worker processes. Defaults to the CPU count.
+        encoding (str, optional): The file encoding. Defaults to "utf-8".
+        source_file (str | None, optional): The source name attached to the chunks. Defaults to the file stem.
+    Yields:
+        Iterator[CsvChunk]: The chunks, each row being a tuple of the raw field values.
+    """
+    if file.stat().st_size == 0:
+        return
+    with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header_end = _next_record_start(mm, 0, 0)
+        boundaries = chunk_boundaries(mm, header_end, chunk_size)
+
+    source_file = source_file or file.stem
+    tasks = [(file, start, end, encoding) for start, end in boundaries]
+    if len(tasks) <= 1 or workers == 1 or in_pool_worker():
+        for task in tasks:
+            yield CsvChunk(source_file, "csv", _parse_chunk(task))
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with process_pool(workers) as executor:
+        # keep at most 2 chunks per worker in flight so memory stays bounded
+        tasks = collections.deque(tasks)
+        pending = collections.deque()
+        while tasks or pending:
+            while tasks and len(pending) < 2 * workers:
+                pending.append(executor.submit(_parse_chunk, tasks.popleft()))
+            yield CsvChunk(source_file, "csv", pending.popleft().result())
@@ -0,0 +1,153 @@
+import collections
+import logging
+import pathlib
+from typing import Iterator
+
+from pydantic import ValidationError
+
+from .helpers import JsonArrayWriter
+
+
+class CachedValidationError(ValueError):
+    """The validation failure of a row, replayed from the validation cache."""
+
+    def __init__(self, message: str, types: list[str]) -> None:
+        super().__init__(message)
+        self.types = types
+
+
+def error_types(error: Exception) -> list[str]:
+    """
+    Returns the error types of a validation failure, e.g. ["title:value_error"].
+    Pydantic errors are keyed by field location and error type without formatting the message.
+    Args:
+        error (Exception): The error raised while validating a row.
+    Returns:
+        list[str]: The distinct error types of the failure.
+    """
+    if isinstance(error, CachedValidationError):
+        return error.types
+    if isinstance(error, ValidationError):
+        return sorted(
+            {
+                f"{'.'.join(map(str, detail['loc']))}:{detail['type']}"
+                for detail in error.errors(include_url=False)
+            }
+        )
+    return [type(error).__name__]
+
+
+class RejectSink:
+    """
+    Receives the rows that failed validation.
+    With a destination, rejects are streamed to a JSON file of the trash zone as they occur,
+    the file being created on the first reject only. Without one they are kept in memory.
+    Rejects are counted per error type and logging is sampled: the first `log_first` rejects
+    of an error type are logged, then one every `log_every`. Messages are only formatted when
+    they are actually emitted.
+    A sink filled by a worker process is created with `defer_logging`: it logs nothing, but
+    keeps the error types of its rows (and the message of the ones it would have logged) so that
+    the sink it is merged into samples them against its own counters.
+    Usage:
+        with RejectSink(trash_zone_path / "drugs_validation_errors.json", "Drug") as rejects:
+            rejects.add(row, error)
+    """
+
+    def __init__(
+        self,
+        dest_location: pathlib.Path | None = None,
+        label: str = "",
+        indent: int | None = 4,
+        log_first: int = 10,
+        log_every: int = 1000,
+        defer_logging: bool = False,
+    ) -> None:
+        self.dest_location = dest_location
+        self.label = label
+        self.indent = indent
+        self.log_first = log_first
+        self.log_every = log_every
+        self.defer_logging = defer_logging
+        self.counters: collections.Counter[str] = collections.Counter()
+        self.count = 0
+        self.rows: list[dict] = []
+        # with defer_logging, the error types and message (if sampled) of each row of `rows`
+        self.errors: list[tuple[list[str], str | None]] = []
+        self._writer: JsonArrayWriter | None = None
+
+    def __enter__(self) -> "RejectSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.rows)
+
+    def __getstate__(self) -> dict:
+        # in-memory sinks are returned by worker processes, an open file cannot be pickled
+        return {**self.__dict__, "_writer": None}
+
+    def add(self, row: dict, error: Exception) -> None:
+        """
+        Records a rejected row.
+        Args:
+            row (dict): The row that failed validation.
+            error (Exception): The validation error.
+        """
+        self._record(row, error_types(error), error)
+
+    def merge(self, other: "RejectSink") -> None:
+        """
+        Adds the rejects of an in-memory sink created with `defer_logging`, e.g. one filled by
+        a worker process. They are counted and their logging sampled as if added to this sink.
+        Args:
+            other (RejectSink): The sink to merge.
+        """
+        for row, (types, message) in zip(other.rows, other.errors):
+            self._record(row, types, message or ", ".join(types))
+
+    def _record(self, row: dict, types: list[str], error: Exception | str) -> None:
+        self.count += 1
+        sampled = False
+        for error_type in types:
+            self.counters[error_type] += 1
+            occurrences = self.counters[error_type]
+            if occurrences <= self.log_first or occurrences % self.log_every == 0:
+                sampled = True
+                if not self.defer_logging:
+                    logging.error(
+                        "%s row %s failed validation (%s, occurrence %d): %s",
+                        self.label,
+                        row,
+                        error_type,
+                        occurrences,
+                        error,
+                    )
+        if self.defer_logging:
+            self.errors.append((types, str(error) if sampled else None))
+        self._store(row)
+
+    def _store(self, row: dict) -> None:
+        if self.dest_location is None:
+            self.rows.append(row)
+            return
+        if self._writer is None:
+            self._writer = JsonArrayWriter(self.dest_location, self.indent).__enter__()
+        self._writer.write(row)
+
+    def close(self) -> None:
+        """Closes the trash file, if any, and logs a summary of the rejects per error type."""
+        if self._writer is not None:
+            self._writer.__exit__(None, None, None)
+            self._writer = None
+        if self.count:
+            logging.warning(
+                "%s: %d rows rejected, by error type: %s",
+                self.label,
+                self.count,
+                dict(self.counters),
+            )
@@ -0,0 +1,111 @@
+import json
+import pathlib
+import sqlite3
+import time
+
+from ..checkpoints import fingerprint
+from ..config import GOLD_CACHE_MAX_ENTRIES
+from ..dag import file_digest
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS results (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        last_used REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)",
+    # content digests of the snapshots, reused while their size and mtime do not change
+    """
+    CREATE TABLE IF NOT EXISTS digests (
+        path TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        digest TEXT NOT NULL
+    )
+    """,
+]
+
+
+class ResultCache:
+    """
+    Persistent cache of the gold results, a SQLite file mapping a key to a JSON value.
+    Beyond `max_entries`, the least recently used results are evicted.
+    Usage:
+        with ResultCache(path) as cache:
+            result = cache.get(key)
+            if result is None:
+                result = ...
+                cache.put(key, result)
+    """
+
+    def __init__(
+        self, path: pathlib.Path, max_entries: int = GOLD_CACHE_MAX_ENTRIES
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        (count,) = self._conn.execute("SELECT count(*) FROM results").fetchone()
+        return count
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def digest(self, file: pathlib.Path) -> str:
+        """The content digest of a file, only computed again when the file changed."""
+        ((path, size, mtime_ns),) = fingerprint([file])
+        row = self._conn.execute(
+            "SELECT digest FROM digests WHERE path = ? AND size = ? AND mtime_ns = ?",
+            (path, size, mtime_ns),
+        ).fetchone()
+        if row:
+            return row[0]
+        digest = file_digest(file)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?)",
+                (path, size, mtime_ns, digest),
+            )
+        return digest
+
+    def get(self, key: str):
+        """Returns the cached result, None on a miss."""
+        row = self._conn.execute(
+            "SELECT value FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._conn:
+            self._conn.execute(
+                "UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0])
+
+    def put(self, key: str, value) -> None:
+        """Caches a JSON serializable result, evicting the least recently used ones."""
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+            self._conn.execute(
+                """
+                DELETE FROM results WHERE key IN (
+                    SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
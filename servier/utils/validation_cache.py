@@ -0,0 +1,243 @@
+import functools
+import hashlib
+import itertools
+import json
+import pathlib
+import sqlite3
+import time
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+)
+
+from pydantic import (
+    BaseModel,
+    TypeAdapter,
+    ValidationError,
+)
+
+from ..config import (
+    HEX_PATTERN,
+    VALIDATION_CACHE_MAX_ENTRIES,
+)
+from .rejects import (
+    CachedValidationError,
+    error_types,
+)
+
+PACKAGE_DIR = pathlib.Path(__file__).parent.parent
+# the validation of a row only depends on these, any change clears the cache
+MODEL_SOURCES = [PACKAGE_DIR / "models.py", PACKAGE_DIR / "utils" / "models_helper.py"]
+# the layout of the payloads, bumped to clear the caches written by a previous layout
+PAYLOAD_FORMAT = "json-1"
+# SQLite before 3.32 binds at most 999 variables per statement, the keys of a batch are
+# bound at once (plus the timestamp when their usage is refreshed)
+SQLITE_MAX_VARIABLES = 999
+
+VALID, REJECTED = 0, 1
+
+# Entries are appended in rowid order, only the narrow key index is updated at random
+# places (keys are hashes). Recency is kept apart, by rowid: refreshing it on every hit
+# then only rewrites small rows. It has no index, eviction scans it but is rare, see `_evict`.
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)",
+    """
+    CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY,
+        key BLOB NOT NULL UNIQUE,
+        outcome INTEGER NOT NULL,
+        payload TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS usage (
+        id INTEGER PRIMARY KEY,
+        last_used REAL NOT NULL
+    )
+    """,
+]
+
+
+def models_version() -> str:
+    """A hash of the model definitions, see MODEL_SOURCES."""
+    digest = hashlib.sha256(f"{PAYLOAD_FORMAT}:{HEX_PATTERN}".encode("utf-8"))
+    for file in MODEL_SOURCES:
+        digest.update(file.read_bytes())
+    return digest.hexdigest()
+
+
+def row_key(row: dict, model: type[BaseModel]) -> bytes:
+    """The content address of a raw row for a model."""
+    payload = json.dumps(
+        [model.__module__, model.__qualname__, row], sort_keys=True, default=str
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+
+
+@functools.cache
+def _field_decoders(model: type[BaseModel]) -> dict[str, Callable[[Any], Any]]:
+    # The fields dumped in JSON mode are restored to their types (e.g. an ISO date string
+    # to a date) by the plain type of the field: its own validators already ran before the
+    # record was cached. Strings are kept as they are.
+    return {
+        name: TypeAdapter(field.annotation).validate_python
+        for name, field in model.model_fields.items()
+        if field.annotation is not str
+    }
+
+
+def encode_record(record: BaseModel) -> str:
+    """The payload of a valid row: the JSON of the fields set on its model instance."""
+    return json.dumps(record.model_dump(mode="json", exclude_unset=True))
+
+
+def decode_record(payload: str, model: type[BaseModel]) -> BaseModel:
+    """
+    Rebuilds a model instance from its payload (see `encode_record`) without validating it.
+    Args:
+        payload (str): The JSON of the fields set on the instance.
+        model (type[BaseModel]): The model of the instance.
+    Returns:
+        BaseModel: The instance, equal to the one the row was validated into.
+    """
+    values = json.loads(payload)
+    for name, decode in _field_decoders(model).items():
+        if name in values:
+            values[name] = decode(values[name])
+    return model.model_construct(**values)
+
+
+class ValidationCache:
+    """
+    On-disk cache of validation outcomes, keyed by the hash of the raw row.
+    A valid row maps to the JSON of its model fields, restored without validation (see
+    `decode_record`); a rejected row maps to its error types and message, replayed as a
+    `CachedValidationError`. Nothing is unpickled: the file only holds data. The cache is a
+    SQLite file that can be shared by worker processes, each one opening its own connection.
+    Beyond `max_entries`, the least recently used entries are evicted down to 90% of it,
+    and the whole cache is cleared when the model definitions change (see `models_version`).
+    Usage:
+        with ValidationCache(path) as cache:
+            for row, record, error in cache.validate(rows, PubClinical):
+                ...
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        max_entries: int = VALIDATION_CACHE_MAX_ENTRIES,
+        batch_size: int = SQLITE_MAX_VARIABLES - 1,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.batch_size = min(batch_size, SQLITE_MAX_VARIABLES - 1)
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # a cache: losing the last commits on a power failure is fine, an fsync per batch is not
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+            version = models_version()
+            stored = self._conn.execute(
+                "SELECT value FROM meta WHERE name = 'models_version'"
+            ).fetchone()
+            if stored is None or stored[0] != version:
+                self._conn.execute("DELETE FROM entries")
+                self._conn.execute("DELETE FROM usage")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('models_version', ?)",
+                    (version,),
+                )
+        (self._count,) = self._conn.execute("SELECT count(*) FROM entries").fetchone()
+
+    def __enter__(self) -> "ValidationCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def validate(
+        self, rows: Iterable[dict], model: type[BaseModel]
+    ) -> Iterator[tuple[dict, BaseModel | None, Exception | None]]:
+        """
+        Validates rows against a model, only the rows missing from the cache are validated.
+        Args:
+            rows (Iterable[dict]): The raw rows.
+            model (type[BaseModel]): The model to validate the rows with.
+        Yields:
+            tuple[dict, BaseModel | None, Exception | None]: Each row, in order, with either
+                its model instance or its validation error.
+        """
+        rows = iter(rows)
+        while batch := list(itertools.islice(rows, self.batch_size)):
+            yield from self._validate_batch(batch, model)
+
+    def _validate_batch(
+        self, batch: list[dict], model: type[BaseModel]
+    ) -> list[tuple[dict, BaseModel | None, Exception | None]]:
+        keys = [row_key(row, model) for row in batch]
+        placeholders = ",".join("?" * len(keys))
+        cached = dict(
+            (key, (outcome, payload))
+            for key, outcome, payload in self._conn.execute(
+                f"SELECT key, outcome, payload FROM entries WHERE key IN ({placeholders})",
+                keys,
+            )
+        )
+        now = time.time()
+        results, new_entries, hits = [], {}, 0
+        for key, row in zip(keys, batch):
+            if key in cached:
+                hits += 1
+                outcome, payload = cached[key]
+                if outcome == VALID:
+                    results.append((row, decode_record(payload, model), None))
+                else:
+                    error = CachedValidationError(**json.loads(payload))
+                    results.append((row, None, error))
+                continue
+            try:
+                record = model(**row)
+            except ValidationError as e:
+                results.append((row, None, e))
+                values = {"message": str(e), "types": error_types(e)}
+                new_entries[key] = (REJECTED, json.dumps(values))
+            else:
+                results.append((row, record, None))
+                new_entries[key] = (VALID, encode_record(record))
+        self.hits += hits
+        self.misses += len(batch) - hits
+        with self._conn:
+            # another worker may have cached the same row in the meantime
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO entries (key, outcome, payload) VALUES (?, ?, ?)",
+                [(key, *entry) for key, entry in new_entries.items()],
+            ).rowcount
+            self._conn.execute(
+                "INSERT OR REPLACE INTO usage "
+                f"SELECT id, ? FROM entries WHERE key IN ({placeholders})",
+                [now, *keys],
+            )
+            self._count += max(inserted, 0)
+            if self._count > self.max_entries:
+                self._evict(self._count - int(self.max_entries * 0.9))
+        return results
+
+    def _evict(self, count: int) -> None:
+        ids = self._conn.execute(
+            "SELECT id FROM usage ORDER BY last_used LIMIT ?", (count,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM entries WHERE id = ?", ids)
+        self._conn.executemany("DELETE FROM usage WHERE id = ?", ids)
+        (self._count,) = self._conn.execute("SELECT count(*) FROM entries").fetchone()
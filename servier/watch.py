@@ -0,0 +1,311 @@
+import datetime
+import json
+import logging
+import pathlib
+import threading
+import time
+from typing import (
+    Callable,
+    NamedTuple,
+)
+
+from .checkpoints import (
+    CHECKPOINTS_DIR,
+    fingerprint,
+)
+from .config import (
+    COMPRESSION_EXTENSIONS,
+    DRUGS_FILE_NAMES,
+    PUBTRIALS_FILE_NAMES,
+)
+from .gold import _gold_build
+from .main import (
+    cross_reference_models,
+    curate_drugs_data,
+    curate_pubclinical_data,
+    load_curated_data,
+)
+from .models import (
+    CrossReference,
+    Drug,
+    PubClinical,
+)
+from .utils.helpers import (
+    JsonArrayWriter,
+    encode_json_item,
+    list_files_in_folder,
+    save_file_as_json,
+)
+from .utils.rejects import RejectSink
+
+# What the watcher has processed, next to the checkpoints of the main-pipeline runs
+WATCH_STATE = "watch.json"
+
+
+class FileRows(NamedTuple):
+    """
+    The rows of a landing file, as of the version identified by `fingerprint`, and their
+    JSON encoding: the snapshot is rewritten from the encoded rows of the files, only the
+    rows of new files are encoded.
+    """
+
+    fingerprint: list
+    publications: list[PubClinical]
+    cross_reference: list[CrossReference]
+    encoded_publications: list[str]
+    encoded_cross_reference: list[str]
+
+
+class LandingZoneWatcher:
+    """
+    Keeps the silver and gold zones up to date with the landing zones from a resident
+    process, instead of a main-pipeline run paying startup, imports and the curation of
+    the drug referential for every delivery.
+    The landing zones are polled with `poll`. A file is processed once its size and
+    modification time did not change for `debounce` seconds, so that a file still being
+    copied is not read half-written.
+    - The drug referential is curated once and kept in memory. It is curated again, and
+      all the publications matched again, only when a drug file changes.
+    - A new or changed publication file is curated and matched against the warm referential,
+      its rows replace the ones of its previous version. Rows of files removed from the
+      landing zone are kept.
+    After each batch, the day's silver snapshot (pubclinical_data, drugs_data and
+    cross_reference_data) is rewritten with the rows of all the files, and the gold
+    outputs are refreshed. The files processed and their row counts are kept in
+    `<silver zone>/.checkpoints/watch.json`, so that a restarted watcher reloads the
+    snapshot instead of processing everything again.
+    Usage:
+        watcher = LandingZoneWatcher(publications, drugs, silver, trash, gold)
+        watcher.run(interval=2.0)
+    """
+
+    def __init__(
+        self,
+        raw_pubclinical_data: pathlib.Path,
+        raw_drug_data: pathlib.Path,
+        silver_zone_path: pathlib.Path,
+        trash_zone_path: pathlib.Path,
+        gold_zone_path: pathlib.Path,
+        gold_drugs: list[str] = (),
+        debounce: float = 2.0,
+        compression: str | None = None,
+        indent: int | None = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.raw_pubclinical_data = raw_pubclinical_data
+        self.raw_drug_data = raw_drug_data
+        self.silver_zone_path = silver_zone_path
+        self.trash_zone_path = trash_zone_path
+        self.gold_zone_path = gold_zone_path
+        self.gold_drugs = list(gold_drugs)
+        self.debounce = debounce
+        self.ext = ".json" + COMPRESSION_EXTENSIONS.get(compression, "")
+        self.indent = indent
+        self.clock = clock
+        self.drugs: list[Drug] | None = None
+        self.drugs_fingerprint: list | None = None
+        self.files: dict[str, FileRows] = {}
+        # last fingerprint seen of each landing file, and since when it is unchanged
+        self._seen: dict[pathlib.Path, tuple[list | None, float]] = {}
+        self.state_file = silver_zone_path / CHECKPOINTS_DIR / WATCH_STATE
+        self._restore()
+
+    def run(self, interval: float = 2.0, stop: threading.Event | None = None) -> None:
+        """Polls the landing zones every `interval` seconds, until `stop` is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.poll()
+            stop.wait(interval)
+
+    def poll(self) -> bool:
+        """
+        Processes the landing files that are new or changed and stable.
+        Returns:
+            bool: Whether the silver snapshot and the gold outputs were refreshed.
+        """
+        drug_files = list_files_in_folder(self.raw_drug_data, DRUGS_FILE_NAMES)
+        publication_files = list_files_in_folder(
+            self.raw_pubclinical_data, PUBTRIALS_FILE_NAMES
+        )
+        stable = self._stable(drug_files + publication_files)
+        stamp = datetime.datetime.now().strftime("%Y_%m_%dT%H%M%S%f")
+        changed = False
+        with RejectSink(
+            self.trash_zone_path / f"drugs_validation_errors_{stamp}{self.ext}",
+            "Drug",
+            self.indent,
+        ) as drug_rejects, RejectSink(
+            self.trash_zone_path / f"pubclinical_validation_errors_{stamp}{self.ext}",
+            "Pubtrials",
+            self.indent,
+        ) as publication_rejects, RejectSink(
+            self.trash_zone_path / f"cross_reference_errors_{stamp}{self.ext}",
+            "Cross Reference",
+            self.indent,
+        ) as cross_reference_rejects:
+            drugs_fingerprint = fingerprint(drug_files)
+            if drugs_fingerprint != self.drugs_fingerprint and all(
+                file in stable for file in drug_files
+            ):
+                logging.info(
+                    f"Loading the drug referential from {len(drug_files)} files"
+                )
+                self.drugs, _ = curate_drugs_data(drug_files, rejects=drug_rejects)
+                self.drugs_fingerprint = drugs_fingerprint
+                for name, rows in self.files.items():
+                    self.files[name] = self._file_rows(
+                        rows.fingerprint,
+                        rows.publications,
+                        cross_reference_models(
+                            rows.publications, self.drugs, cross_reference_rejects
+                        )[0],
+                        rows.encoded_publications,
+                    )
+                changed = True
+            if self.drugs is None:
+                # publications wait for the referential
+                return False
+            for file in publication_files:
+                (file_fingerprint,) = fingerprint([file])
+                rows = self.files.get(str(file))
+                if file not in stable or (
+                    rows is not None and rows.fingerprint == file_fingerprint
+                ):
+                    continue
+                logging.info(f"Ingesting {file.name}")
+                publications, _ = curate_pubclinical_data(
+                    [file], rejects=publication_rejects
+                )
+                cross_reference, _ = cross_reference_models(
+                    publications, self.drugs, cross_reference_rejects
+                )
+                self.files[str(file)] = self._file_rows(
+                    file_fingerprint, publications, cross_reference
+                )
+                changed = True
+        if changed:
+            self._publish()
+        return changed
+
+    def _file_rows(
+        self,
+        file_fingerprint: list,
+        publications: list[PubClinical],
+        cross_reference: list[CrossReference],
+        encoded_publications: list[str] | None = None,
+    ) -> FileRows:
+        if encoded_publications is None:
+            encoded_publications = [
+                encode_json_item(publication.model_dump(), self.indent)
+                for publication in publications
+            ]
+        return FileRows(
+            file_fingerprint,
+            publications,
+            cross_reference,
+            encoded_publications,
+            [
+                encode_json_item(row.model_dump(exclude_none=True), self.indent)
+                for row in cross_reference
+            ],
+        )
+
+    def _write_snapshot(self, file: pathlib.Path, encoded: list[list[str]]) -> None:
+        with JsonArrayWriter(file, self.indent) as writer:
+            for rows in encoded:
+                for text in rows:
+                    writer.write_encoded(text)
+
+    def _stable(self, files: list[pathlib.Path]) -> set[pathlib.Path]:
+        now = self.clock()
+        stable = set()
+        for file in files:
+            (file_fingerprint,) = fingerprint([file])
+            previous, since = self._seen.get(file, (None, now))
+            if previous != file_fingerprint:
+                since = now
+            self._seen[file] = (file_fingerprint, since)
+            if now - since >= self.debounce:
+                stable.add(file)
+        return stable
+
+    def _snapshot_files(self, date: str) -> dict[str, pathlib.Path]:
+        return {
+            dataset: self.silver_zone_path / f"{dataset}_{date}{self.ext}"
+            for dataset in ("pubclinical_data", "drugs_data", "cross_reference_data")
+        }
+
+    def _publish(self) -> None:
+        snapshot = self._snapshot_files(datetime.datetime.now().strftime("%Y_%m_%d"))
+        self._write_snapshot(
+            snapshot["pubclinical_data"],
+            [rows.encoded_publications for rows in self.files.values()],
+        )
+        save_file_as_json(
+            snapshot["drugs_data"],
+            [drug.model_dump() for drug in self.drugs],
+            self.indent,
+        )
+        # written last, the gold commands read it
+        self._write_snapshot(
+            snapshot["cross_reference_data"],
+            [rows.encoded_cross_reference for rows in self.files.values()],
+        )
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        save_file_as_json(
+            self.state_file,
+            {
+                "snapshot": {name: file.name for name, file in snapshot.items()},
+                "drugs": self.drugs_fingerprint,
+                "files": [
+                    [
+                        name,
+                        rows.fingerprint,
+                        len(rows.publications),
+                        len(rows.cross_reference),
+                    ]
+                    for name, rows in self.files.items()
+                ],
+            },
+        )
+        _gold_build(self.silver_zone_path, self.gold_zone_path, self.gold_drugs)
+        logging.info(
+            f"Silver snapshot and gold outputs refreshed, {len(self.files)} publication files"
+        )
+
+    def _restore(self) -> None:
+        if not self.state_file.exists():
+            return
+        with open(self.state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        snapshot = {
+            name: self.silver_zone_path / file
+            for name, file in state["snapshot"].items()
+        }
+        if not all(file.exists() for file in snapshot.values()):
+            logging.warning(
+                "The watched snapshot is gone, the landing zones are processed again"
+            )
+            return
+        publications = load_curated_data(snapshot["pubclinical_data"], PubClinical)
+        cross_reference = load_curated_data(
+            snapshot["cross_reference_data"], CrossReference
+        )
+        self.drugs = load_curated_data(snapshot["drugs_data"], Drug)
+        self.drugs_fingerprint = state["drugs"]
+        publications_start = cross_reference_start = 0
+        for name, file_fingerprint, publications_count, cross_reference_count in state[
+            "files"
+        ]:
+            self.files[name] = self._file_rows(
+                file_fingerprint,
+                publications[
+                    publications_start : publications_start + publications_count
+                ],
+                cross_reference[
+                    cross_reference_start : cross_reference_start
+                    + cross_reference_count
+                ],
+            )
+            publications_start += publications_count
+            cross_reference_start += cross_reference_count
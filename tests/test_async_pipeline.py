@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import pytest
+from click.testing import CliRunner
+from hamcrest import (
+    assert_that,
+    contains_inanyorder,
+    empty,
+    equal_to,
+    has_length,
+)
+
+from servier.async_pipeline import run_async_pipeline
+from servier.cli import cli
+from servier.config import PUBTRIALS_FIELD_NAMES
+from servier.main import _main_pipeline
+
+
+@pytest.fixture
+def landing_zone(tmp_path, temp_csv_file):
+    publications = tmp_path / "publications_data"
+    drugs = tmp_path / "referential_data"
+    publications.mkdir()
+    drugs.mkdir()
+    temp_csv_file(
+        publications / "pubmed.csv",
+        PUBTRIALS_FIELD_NAMES,
+        [
+            {
+                "id": i,
+                "title": f"Use of Aspirin and Ibuprofen, study {i}",
+                "date": "2020-01-01",
+                "journal": f"Journal {i % 3}",
+            }
+            for i in range(50)
+        ]
+        + [{"id": 50, "title": "", "date": "2020-01-01", "journal": "Journal 0"}],
+    )
+    temp_csv_file(
+        drugs / "drugs.csv",
+        ["atccode", "drug"],
+        [
+            {"atccode": "A01", "drug": "ASPIRIN"},
+            {"atccode": "A02", "drug": "IBUPROFEN"},
+        ],
+    )
+    return publications, drugs
+
+
+def run_both(tmp_path, landing_zone):
+    outputs = {}
+    for runner in ("sync", "async"):
+        silver, trash = tmp_path / runner / "silver", tmp_path / runner / "trash"
+        silver.mkdir(parents=True)
+        trash.mkdir(parents=True)
+        if runner == "sync":
+            _main_pipeline(*landing_zone, silver, trash)
+        else:
+            asyncio.run(run_async_pipeline(*landing_zone, silver, trash, batch_size=7))
+        outputs[runner] = {
+            file.name.rsplit("_", 3)[0]: json.loads(file.read_text())
+            for file in [*silver.glob("*.json"), *trash.glob("*.json")]
+        }
+    return outputs
+
+
+def test_run_async_pipeline_should_produce_the_same_outputs_as_sync(
+    tmp_path, landing_zone
+):
+    # When
+    outputs = run_both(tmp_path, landing_zone)
+
+    # Then
+    sync, async_ = outputs["sync"], outputs["async"]
+    assert_that(sorted(async_), equal_to(sorted(sync)))
+    assert_that(async_["pubclinical_data"], equal_to(sync["pubclinical_data"]))
+    assert_that(async_["drugs_data"], equal_to(sync["drugs_data"]))
+    assert_that(async_["pubclinical_validation_errors"], has_length(1))
+    assert_that(async_["cross_reference_data"], has_length(100))
+
+    def without_timestamp(rows):
+        return [
+            {k: v for k, v in row.items() if k != "ingestion_timestamp"} for row in rows
+        ]
+
+    assert_that(
+        without_timestamp(async_["cross_reference_data"]),
+        contains_inanyorder(*without_timestamp(sync["cross_reference_data"])),
+    )
+
+
+def test_run_async_pipeline_should_not_create_trash_files_for_clean_data(
+    tmp_path, landing_zone
+):
+    # Given
+    publications, drugs = landing_zone
+    pubmed = publications / "pubmed.csv"
+    pubmed.write_text("\n".join(pubmed.read_text().splitlines()[:-1]) + "\n")
+    silver, trash = tmp_path / "silver", tmp_path / "trash"
+    silver.mkdir()
+    trash.mkdir()
+
+    # When
+    asyncio.run(run_async_pipeline(publications, drugs, silver, trash))
+
+    # Then
+    assert_that(list(trash.iterdir()), empty())
+    assert_that(list(silver.iterdir()), has_length(3))
+
+
+@pytest.mark.parametrize(
+    "option, refused",
+    [
+        ("--workers=2", "--workers"),
+        ("--silver-layout=star", "--silver-layout=star"),
+        ("--fuzzy-distance=1", "--fuzzy-distance"),
+    ],
+)
+def test_async_runner_should_refuse_the_sync_runner_options(
+    tmp_path, landing_zone, option, refused
+):
+    # Given
+    args = [
+        "main-pipeline",
+        f"--raw-pubclinical-data={landing_zone[0]}",
+        f"--raw-drug-data={landing_zone[1]}",
+        f"--silver-zone-path={tmp_path}",
+        f"--trash-zone-path={tmp_path}",
+        "--runner=async",
+        option,
+    ]
+
+    # When
+    result = CliRunner().invoke(cli, args)
+
+    # Then
+    assert_that(result.exit_code, equal_to(2))
+    assert_that(
+        result.output.splitlines()[-1],
+        equal_to(f"Error: {refused} requires --runner=sync"),
+    )
@@ -0,0 +1,213 @@
+import json
+
+import pytest
+from hamcrest import (
+    assert_that,
+    calling,
+    empty,
+    equal_to,
+    has_length,
+    raises,
+)
+
+import servier.main
+from servier.checkpoints import (
+    CACHE_INDEX,
+    CHECKPOINTS_DIR,
+)
+from servier.config import PUBTRIALS_FIELD_NAMES
+from servier.main import _main_pipeline
+
+
+@pytest.fixture
+def zones(tmp_path, temp_csv_file):
+    publications, drugs, silver, trash = (
+        tmp_path / zone for zone in ("publications", "drugs", "silver", "trash")
+    )
+    for zone in (publications, drugs, silver, trash):
+        zone.mkdir()
+    temp_csv_file(
+        publications / "pubmed.csv",
+        PUBTRIALS_FIELD_NAMES,
+        [
+            {
+                "id": i,
+                "title": f"Aspirin study {i}",
+                "date": "2020-01-01",
+                "journal": f"Journal {i % 3}",
+            }
+            for i in range(10)
+        ],
+    )
+    temp_csv_file(
+        drugs / "drugs.csv",
+        ["atccode", "drug"],
+        [{"atccode": "A01", "drug": "ASPIRIN"}],
+    )
+    return publications, drugs, silver, trash
+
+
+def fail_cross_reference(mocker):
+    return mocker.patch(
+        "servier.main.cross_reference_models", side_effect=RuntimeError("disk full")
+    )
+
+
+def failed_run_id(silver):
+    (run,) = (path for path in (silver / CHECKPOINTS_DIR).iterdir() if path.is_dir())
+    return run.name
+
+
+class TestResume:
+    def test_resume_should_skip_the_committed_stages(self, zones, mocker):
+        # Given
+        publications, drugs, silver, trash = zones
+        fail_cross_reference(mocker)
+        with pytest.raises(RuntimeError):
+            _main_pipeline(publications, drugs, silver, trash)
+        mocker.stopall()
+        curate = mocker.spy(servier.main, "curate_pubclinical_data")
+        run_id = failed_run_id(silver)
+
+        # When
+        resumed_run_id = _main_pipeline(
+            publications, drugs, silver, trash, resume=run_id
+        )
+
+        # Then
+        assert_that(resumed_run_id, equal_to(run_id))
+        assert_that(curate.call_count, equal_to(0))
+        (cross_reference_file,) = silver.glob("cross_reference_data_*.json")
+        assert_that(json.loads(cross_reference_file.read_text()), has_length(10))
+
+    def test_failed_stage_should_not_leave_partial_files(self, zones, mocker):
+        # Given
+        publications, drugs, silver, trash = zones
+        fail_cross_reference(mocker)
+
+        # When
+        with pytest.raises(RuntimeError):
+            _main_pipeline(publications, drugs, silver, trash)
+
+        # Then
+        assert_that(
+            sorted(file.name.rsplit("_", 3)[0] for file in silver.glob("*.json")),
+            equal_to(["drugs_data", "pubclinical_data"]),
+        )
+        assert_that(list(silver.glob(".*.tmp*")), empty())
+
+    def test_resume_should_redo_stages_whose_inputs_changed(self, zones, mocker):
+        # Given
+        publications, drugs, silver, trash = zones
+        fail_cross_reference(mocker)
+        with pytest.raises(RuntimeError):
+            _main_pipeline(publications, drugs, silver, trash)
+        mocker.stopall()
+        with open(drugs / "drugs.csv", "a") as f:
+            f.write("A02,STUDY\n")
+        curate = mocker.spy(servier.main, "curate_drugs_data")
+
+        # When
+        _main_pipeline(publications, drugs, silver, trash, resume=failed_run_id(silver))
+
+        # Then
+        assert_that(curate.call_count, equal_to(1))
+        (cross_reference_file,) = silver.glob("cross_reference_data_*.json")
+        assert_that(json.loads(cross_reference_file.read_text()), has_length(20))
+
+    def test_resume_should_reject_unknown_runs_and_other_parameters(self, zones):
+        # Given
+        publications, drugs, silver, trash = zones
+        run_id = _main_pipeline(publications, drugs, silver, trash)
+
+        # Then
+        assert_that(
+            calling(_main_pipeline).with_args(
+                publications, drugs, silver, trash, resume="unknown"
+            ),
+            raises(FileNotFoundError),
+        )
+        assert_that(
+            calling(_main_pipeline).with_args(
+                publications, drugs, silver, trash, compression="gzip", resume=run_id
+            ),
+            raises(ValueError),
+        )
+
+
+class TestStageCache:
+    def test_new_run_should_reuse_stages_with_unchanged_inputs(self, zones, mocker):
+        # Given
+        publications, drugs, silver, trash = zones
+        _main_pipeline(publications, drugs, silver, trash)
+        with open(publications / "pubmed.csv", "a") as f:
+            f.write("10,Aspirin study 10,2020-01-01,Journal 1\n")
+        curate_drugs = mocker.spy(servier.main, "curate_drugs_data")
+        curate_publications = mocker.spy(servier.main, "curate_pubclinical_data")
+
+        # When
+        _main_pipeline(publications, drugs, silver, trash)
+
+        # Then
+        assert_that(curate_drugs.call_count, equal_to(0))
+        assert_that(curate_publications.call_count, equal_to(1))
+        (cross_reference_file,) = silver.glob("cross_reference_data_*.json")
+        assert_that(json.loads(cross_reference_file.read_text()), has_length(11))
+
+    def test_code_changes_should_invalidate_the_cache(self, zones, mocker):
+        # Given
+        publications, drugs, silver, trash = zones
+        _main_pipeline(publications, drugs, silver, trash)
+        mocker.patch("servier.dag.code_version", return_value="next version")
+        curate_drugs = mocker.spy(servier.main, "curate_drugs_data")
+
+        # When
+        _main_pipeline(publications, drugs, silver, trash)
+
+        # Then
+        assert_that(curate_drugs.call_count, equal_to(1))
+
+    def test_cached_outputs_should_be_copied_under_the_new_run_date(
+        self, zones, mocker
+    ):
+        # Given
+        publications, drugs, silver, trash = zones
+        _main_pipeline(publications, drugs, silver, trash)
+        mocker.patch("servier.checkpoints.RUN_DATE", "2099_01_01")
+
+        # When
+        _main_pipeline(publications, drugs, silver, trash)
+
+        # Then
+        files = sorted(silver.glob("cross_reference_data_*.json"))
+        assert_that(files, has_length(2))
+        assert_that(files[1].name, equal_to("cross_reference_data_2099_01_01.json"))
+        assert_that(files[1].read_text(), equal_to(files[0].read_text()))
+
+    def test_only_the_checkpoints_of_the_most_recent_runs_should_be_kept(
+        self, zones, mocker
+    ):
+        # Given: the star layout keeps the curated rows with the checkpoints of the run
+        publications, drugs, silver, trash = zones
+        mocker.patch("servier.checkpoints.CHECKPOINT_RUNS_KEPT", 2)
+        run_ids = [
+            _main_pipeline(publications, drugs, silver, trash, layout="star")
+            for _ in range(3)
+        ]
+        curate_drugs = mocker.spy(servier.main, "curate_drugs_data")
+
+        # When
+        run_ids.append(
+            _main_pipeline(publications, drugs, silver, trash, layout="star")
+        )
+
+        # Then: the copies of the curated rows of the kept runs are reused
+        runs = sorted(path.name for path in (silver / CHECKPOINTS_DIR).iterdir())
+        assert_that(runs, equal_to([*run_ids[2:], CACHE_INDEX]))
+        assert_that(curate_drugs.call_count, equal_to(0))
+        assert_that(
+            calling(_main_pipeline).with_args(
+                publications, drugs, silver, trash, layout="star", resume=run_ids[0]
+            ),
+            raises(FileNotFoundError),
+        )
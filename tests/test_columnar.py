@@ -0,0 +1,146 @@
+import pytest
+from hamcrest import (
+    assert_that,
+    equal_to,
+    none,
+)
+
+from servier import gold
+from servier.gold import _gold_build
+from servier.utils.helpers import (
+    get_all_drugs_by_journals,
+    get_all_journals_by_drug,
+    journal_with_most_distinct_drug_mentions,
+)
+
+pytest.importorskip("numpy")
+
+from servier.utils.columnar import CrossReferenceStore  # noqa: E402
+
+
+class TestCrossReferenceStore:
+    def test_store_should_encode_each_distinct_value_once(
+        self, cross_reference_sample_data
+    ):
+        # When
+        store = CrossReferenceStore.from_rows(cross_reference_sample_data)
+        # Then
+        drugs = store.columns["drug"]
+        assert_that(len(store), equal_to(len(cross_reference_sample_data)))
+        assert_that(
+            drugs.values,
+            equal_to(sorted({r["drug"] for r in cross_reference_sample_data})),
+        )
+        assert_that(
+            drugs.decode(drugs.codes),
+            equal_to([r["drug"] for r in cross_reference_sample_data]),
+        )
+
+    def test_journal_with_max_distinct_drugs_should_match_row_helpers(
+        self, cross_reference_sample_data
+    ):
+        # Given
+        store = CrossReferenceStore.from_rows(cross_reference_sample_data)
+        # When
+        the_journal = store.journal_with_max_distinct_drugs()
+        # Then
+        assert_that(
+            the_journal,
+            equal_to(
+                journal_with_most_distinct_drug_mentions(cross_reference_sample_data)
+            ),
+        )
+
+    def test_journal_with_max_distinct_drugs_should_break_ties_alphabetically(self):
+        # Given
+        rows = [
+            {"drug": "B", "journal": "Journal Z"},
+            {"drug": "A", "journal": "Journal A"},
+            {"drug": "A", "journal": "Journal Z"},
+            {"drug": "B", "journal": "Journal A"},
+        ]
+        # When
+        the_journal = CrossReferenceStore.from_rows(
+            rows
+        ).journal_with_max_distinct_drugs()
+        # Then
+        assert_that(the_journal, equal_to("Journal A"))
+
+    def test_journal_with_max_distinct_drugs_should_return_none_when_empty(self):
+        assert_that(
+            CrossReferenceStore.from_rows([]).journal_with_max_distinct_drugs(), none()
+        )
+
+    @pytest.mark.parametrize("drug", ["DIPHENHYDRAMINE", " tetracycline ", "UNKNOWN"])
+    def test_filters_should_match_row_helpers(self, cross_reference_sample_data, drug):
+        # Given
+        store = CrossReferenceStore.from_rows(cross_reference_sample_data)
+        # When
+        journals = store.journals_by_drug(drug)
+        drugs = store.drugs_by_journals(journals, source_file="pubmed")
+        # Then
+        expected_journals = get_all_journals_by_drug(cross_reference_sample_data, drug)
+        assert_that(journals, equal_to(expected_journals))
+        assert_that(
+            drugs,
+            equal_to(
+                get_all_drugs_by_journals(
+                    cross_reference_sample_data, expected_journals, source_file="pubmed"
+                )
+            ),
+        )
+
+    def test_drugs_by_journals_with_unknown_source_file(
+        self, cross_reference_sample_data
+    ):
+        # Given
+        store = CrossReferenceStore.from_rows(cross_reference_sample_data)
+        # When
+        drugs = store.drugs_by_journals(["Psychopharmacology"], source_file="unknown")
+        # Then
+        assert_that(drugs, equal_to(set()))
+
+    def test_store_should_skip_rows_without_drug_or_journal(self):
+        # When
+        store = CrossReferenceStore.from_rows(
+            [{"drug": "A", "journal": "J"}, {"journal": "J"}, {"drug": "B"}]
+        )
+        # Then
+        assert_that(len(store), equal_to(1))
+
+    def test_saved_store_should_load_with_its_metadata(
+        self, tmp_path, cross_reference_sample_data
+    ):
+        # Given
+        store = CrossReferenceStore.from_rows(cross_reference_sample_data)
+        store.save(tmp_path / "store.npz", snapshot="digest")
+        # When
+        loaded, metadata = CrossReferenceStore.load(tmp_path / "store.npz")
+        # Then
+        assert_that(metadata, equal_to({"snapshot": "digest"}))
+        for name, column in store.columns.items():
+            assert_that(loaded.columns[name].values, equal_to(column.values))
+            assert_that(
+                loaded.columns[name].codes.tolist(), equal_to(column.codes.tolist())
+            )
+
+
+def test_gold_outputs_should_be_computed_from_the_saved_store(
+    mocker, temp_json_file, silver_and_gold_paths, cross_reference_sample_data
+):
+    # Given
+    silver_zone_path, gold_zone_path = silver_and_gold_paths
+    temp_json_file(
+        silver_zone_path / "cross_reference_data_2020_01_01.json",
+        cross_reference_sample_data,
+    )
+    _gold_build(silver_zone_path, gold_zone_path, ["TETRACYCLINE"])
+    expected = _gold_build(
+        silver_zone_path, gold_zone_path, ["ETHANOL"], use_cache=False
+    )
+    load = mocker.spy(gold, "load_cross_reference_snapshot")
+    # When: a new output of the same snapshot
+    results = _gold_build(silver_zone_path, gold_zone_path, ["ETHANOL"])
+    # Then
+    assert_that(load.call_count, equal_to(0))
+    assert_that(results, equal_to(expected))
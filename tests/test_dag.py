@@ -0,0 +1,98 @@
+import threading
+
+from hamcrest import (
+    assert_that,
+    calling,
+    equal_to,
+    raises,
+)
+
+from servier.checkpoints import RunCheckpoints
+from servier.dag import (
+    Stage,
+    run_stages,
+)
+
+
+def stage(name, inputs, outputs, run):
+    def write_outputs(upstream):
+        result = run(upstream)
+        for output in outputs:
+            output.write_text(str(result))
+        return result
+
+    return Stage(
+        name, inputs, outputs, write_outputs, lambda: int(outputs[0].read_text())
+    )
+
+
+class TestRunStages:
+    def test_independent_stages_should_run_concurrently(self, tmp_path):
+        # Given
+        checkpoints = RunCheckpoints.start(tmp_path, {})
+        a, b, c = (tmp_path / name for name in "abc")
+        # a and b wait for each other, they deadlock unless they run at the same time
+        barrier = threading.Barrier(2, timeout=5)
+
+        def independent(value):
+            def run(upstream):
+                barrier.wait()
+                return value
+
+            return run
+
+        stages = [
+            stage("sum", [a, b], [c], lambda upstream: upstream("a") + upstream("b")),
+            stage("a", [], [a], independent(1)),
+            stage("b", [], [b], independent(2)),
+        ]
+
+        # When
+        keys = run_stages(stages, checkpoints)
+
+        # Then
+        assert_that(sorted(keys), equal_to(["a", "b", "sum"]))
+        assert_that(c.read_text(), equal_to("3"))
+
+    def test_skipped_stages_should_be_loaded_only_when_needed(self, tmp_path):
+        # Given
+        a, b, x = tmp_path / "a", tmp_path / "b", tmp_path / "x"
+        x.write_text("1")
+        calls = []
+
+        def load_a():
+            calls.append("load a")
+            return int(a.read_text())
+
+        stages = [
+            stage("a", [], [a], lambda upstream: calls.append("run a") or 1)._replace(
+                load=load_a
+            ),
+            stage(
+                "b", [a, x], [b], lambda upstream: upstream("a") + int(x.read_text())
+            ),
+        ]
+        run_stages(stages, RunCheckpoints.start(tmp_path, {}))
+        run_stages(stages, RunCheckpoints.start(tmp_path, {}))
+        x.write_text("10")
+
+        # When
+        run_stages(stages, RunCheckpoints.start(tmp_path, {}))
+
+        # Then
+        assert_that(calls, equal_to(["run a", "load a"]))
+        assert_that(b.read_text(), equal_to("11"))
+
+    def test_run_stages_should_reject_cycles(self, tmp_path):
+        # Given
+        a, b = tmp_path / "a", tmp_path / "b"
+        stages = [
+            stage("a", [b], [a], lambda upstream: 1),
+            stage("b", [a], [b], lambda upstream: 1),
+        ]
+
+        # Then
+        assert_that(
+            calling(run_stages).with_args(stages, RunCheckpoints.start(tmp_path, {})),
+            raises(ValueError, "cycle"),
+        )
@@ -0,0 +1,107 @@
+import random
+
+from hamcrest import (
+    assert_that,
+    contains_exactly,
+    equal_to,
+    has_entries,
+    has_key,
+    has_length,
+    not_,
+)
+
+from servier.main import cross_reference_models
+from servier.models import (
+    Drug,
+    PubClinical,
+)
+from servier.utils.fuzzy import (
+    TitleIndex,
+    edit_distance,
+)
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+class TestEditDistance:
+    def test_edit_distance_should_match_the_dynamic_programming_distance(self):
+        rng = random.Random(0)
+        for _ in range(2000):
+            a, b = (
+                "".join(rng.choice("abc") for _ in range(rng.randint(0, 70)))
+                for _ in range(2)
+            )
+            bound = rng.randint(0, 4)
+            distance = levenshtein(a, b)
+            assert_that(edit_distance(a, b), equal_to(distance))
+            assert_that(edit_distance(a, b, bound), equal_to(min(distance, bound + 1)))
+
+
+class TestTitleIndex:
+    def test_matches_should_find_typos_with_a_score(self):
+        # Given
+        index = TitleIndex(
+            [
+                "Diphenhydramin in allergy",
+                "Topical betametasone cream",
+                "Betamethasone and dexamethasone",
+                "Hip fracture",
+            ]
+        )
+        # When / Then
+        assert_that(
+            index.matches("DIPHENHYDRAMINE", 2), equal_to({0: round(1 - 1 / 15, 4)})
+        )
+        assert_that(
+            index.matches("BETAMETHASONE", 2),
+            equal_to({1: round(1 - 1 / 13, 4), 2: 1.0}),
+        )
+        assert_that(index.matches("ATROPINE", 2), equal_to({}))
+
+    def test_matches_should_compare_multi_word_drugs_with_as_many_tokens(self):
+        index = TitleIndex(["Effects of vitamin-c on colds", "Vitamin and calcium"])
+        assert_that(index.matches("Vitamin C", 1), equal_to({0: 1.0}))
+
+
+def test_cross_reference_models_with_max_distance_should_report_match_scores():
+    # Given
+    pubclinical_data = [
+        PubClinical(
+            title=title,
+            journal="Journal",
+            date="2023-01-01",
+            source_file="pubmed",
+            source_file_type="csv",
+        )
+        for title in ["Aspirin in heart disease", "Asprin in pain", "USA study"]
+    ]
+    drugs_data = [
+        Drug(atccode="A01", drug="ASPIRIN"),
+        Drug(atccode="A02", drug="ASA"),
+    ]
+    # When
+    exact, _ = cross_reference_models(pubclinical_data, drugs_data)
+    fuzzy, _ = cross_reference_models(pubclinical_data, drugs_data, max_distance=2)
+    # Then
+    assert_that(exact, has_length(1))
+    assert_that(exact[0].model_dump(exclude_none=True), not_(has_key("match_score")))
+    assert_that(
+        [row.match_score for row in fuzzy],
+        # one edit for ASPIRIN, ASA is too short to match USA
+        contains_exactly(1.0, round(1 - 1 / 7, 4)),
+    )
+    assert_that(fuzzy[0].model_dump(), has_entries(drug="ASPIRIN", match_score=1.0))
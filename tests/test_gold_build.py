@@ -0,0 +1,153 @@
+import datetime
+import json
+import subprocess
+import sys
+
+import pytest
+from click.testing import CliRunner
+from hamcrest import (
+    assert_that,
+    contains_inanyorder,
+    empty,
+    equal_to,
+)
+
+from servier import gold
+from servier.cli import cli
+from servier.gold import (
+    _drug_neighbourhood,
+    _get_drugs_from_journals_that_mention_a_specific_drug,
+    _journal_activity,
+    _journal_with_max_drugs,
+)
+from servier.utils.helpers import save_files_as_json
+
+
+def read_outputs(gold_zone_path):
+    return {
+        file.name: json.loads(file.read_text())
+        for file in gold_zone_path.glob("*.json")
+    }
+
+
+def test_gold_build_should_load_the_snapshot_once_for_all_outputs(
+    mocker, tmp_path, temp_json_file, cross_reference_sample_data
+):
+    # Given
+    silver_zone_path = tmp_path / "silver_zone"
+    silver_zone_path.mkdir()
+    temp_json_file(
+        silver_zone_path / "cross_reference_data_2020_01_01.json",
+        cross_reference_sample_data,
+    )
+    commands_gold, build_gold = tmp_path / "commands_gold", tmp_path / "build_gold"
+    for zone in (commands_gold, build_gold):
+        zone.mkdir()
+    drugs = ["DIPHENHYDRAMINE", "TETRACYCLINE", "UNKNOWN"]
+    _journal_with_max_drugs(silver_zone_path, commands_gold, use_cache=False)
+    for drug in drugs:
+        _get_drugs_from_journals_that_mention_a_specific_drug(
+            silver_zone_path, commands_gold, drug, use_cache=False
+        )
+    load = mocker.spy(gold, "load_cross_reference_snapshot")
+    # When
+    args = [
+        "gold-build",
+        f"--silver-zone-path={silver_zone_path}",
+        f"--gold-zone-path={build_gold}",
+    ]
+    result = CliRunner().invoke(cli, args + [f"--drug={drug}" for drug in drugs])
+    # Then
+    assert result.exit_code == 0, result.output
+    assert_that(load.call_count, equal_to(1))
+    assert_that(read_outputs(build_gold), equal_to(read_outputs(commands_gold)))
+    assert_that(
+        result.output.splitlines(),
+        contains_inanyorder(
+            *(str(build_gold / name) for name in read_outputs(build_gold))
+        ),
+    )
+    # the results are cached for the commands
+    _journal_with_max_drugs(silver_zone_path, build_gold)
+    assert_that(load.call_count, equal_to(1))
+
+
+def test_gold_build_should_load_the_snapshot_once_for_the_selected_outputs(
+    mocker, tmp_path, temp_json_file, cross_reference_sample_data
+):
+    # Given
+    pytest.importorskip("numpy")
+    silver_zone_path = tmp_path / "silver_zone"
+    silver_zone_path.mkdir()
+    temp_json_file(
+        silver_zone_path / "cross_reference_data_2020_01_01.json",
+        cross_reference_sample_data,
+    )
+    commands_gold, build_gold = tmp_path / "commands_gold", tmp_path / "build_gold"
+    for zone in (commands_gold, build_gold):
+        zone.mkdir()
+    as_of = datetime.date(2020, 5, 1)
+    _journal_with_max_drugs(silver_zone_path, commands_gold, use_cache=False)
+    _get_drugs_from_journals_that_mention_a_specific_drug(
+        silver_zone_path, commands_gold, "TETRACYCLINE", use_cache=False
+    )
+    _journal_activity(silver_zone_path, commands_gold, days=90, as_of=as_of)
+    _drug_neighbourhood(
+        silver_zone_path, commands_gold, "TETRACYCLINE", use_cache=False
+    )
+    _journal_with_max_drugs(
+        silver_zone_path, commands_gold, use_cache=False, approximate=True
+    )
+    load = mocker.spy(gold, "load_cross_reference_snapshot")
+    # When
+    result = CliRunner().invoke(
+        cli,
+        [
+            "gold-build",
+            f"--silver-zone-path={silver_zone_path}",
+            f"--gold-zone-path={build_gold}",
+            "--drug=TETRACYCLINE",
+            "--journal-activity",
+            "--days=90",
+            f"--as-of={as_of}",
+            "--neighbourhood=TETRACYCLINE",
+            "--approximate",
+        ],
+    )
+    # Then
+    assert result.exit_code == 0, result.output
+    assert_that(load.call_count, equal_to(1))
+    assert_that(read_outputs(build_gold), equal_to(read_outputs(commands_gold)))
+    assert_that(
+        result.output.splitlines(),
+        contains_inanyorder(
+            *(str(build_gold / name) for name in read_outputs(commands_gold))
+        ),
+    )
+
+
+def test_save_files_as_json_should_publish_all_files_or_none(tmp_path):
+    # Given
+    files = {
+        tmp_path / "a.json": ["A"],
+        tmp_path / "missing" / "b.json": ["B"],
+    }
+    # When
+    with pytest.raises(FileNotFoundError):
+        save_files_as_json(files)
+    # Then
+    assert_that(list(tmp_path.iterdir()), empty())
+
+
+@pytest.mark.parametrize("module", ["servier.gold", "servier.main"])
+def test_import_should_not_load_multiprocessing(module):
+    # Given
+    code = f"import sys, {module}; print('multiprocessing' in sys.modules)"
+
+    # When
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    # Then
+    assert_that(result.stdout.strip(), equal_to("False"))
@@ -0,0 +1,179 @@
+import datetime
+import json
+import random
+
+import pytest
+from hamcrest import (
+    assert_that,
+    equal_to,
+)
+
+pytest.importorskip("numpy")
+
+from servier import gold  # noqa: E402
+from servier.gold import (  # noqa: E402
+    _drug_neighbourhood,
+    join_star_schema,
+)
+from servier.utils.graph import CrossReferenceGraph  # noqa: E402
+from servier.utils.helpers import (  # noqa: E402
+    get_all_drugs_by_journals,
+    get_all_journals_by_drug,
+)
+
+
+def star_schema(seed=3):
+    rng = random.Random(seed)
+    drugs = [{"drug_id": 100 + i, "drug": f"DRUG{i}"} for i in range(15)]
+    publications = [
+        {
+            "publication_id": 1000 + i,
+            "title": f"Title {i}",
+            "date": str(datetime.date(2020, 1, 1) + datetime.timedelta(days=i % 60)),
+            "journal": f"Journal {rng.randrange(8)}",
+            "source_file": rng.choice(["pubmed", "clinical_trials"]),
+        }
+        for i in range(80)
+    ]
+    mentions = [
+        {"publication_id": publication["publication_id"], "drug_id": drug["drug_id"]}
+        for publication in publications
+        for drug in rng.sample(drugs, rng.randrange(3))
+    ]
+    return publications, drugs, mentions
+
+
+def test_two_hops_through_pubmed_journals_should_match_the_gold_helpers(
+    cross_reference_sample_data,
+):
+    # Given
+    graph = CrossReferenceGraph.from_rows(cross_reference_sample_data)
+    # When
+    neighbourhood = graph.k_hop(
+        "drug", "diphenhydramine", 2, ["mentioned_in"], source_file="pubmed"
+    )
+    # Then
+    expected = get_all_drugs_by_journals(
+        cross_reference_sample_data,
+        get_all_journals_by_drug(cross_reference_sample_data, "DIPHENHYDRAMINE"),
+        source_file="pubmed",
+    )
+    assert_that(set(neighbourhood["drug"]), equal_to(expected))
+    assert_that(
+        neighbourhood["journal"],
+        equal_to({"Journal of emergency nursing": 1, "The Journal of pediatrics": 1}),
+    )
+
+
+def test_star_schema_graph_should_match_a_brute_force_traversal():
+    # Given
+    publications, drugs, mentions = star_schema()
+    graph = CrossReferenceGraph.from_star_schema(publications, drugs, mentions)
+    rows = join_star_schema(publications, drugs, mentions)
+    start, end = datetime.date(2020, 1, 10), datetime.date(2020, 2, 10)
+    # When
+    co_mentioned = graph.k_hop("drug", "DRUG0", 2, ["mentions"], start=start, end=end)
+    by_journal = graph.k_hop("drug", "DRUG0", 2, ["mentioned_in"])
+    # Then
+    publication_drugs = {}
+    for mention in mentions:
+        publication_drugs.setdefault(mention["publication_id"], set()).add(
+            mention["drug_id"]
+        )
+    dated = {
+        publication["publication_id"]
+        for publication in publications
+        if start <= datetime.date.fromisoformat(publication["date"]) <= end
+    }
+    expected_publications = {
+        publication_id
+        for publication_id, drug_ids in publication_drugs.items()
+        if 100 in drug_ids and publication_id in dated
+    }
+    assert_that(
+        set(co_mentioned["publication"]),
+        equal_to(
+            {
+                publication["title"]
+                for publication in publications
+                if publication["publication_id"] in expected_publications
+            }
+        ),
+    )
+    assert_that(
+        set(co_mentioned["drug"]),
+        equal_to(
+            {
+                f"DRUG{drug_id - 100}"
+                for publication_id in expected_publications
+                for drug_id in publication_drugs[publication_id]
+            }
+        ),
+    )
+    assert_that(
+        set(by_journal["drug"]),
+        equal_to(
+            get_all_drugs_by_journals(rows, get_all_journals_by_drug(rows, "DRUG0"))
+        ),
+    )
+
+
+def test_publications_should_be_found_by_title(tmp_path):
+    # Given: two publications share a title
+    publications, drugs, mentions = star_schema()
+    publications[1] = dict(publications[1], title=publications[0]["title"])
+    graph = CrossReferenceGraph.from_star_schema(publications, drugs, mentions)
+    graph.save(tmp_path / "graph.npz")
+    loaded, _ = CrossReferenceGraph.load(tmp_path / "graph.npz")
+    # When
+    found = [g.find("publication", "Title 0") for g in (graph, loaded)]
+    neighbourhood = loaded.k_hop("publication", "Title 2", 1, ["published_in"])
+    # Then
+    for codes in found:
+        assert_that(len(codes), equal_to(2))
+    assert_that(graph.find("publication", "Title 1"), equal_to([]))
+    assert_that(
+        neighbourhood,
+        equal_to(
+            {
+                "drug": {},
+                "journal": {publications[2]["journal"]: 1},
+                "publication": {"Title 2": 0},
+            }
+        ),
+    )
+
+
+def test_traversal_should_only_visit_the_neighbourhood(mocker):
+    # Given
+    graph = CrossReferenceGraph.from_star_schema(*star_schema())
+    neighbours = mocker.spy(CrossReferenceGraph, "neighbours")
+    # When
+    neighbourhood = graph.k_hop("drug", "DRUG0", 1)
+    # Then: the drug is expanded once per edge type touching drugs
+    assert_that(neighbours.call_count, equal_to(2))
+    assert_that(
+        len(neighbourhood["publication"]) + len(neighbourhood["journal"]) > 0,
+        equal_to(True),
+    )
+
+
+def test_drug_neighbourhood_should_reuse_the_compiled_graph(
+    mocker, temp_json_file, cross_reference_sample_data, silver_and_gold_paths
+):
+    # Given
+    silver_zone_path, gold_zone_path = silver_and_gold_paths
+    temp_json_file(
+        silver_zone_path / "cross_reference_data_2020_01_01.json",
+        cross_reference_sample_data,
+    )
+    _drug_neighbourhood(silver_zone_path, gold_zone_path, "TETRACYCLINE", hops=2)
+    (output,) = gold_zone_path.glob("neighbourhood_of_TETRACYCLINE_*.json")
+    expected = json.loads(output.read_text())
+    load = mocker.spy(gold, "_load_json")
+    # When
+    _drug_neighbourhood(silver_zone_path, gold_zone_path, "TETRACYCLINE", hops=2)
+    # Then
+    assert_that(load.call_count, equal_to(0))
+    assert_that(json.loads(output.read_text()), equal_to(expected))
+    assert_that(expected["drug"], equal_to({"TETRACYCLINE": 0, "ETHANOL": 2}))
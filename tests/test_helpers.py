@@ -1,3 +1,7 @@
+import gzip
+import json
+import logging
+import lzma
 import pathlib
 
 import pytest
@@ -7,6 +11,7 @@ from hamcrest import (
     contains_inanyorder,
     empty,
     equal_to,
+    has_length,
     raises,
 )
 
@@ -14,11 +19,18 @@ from servier.config import (
     PUBTRIALS_FIELD_NAMES,
     PUBTRIALS_FILE_NAMES,
 )
+from servier.main import validate_rows
+from servier.models import PubClinical
 from servier.utils.helpers import (
+    RAW_READERS,
+    JsonArrayWriter,
     get_all_drugs_by_journals,
     get_all_journals_by_drug,
+    group_files_by_source,
     list_files_in_folder,
     read_raw_data,
+    register_reader,
+    save_file_as_json,
 )
 
 
@@ -206,6 +218,63 @@ class TestListFilesInFolder:
         assert_that(txt_file, equal_to(tmp_path / "dummy_file.txt"))
         assert_that(files, contains_inanyorder(csv_file, json_file))
 
+    def test_list_files_in_folder_should_accept_compressed_supported_file_names(
+        self, tmp_path, temp_random_text_file
+    ):
+        # Given
+        gz_file = tmp_path / "pubmed.csv.gz"
+        gz_file.write_bytes(gzip.compress(b"id,title,date,journal\n"))
+        temp_random_text_file("dummy_file.txt.gz", "FAKE_CONTENT")
+
+        # When
+        files = list_files_in_folder(tmp_path, PUBTRIALS_FILE_NAMES)
+
+        # Then
+        assert_that(files, contains_inanyorder(gz_file))
+
+    def test_list_files_in_folder_should_skip_compressed_parquet_files(
+        self, tmp_path, temp_random_text_file, caplog
+    ):
+        # Given
+        gz_file = tmp_path / "pubmed.csv.gz"
+        gz_file.write_bytes(gzip.compress(b"id,title,date,journal\n"))
+        (tmp_path / "pubmed.parquet.gz").write_bytes(gzip.compress(b"PAR1"))
+
+        # When
+        with caplog.at_level(logging.WARNING):
+            files = list_files_in_folder(tmp_path, PUBTRIALS_FILE_NAMES)
+
+        # Then
+        assert_that(files, equal_to([gz_file]))
+        assert_that(
+            caplog.messages,
+            equal_to(
+                [
+                    "Skipping pubmed.parquet.gz: compressed .parquet files are not "
+                    "supported, decompress it to pubmed.parquet"
+                ]
+            ),
+        )
+
+    def test_list_files_in_folder_should_return_shards_grouped_by_source_in_order(
+        self, tmp_path, temp_json_file, temp_random_text_file
+    ):
+        # Given
+        shards = [temp_json_file(f"pubmed_part-{i:05d}.json", []) for i in (10, 2, 1)]
+        pubmed = temp_json_file("pubmed.json", [])
+        temp_random_text_file("pubmed_part-00003.txt", "FAKE_CONTENT")
+        temp_random_text_file("drugs_part-00001.csv", "FAKE_CONTENT")
+
+        # When
+        files = list_files_in_folder(tmp_path, PUBTRIALS_FILE_NAMES)
+
+        # Then
+        assert_that(files, equal_to([pubmed, shards[2], shards[1], shards[0]]))
+        assert_that(
+            group_files_by_source(files),
+            equal_to({"pubmed": [pubmed, shards[2], shards[1], shards[0]]}),
+        )
+
     def test_list_files_in_folder_should_return_empty_list_when_no_file_in_dir(
         self, tmp_path
     ):
@@ -284,3 +353,163 @@ class TestReadRawData:
 
         # Then
         assert_that(result, equal_to(expected_result))
+
+    def test_read_raw_data_should_decompress_csv_data(self, tmp_path):
+        # Given
+        gz_file = tmp_path / "pubmed.csv.gz"
+        gz_file.write_bytes(
+            gzip.compress(
+                b"id,title,date,journal\n1,FAKE_TITLE,2024-11-13,Journal of emergency nursing\n"
+            )
+        )
+        expected_result = [
+            {
+                "id": "1",
+                "title": "FAKE_TITLE",
+                "date": "2024-11-13",
+                "journal": "Journal of emergency nursing",
+                "source_file": "pubmed",
+                "source_file_type": "csv",
+            }
+        ]
+
+        # When
+        result = list(read_raw_data(gz_file))
+
+        # Then
+        assert_that(result, equal_to(expected_result))
+
+    def test_read_raw_data_should_keep_logical_source_name_for_shards(
+        self, temp_json_file
+    ):
+        # Given
+        json_file = temp_json_file("pubmed_part-00042.json", [{"id": "1"}])
+
+        # When
+        result = list(read_raw_data(json_file))
+
+        # Then
+        assert_that(
+            result,
+            equal_to(
+                [{"id": "1", "source_file": "pubmed", "source_file_type": "json"}]
+            ),
+        )
+
+    def test_read_raw_data_should_stream_compressed_ndjson_data(self, tmp_path):
+        # Given
+        rows = [
+            {"id": "1", "title": "FAKE_TITLE", "date": "2024-11-13", "journal": "J1"},
+            {"id": "2", "title": "OTHER_TITLE", "date": "2024-11-14", "journal": "J2"},
+        ]
+        ndjson_file = tmp_path / "pubmed_part-00001.ndjson.gz"
+        ndjson_file.write_bytes(
+            gzip.compress(
+                "\n".join(json.dumps(row) for row in rows).encode("utf-8") + b"\n\n"
+            )
+        )
+
+        # When
+        result = list(read_raw_data(ndjson_file))
+
+        # Then
+        assert_that(
+            result,
+            equal_to(
+                [
+                    {**row, "source_file": "pubmed", "source_file_type": "ndjson"}
+                    for row in rows
+                ]
+            ),
+        )
+
+    def test_read_raw_data_should_read_the_parquet_columns_of_the_field_names(
+        self, tmp_path
+    ):
+        # Given
+        duckdb = pytest.importorskip("duckdb")
+        parquet_file = tmp_path / "clinical_trials.parquet"
+        with duckdb.connect() as conn:
+            conn.execute(
+                f"""
+                COPY (
+                    SELECT range AS id,
+                        CASE WHEN range = 1 THEN NULL ELSE 'FAKE_TITLE' END AS title,
+                        DATE '2024-11-13' AS date, 'J1' AS journal, 42 AS extra
+                    FROM range(3)
+                ) TO '{parquet_file}' (FORMAT parquet)
+                """
+            )
+
+        # When
+        result = list(read_raw_data(parquet_file))
+
+        # Then: the rows are read as read_csv reads them, NULL as an empty string
+        assert_that(
+            result,
+            equal_to(
+                [
+                    {
+                        "id": str(i),
+                        "title": "" if i == 1 else "FAKE_TITLE",
+                        "date": "2024-11-13",
+                        "journal": "J1",
+                        "source_file": "clinical_trials",
+                        "source_file_type": "parquet",
+                    }
+                    for i in range(3)
+                ]
+            ),
+        )
+        valid, rejects = validate_rows(result, PubClinical, "Pubtrials")
+        assert_that(valid, has_length(2))
+        assert_that(rejects.counters, equal_to({"title:value_error": 1}))
+
+    def test_read_raw_data_should_use_registered_readers(
+        self, mocker, temp_random_text_file
+    ):
+        # Given
+        tsv_file = temp_random_text_file("pubmed.tsv", "1\tFAKE_TITLE\n")
+        reader = mocker.Mock(return_value=iter([{"id": "1"}]))
+        mocker.patch.dict(RAW_READERS)
+        register_reader(".tsv", reader)
+
+        # When
+        result = list(read_raw_data(tsv_file, ["id", "title"]))
+
+        # Then
+        reader.assert_called_once_with(tsv_file, ["id", "title"])
+        assert_that(result, equal_to([{"id": "1"}]))
+        assert_that(
+            list_files_in_folder(tsv_file.parent, PUBTRIALS_FILE_NAMES),
+            equal_to([tsv_file]),
+        )
+
+
+class TestSaveFileAsJson:
+    def test_save_file_as_json_should_compress_according_to_extension(self, tmp_path):
+        # Given
+        data = [{"drug": "ATROPINE", "journal": "Hôpitaux Universitaires de Genève"}]
+        dest = tmp_path / "drugs_data.json.xz"
+
+        # When
+        save_file_as_json(dest, data, indent=None)
+
+        # Then
+        with lzma.open(dest, "rt", encoding="utf-8") as f:
+            assert_that(json.load(f), equal_to(data))
+
+    def test_json_array_writer_should_not_publish_a_partial_file(self, tmp_path):
+        # Given
+        dest = tmp_path / "cross_reference_data.json"
+        dest.write_text("[]")
+
+        # When
+        with pytest.raises(RuntimeError):
+            with JsonArrayWriter(dest) as writer:
+                writer.write({"drug": "ASPIRIN"})
+                raise RuntimeError("disk full")
+
+        # Then
+        assert_that(json.loads(dest.read_text()), equal_to([]))
+        assert_that([file.name for file in tmp_path.iterdir()], equal_to([dest.name]))
@@ -0,0 +1,188 @@
+import json
+import math
+import random
+import sys
+
+import pytest
+from hamcrest import (
+    assert_that,
+    close_to,
+    equal_to,
+    has_length,
+    less_than,
+    less_than_or_equal_to,
+)
+
+from servier import gold
+from servier.config import SHARDS_DIR
+from servier.gold import _journal_with_max_drugs
+from servier.utils.helpers import (
+    journal_with_max_distinct_drugs,
+    sort_and_group_by_journal,
+)
+from servier.utils.hyperloglog import (
+    HyperLogLog,
+    journal_sketches,
+    merge_journal_sketches,
+    standard_error,
+)
+
+
+def random_rows(count, seed=11):
+    rng = random.Random(seed)
+    # journal i mentions drugs among the first 40 * (i + 1), so the counts are well apart
+    rows = []
+    for _ in range(count):
+        journal = rng.randrange(6)
+        rows.append(
+            {
+                "drug": f"DRUG{rng.randrange(40 * (journal + 1))}",
+                "journal": f"Journal {journal}",
+                "mention_date": "2020-01-01",
+                "source_file": "pubmed",
+            }
+        )
+    return rows
+
+
+@pytest.mark.parametrize("precision", [10, 12, 14])
+def test_estimates_should_be_within_three_standard_errors(precision):
+    # Given
+    for cardinality in [1, 10, 100, 1_000, 10_000, 50_000]:
+        sketch = HyperLogLog(precision)
+        # When: every value is added twice
+        sketch.update(f"DRUG{i % cardinality}" for i in range(2 * cardinality))
+        # Then: small cardinalities may lose a value to a register collision
+        assert_that(
+            abs(sketch.count() - cardinality),
+            less_than_or_equal_to(max(3 * standard_error(precision) * cardinality, 1)),
+        )
+
+
+@pytest.mark.parametrize(
+    "precision, cardinality", [(8, 100), (10, 100), (10, 5_000), (12, 3_000)]
+)
+def test_root_mean_square_error_should_be_the_standard_error(precision, cardinality):
+    # Given
+    errors = []
+    for trial in range(50):
+        sketch = HyperLogLog(precision)
+        # When
+        sketch.update(f"{trial}-DRUG{i}" for i in range(cardinality))
+        errors.append((sketch.count() - cardinality) / cardinality)
+    # Then
+    assert_that(
+        math.sqrt(sum(error**2 for error in errors) / len(errors)),
+        less_than_or_equal_to(1.2 * standard_error(precision)),
+    )
+
+
+def test_merged_shard_sketches_should_equal_the_sketch_of_the_whole():
+    # Given: a journal small enough to stay sparse, and one dense on some shards only
+    rows = [{"journal": "Small", "drug": f"DRUG{i}"} for i in range(30)] + [
+        {"journal": "Large", "drug": f"DRUG{i}"} for i in range(3_000)
+    ]
+    random.Random(5).shuffle(rows)
+    shards = [rows[:100], rows[100:2_500], rows[2_500:]]
+    # When: the shard sketches go through their serialized form
+    merged = merge_journal_sketches(
+        {
+            journal: HyperLogLog.from_dict(json.loads(json.dumps(sketch.to_dict())))
+            for journal, sketch in journal_sketches(shard, 10).items()
+        }
+        for shard in shards
+    )
+    # Then
+    whole = journal_sketches(rows, 10)
+    assert_that(
+        {journal: sketch.to_dict() for journal, sketch in merged.items()},
+        equal_to({journal: sketch.to_dict() for journal, sketch in whole.items()}),
+    )
+    assert_that(merged["Small"].count(), close_to(30, 1))
+    assert_that(merged["Small"].registers, equal_to(None))
+
+
+@pytest.mark.parametrize("precision", [8, 12, 16])
+def test_sparse_sketches_should_be_smaller_than_dense_ones(precision):
+    # Given
+    sketch = HyperLogLog(precision)
+    dense_size = sys.getsizeof(bytearray(1 << precision))
+    sparse_sizes = []
+    # When
+    for i in range(1 << precision):
+        sketch.add(f"DRUG{i}")
+        if sketch.registers is None:
+            sparse_sizes.append(sys.getsizeof(sketch.sparse))
+    # Then
+    assert_that(max(sparse_sizes), less_than(dense_size))
+    assert_that(sketch.nbytes, equal_to(1 << precision))
+
+
+def test_sketches_of_different_precisions_should_not_merge():
+    with pytest.raises(ValueError, match="precisions 10 and 12"):
+        HyperLogLog(10).merge(HyperLogLog(12))
+
+
+def test_approximate_journal_should_match_the_exact_one_from_shards(
+    mocker, temp_json_file, silver_and_gold_paths
+):
+    # Given
+    silver_zone_path, gold_zone_path = silver_and_gold_paths
+    rows = random_rows(3_000)
+    (silver_zone_path / SHARDS_DIR).mkdir()
+    for index in range(3):
+        temp_json_file(
+            silver_zone_path
+            / SHARDS_DIR
+            / f"cross_reference_data_2020_01_01_shard-{index:05d}-of-00003.json",
+            rows[index::3],
+        )
+    _journal_with_max_drugs(
+        silver_zone_path, gold_zone_path, approximate=True, from_shards=True
+    )
+    (output,) = gold_zone_path.glob("the_journal_approximate_*.json")
+    output.unlink()
+    load = mocker.spy(gold, "load_cross_reference_snapshot")
+    # When: the shard sketches are read from the cache
+    _journal_with_max_drugs(
+        silver_zone_path, gold_zone_path, approximate=True, from_shards=True
+    )
+    # Then
+    assert_that(load.call_count, equal_to(0))
+    result = json.loads(output.read_text())
+    journal = journal_with_max_distinct_drugs(sort_and_group_by_journal(rows))
+    assert_that(result["journal"], equal_to(journal))
+    exact = len({row["drug"] for row in rows if row["journal"] == journal})
+    assert_that(
+        abs(result["estimated_distinct_drugs"] - exact),
+        less_than_or_equal_to(3 * result["standard_error"] * exact),
+    )
+
+
+def test_approximate_journal_should_only_sketch_the_rows_appended_to_the_last_snapshot(
+    mocker, tmp_path, temp_json_file, silver_and_gold_paths
+):
+    # Given
+    silver_zone_path, gold_zone_path = silver_and_gold_paths
+    rows = random_rows(3_000)
+    temp_json_file(
+        silver_zone_path / "cross_reference_data_2020_01_01.json", rows[:2_000]
+    )
+    _journal_with_max_drugs(silver_zone_path, gold_zone_path, approximate=True)
+    temp_json_file(silver_zone_path / "cross_reference_data_2020_01_02.json", rows)
+    sketch = mocker.spy(gold, "journal_sketches")
+    # When
+    _journal_with_max_drugs(silver_zone_path, gold_zone_path, approximate=True)
+    # Then
+    assert_that(sketch.call_args.args[0], has_length(1_000))
+    # the merged sketches are those of the whole snapshot
+    full_gold_zone_path = tmp_path / "full_gold"
+    full_gold_zone_path.mkdir()
+    _journal_with_max_drugs(
+        silver_zone_path, full_gold_zone_path, approximate=True, use_cache=False
+    )
+    (output,) = gold_zone_path.glob("the_journal_approximate_*.json")
+    (full_output,) = full_gold_zone_path.glob("the_journal_approximate_*.json")
+    assert_that(
+        json.loads(output.read_text()), equal_to(json.loads(full_output.read_text()))
+    )
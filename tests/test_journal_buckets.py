@@ -0,0 +1,158 @@
+import datetime
+import json
+import random
+
+import pytest
+from hamcrest import (
+    assert_that,
+    equal_to,
+    has_length,
+)
+
+from servier import gold
+from servier.gold import _journal_activity
+from servier.utils.journal_buckets import JournalBuckets
+
+START = datetime.date(2019, 12, 1)
+
+
+def random_rows(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            "drug": f"DRUG{rng.randrange(12)}",
+            "journal": f"Journal {rng.randrange(5)}",
+            "mention_date": str(START + datetime.timedelta(days=rng.randrange(120))),
+            "source_file": "pubmed",
+        }
+        for _ in range(count)
+    ]
+
+
+def expected_top_journals(rows, as_of, days, limit):
+    start = as_of - datetime.timedelta(days=days - 1)
+    drugs = {}
+    for row in rows:
+        if start <= datetime.date.fromisoformat(row["mention_date"]) <= as_of:
+            drugs.setdefault(row["journal"], set()).add(row["drug"])
+    ranking = sorted(drugs.items(), key=lambda item: (-len(item[1]), item[0]))
+    return [
+        {"journal": journal, "distinct_drugs": len(journal_drugs)}
+        for journal, journal_drugs in ranking[:limit]
+    ]
+
+
+class TestJournalBuckets:
+    def test_incremental_folds_should_match_a_full_recomputation(self, tmp_path):
+        # Given
+        rows = random_rows(2_000)
+        with JournalBuckets(tmp_path / "buckets.sqlite") as buckets:
+            # When
+            buckets.fold(rows[:1_500])
+            buckets.fold(rows[1_000:])
+            # Then
+            expected = {}
+            for row in rows:
+                expected.setdefault(row["journal"], {}).setdefault(
+                    row["mention_date"][:7], set()
+                ).add(row["drug"])
+            assert_that(
+                buckets.distinct_drugs_by_month(),
+                equal_to(
+                    {
+                        journal: {month: len(drugs) for month, drugs in months.items()}
+                        for journal, months in expected.items()
+                    }
+                ),
+            )
+            # windows within a month, across month edges and beyond the data
+            for as_of, days in [
+                (datetime.date(2020, 1, 20), 7),
+                (datetime.date(2020, 2, 3), 10),
+                (datetime.date(2020, 3, 1), 45),
+                (datetime.date(2021, 1, 1), 400),
+            ]:
+                assert_that(
+                    buckets.top_journals(as_of, days, limit=3),
+                    equal_to(expected_top_journals(rows, as_of, days, 3)),
+                )
+
+    def test_folding_known_mentions_should_not_change_any_bucket(self, tmp_path):
+        # Given
+        rows = random_rows(500)
+        with JournalBuckets(tmp_path / "buckets.sqlite") as buckets:
+            created = buckets.fold(rows)
+            # When
+            changed = buckets.fold(reversed(rows))
+            # Then
+            assert_that(created, equal_to(len(buckets)))
+            assert_that(changed, equal_to(0))
+
+
+def test_journal_activity_should_only_fold_a_snapshot_once(
+    mocker, temp_json_file, silver_and_gold_paths
+):
+    # Given
+    silver_zone_path, gold_zone_path = silver_and_gold_paths
+    rows = random_rows(200)
+    temp_json_file(silver_zone_path / "cross_reference_data_2020_01_01.json", rows)
+    as_of = datetime.date(2020, 3, 29)
+    _journal_activity(silver_zone_path, gold_zone_path, days=10, as_of=as_of)
+    load = mocker.spy(gold, "load_cross_reference_snapshot")
+    # When
+    _journal_activity(silver_zone_path, gold_zone_path, days=10, as_of=as_of)
+    # Then
+    assert_that(load.call_count, equal_to(0))
+    (top_file,) = gold_zone_path.glob("top_journals_last_10_days_*.json")
+    assert_that(
+        json.loads(top_file.read_text()),
+        equal_to(
+            {
+                "as_of": "2020-03-29",
+                "days": 10,
+                "journals": expected_top_journals(rows, as_of, 10, 10),
+            }
+        ),
+    )
+    (by_month_file,) = gold_zone_path.glob("distinct_drugs_by_journal_by_month_*.json")
+    assert_that(
+        sum(json.loads(by_month_file.read_text())["Journal 0"].values()),
+        equal_to(
+            len(
+                {
+                    (row["mention_date"][:7], row["drug"])
+                    for row in rows
+                    if row["journal"] == "Journal 0"
+                }
+            )
+        ),
+    )
+
+
+@pytest.mark.parametrize("appended", [True, False])
+def test_journal_activity_should_only_fold_the_rows_appended_to_the_last_snapshot(
+    mocker, temp_json_file, silver_and_gold_paths, appended
+):
+    # Given
+    silver_zone_path, gold_zone_path = silver_and_gold_paths
+    rows = random_rows(300)
+    temp_json_file(
+        silver_zone_path / "cross_reference_data_2020_01_01.json", rows[:200]
+    )
+    as_of = datetime.date(2020, 3, 29)
+    _journal_activity(silver_zone_path, gold_zone_path, days=10, as_of=as_of)
+    # the next snapshot extends the first one, or has its rows in another order
+    temp_json_file(
+        silver_zone_path / "cross_reference_data_2020_01_02.json",
+        rows if appended else rows[::-1],
+    )
+    fold = mocker.spy(JournalBuckets, "fold")
+    # When
+    _journal_activity(silver_zone_path, gold_zone_path, days=10, as_of=as_of)
+    # Then
+    assert_that(fold.call_args.args[1], has_length(100 if appended else 300))
+    (top_file,) = gold_zone_path.glob("top_journals_last_10_days_*.json")
+    assert_that(
+        json.loads(top_file.read_text())["journals"],
+        equal_to(expected_top_journals(rows, as_of, 10, 10)),
+    )
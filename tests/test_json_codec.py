@@ -0,0 +1,160 @@
+import datetime
+import json
+
+import pytest
+from hamcrest import (
+    assert_that,
+    equal_to,
+)
+
+from servier.utils import json_codec
+from servier.utils.helpers import (
+    JsonArrayWriter,
+    read_json,
+    save_file_as_json,
+)
+
+requires_orjson = pytest.mark.skipif(
+    "orjson" not in json_codec.available_backends(), reason="orjson is not installed"
+)
+
+ROWS = [
+    {
+        "drug": "ASPIRIN",
+        "journal": "Journal of emergency nursing",
+        "title": 'Étude "aspirine"\nà forte dose',
+        "mention_date": datetime.date(2020, 1, 1),
+        "ingestion_timestamp": datetime.datetime(2020, 1, 2, 10, 30, 0, 123456),
+        "match_score": 0.875,
+        "tags": [],
+        "extra": {},
+        "publication_id": 2**62,
+        "retracted": None,
+    },
+    {1: [{"nested": [1, 2, {"deeper": True}]}]},
+]
+
+
+@requires_orjson
+@pytest.mark.parametrize("indent", [None, 2, 3, 4])
+def test_backends_should_write_the_same_text(indent):
+    # Given
+    with json_codec.use_backend("json"):
+        expected = json_codec.dumps(ROWS, indent)
+    # When
+    with json_codec.use_backend("orjson"):
+        text = json_codec.dumps(ROWS, indent)
+    # Then
+    assert_that(text, equal_to(expected))
+    assert_that(
+        text,
+        equal_to(
+            json.dumps(
+                ROWS,
+                indent=indent,
+                separators=(",", ":") if indent is None else None,
+                default=str,
+                ensure_ascii=False,
+            )
+        ),
+    )
+
+
+@requires_orjson
+@pytest.mark.parametrize(
+    "value",
+    [1e16, -1.5e-7, 1e-05, float("nan"), float("-inf"), 2**64, -(2**70)],
+)
+def test_backends_should_write_the_same_unusual_numbers(value):
+    # Given: numbers orjson writes otherwise, or cannot write
+    rows = [
+        {"drug": "ASPIRIN", "match_score": value, "scores": {1: value}},
+        {"drug": "ASPIRIN", "scores": {value: "key"}, "retracted": None},
+    ]
+    # When
+    with json_codec.use_backend("orjson"):
+        data = json_codec.encode(rows, indent=None)
+    # Then
+    assert_that(
+        data.decode("utf-8"),
+        equal_to(json.dumps(rows, separators=(",", ":"), ensure_ascii=False)),
+    )
+
+
+@requires_orjson
+def test_orjson_should_encode_the_usual_rows(mocker):
+    # Given
+    rows = [{k: v for k, v in ROWS[0].items() if v is not None}] * 3
+    stdlib = mocker.spy(json, "dumps")
+    # When
+    with json_codec.use_backend("orjson"):
+        data = json_codec.encode(rows)
+    # Then
+    assert_that(stdlib.call_count, equal_to(0))
+    assert_that(
+        data.decode("utf-8"),
+        equal_to(json.dumps(rows, indent=4, default=str, ensure_ascii=False)),
+    )
+
+
+@requires_orjson
+def test_orjson_should_encode_text_that_looks_like_unusual_numbers(mocker):
+    # Given: text and values the byte scan matches, but no float orjson writes otherwise
+    rows = [
+        {
+            **ROWS[0],
+            "title": "A double-blind trial in type-2 patients, nullable e-1 at 0.00001",
+            "scores": [0.0001, 1e15, -0.0, 0.0],
+            "retracted": None,
+        }
+    ] * 3
+    stdlib = mocker.spy(json, "dumps")
+    # When
+    with json_codec.use_backend("orjson"):
+        data = json_codec.encode(rows)
+    # Then
+    assert_that(stdlib.call_count, equal_to(0))
+    assert_that(
+        data.decode("utf-8"),
+        equal_to(json.dumps(rows, indent=4, default=str, ensure_ascii=False)),
+    )
+
+
+@pytest.mark.parametrize("backend", json_codec.available_backends())
+def test_silver_files_should_round_trip_with_every_backend(tmp_path, backend):
+    # Given
+    rows = [
+        {"id": str(i), "title": f"Title {i}", "date": datetime.date(2020, 1, i + 1)}
+        for i in range(3)
+    ]
+    # When
+    with json_codec.use_backend(backend):
+        save_file_as_json(tmp_path / "pubmed.json.gz", rows)
+        with JsonArrayWriter(tmp_path / "streamed.json") as writer:
+            writer.write_all(rows)
+        read = list(read_json(tmp_path / "pubmed.json.gz"))
+    # Then
+    assert_that(
+        read,
+        equal_to(
+            [
+                {
+                    **row,
+                    "date": str(row["date"]),
+                    "source_file": "pubmed",
+                    "source_file_type": "json",
+                }
+                for row in rows
+            ]
+        ),
+    )
+    assert_that(
+        (tmp_path / "streamed.json").read_text(),
+        equal_to(json.dumps(rows, indent=4, default=str)),
+    )
+
+
+def test_unknown_backend_should_be_refused():
+    with pytest.raises(ValueError, match="not available"):
+        with json_codec.use_backend("simdjson"):
+            pass
@@ -1,5 +1,8 @@
+import gzip
 import json
 import pathlib
+import subprocess
+import sys
 
 from hamcrest import (
     assert_that,
@@ -8,11 +11,15 @@ from hamcrest import (
     has_length,
 )
 
+from servier.config import PUBTRIALS_FIELD_NAMES
 from servier.main import (
     _get_drugs_from_journals_that_mention_a_specific_drug,
+    _journal_with_max_drugs,
+    _main_pipeline,
     cross_reference_models,
     curate_drugs_data,
     curate_pubclinical_data,
+    star_schema_models,
 )
 from servier.models import (
     Drug,
@@ -116,6 +123,80 @@ def test_curate_drugs_data_not_all_valid(mocker):
     assert_that(errors, has_length(1))
 
 
+def test_curate_pubclinical_data_with_workers_should_merge_shards_in_order(
+    temp_json_file,
+):
+    # Given
+    files = [
+        temp_json_file(
+            f"pubmed_part-{shard:05d}.json",
+            [
+                {"title": f"title {shard}-{i}", "date": "2020-01-01", "journal": "J"}
+                for i in range(3)
+            ]
+            + [{"title": "", "date": "2020-01-01", "journal": "J"}],
+        )
+        for shard in range(4)
+    ]
+    # When
+    sequential = curate_pubclinical_data(files)
+    parallel = curate_pubclinical_data(files, workers=2)
+    # Then
+    assert_that(parallel[0], equal_to(sequential[0]))
+    assert_that(list(parallel[1]), equal_to(list(sequential[1])))
+    assert_that(parallel[0], has_length(12))
+    assert_that(parallel[1], has_length(4))
+    assert_that(parallel[1].counters, equal_to({"title:value_error": 4}))
+    assert_that({item.source_file for item in parallel[0]}, equal_to({"pubmed"}))
+
+
+def test_main_pipeline_with_workers_should_ingest_several_publication_files(
+    tmp_path, temp_csv_file
+):
+    # Given: the worker processes are started while the drugs stage runs in a thread
+    publications, drugs = tmp_path / "publications", tmp_path / "drugs"
+    publications.mkdir()
+    drugs.mkdir()
+    for name in ("pubmed.csv", "clinical_trials.csv"):
+        temp_csv_file(
+            publications / name,
+            PUBTRIALS_FIELD_NAMES,
+            [
+                {"id": i, "title": f"Aspirin {i}", "date": "2020-01-01", "journal": "J"}
+                for i in range(20)
+            ],
+        )
+    temp_csv_file(
+        drugs / "drugs.csv",
+        ["atccode", "drug"],
+        [{"atccode": "A01", "drug": "ASPIRIN"}],
+    )
+    silver, trash = tmp_path / "silver", tmp_path / "trash"
+    silver.mkdir()
+    trash.mkdir()
+    # When: in a fresh interpreter, where the pydantic models are not built yet
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import pathlib, sys; from servier.main import _main_pipeline; "
+            "_main_pipeline(*map(pathlib.Path, sys.argv[1:]), workers=2)",
+            *map(str, (publications, drugs, silver, trash)),
+        ],
+        cwd=pathlib.Path(__file__).parents[1],
+        timeout=60,
+        check=True,
+    )
+    # Then
+    (cross_reference_file,) = silver.glob("cross_reference_data_*.json")
+    cross_reference = json.loads(cross_reference_file.read_text())
+    assert_that(cross_reference, has_length(40))
+    assert_that(
+        {row["source_file"] for row in cross_reference},
+        equal_to({"pubmed", "clinical_trials"}),
+    )
+
+
 def test_cross_reference_models():
     pubclinical_data = [
         PubClinical(
@@ -142,6 +223,109 @@ def test_cross_reference_models():
     assert_that(errors, has_length(0))
 
 
+def test_star_schema_models_should_use_stable_keys_and_a_narrow_fact():
+    # Given
+    pubclinical_data = [
+        PubClinical(
+            title="Aspirin and Ibuprofen in heart disease",
+            journal="Heart Journal",
+            date="2023-01-01",
+            source_file="pubmed",
+            source_file_type="csv",
+        ),
+        PubClinical(
+            title="Ibuprofen in pain management",
+            journal="Pain Journal",
+            date="2023-01-02",
+            source_file="clinical_trials",
+            source_file_type="csv",
+        ),
+    ]
+    drugs_data = [
+        Drug(atccode="A01", drug="Aspirin"),
+        Drug(atccode="A02", drug="Ibuprofen"),
+    ]
+    # When
+    publications, drugs, mentions = star_schema_models(
+        pubclinical_data + pubclinical_data[:1], drugs_data
+    )
+    reversed_publications, _, _ = star_schema_models(pubclinical_data[::-1], drugs_data)
+    # Then
+    assert_that(publications, has_length(2))
+    assert_that(drugs, has_length(2))
+    assert_that(
+        {row["publication_id"] for row in reversed_publications},
+        equal_to({row["publication_id"] for row in publications}),
+    )
+    heart, pain = (row["publication_id"] for row in publications)
+    aspirin, ibuprofen = (row["drug_id"] for row in drugs)
+    assert_that(
+        mentions,
+        contains_inanyorder(
+            {"publication_id": heart, "drug_id": aspirin},
+            {"publication_id": heart, "drug_id": ibuprofen},
+            {"publication_id": pain, "drug_id": ibuprofen},
+        ),
+    )
+
+
+def test_gold_commands_should_give_the_same_results_on_both_silver_layouts(
+    tmp_path, temp_csv_file
+):
+    # Given
+    publications, drugs = tmp_path / "publications", tmp_path / "drugs"
+    publications.mkdir()
+    drugs.mkdir()
+    temp_csv_file(
+        publications / "pubmed.csv",
+        PUBTRIALS_FIELD_NAMES,
+        [
+            {
+                "id": i,
+                "title": f"{'Aspirin' if i % 2 else 'Ibuprofen'} and Ethanol, study {i}",
+                "date": "2020-01-01",
+                "journal": f"Journal {i % 3}",
+            }
+            for i in range(10)
+        ],
+    )
+    temp_csv_file(
+        drugs / "drugs.csv",
+        ["atccode", "drug"],
+        [
+            {"atccode": "A01", "drug": "ASPIRIN"},
+            {"atccode": "A02", "drug": "IBUPROFEN"},
+            {"atccode": "A03", "drug": "ETHANOL"},
+        ],
+    )
+    results, silver_tables = {}, {}
+    for layout in ("flat", "star"):
+        silver, trash, gold = (tmp_path / layout / zone for zone in ("s", "t", "g"))
+        for zone in (silver, trash, gold):
+            zone.mkdir(parents=True)
+        # When
+        _main_pipeline(publications, drugs, silver, trash, layout=layout)
+        _journal_with_max_drugs(silver, gold)
+        _get_drugs_from_journals_that_mention_a_specific_drug(silver, gold, "ASPIRIN")
+        results[layout] = {
+            # the_journal is a string, drugs_by_journals a list in set order
+            file.name: json.loads(file.read_text())
+            for file in gold.glob("*.json")
+        }
+        for name, value in results[layout].items():
+            if isinstance(value, list):
+                results[layout][name] = sorted(value)
+        silver_tables[layout] = sorted(
+            file.name.rsplit("_", 3)[0] for file in silver.glob("*.json")
+        )
+    # Then
+    assert_that(
+        silver_tables["star"], equal_to(["drug_dim", "mention_fact", "publication_dim"])
+    )
+    assert_that(results["star"], equal_to(results["flat"]))
+    assert_that(results["star"], has_length(2))
+
+
 class TestGetDrugsFromJournalsThatMentionASpecificDrug:
     def test_get_drugs_from_journals_that_mention_a_specific_drug(
         self,
@@ -217,3 +401,21 @@ class TestGetDrugsFromJournalsThatMentionASpecificDrug:
             drugs = json.load(f)
 
         assert_that(expected_drugs, contains_inanyorder(*drugs))
+
+
+def test_journal_with_max_drugs_reads_compressed_snapshot(
+    cross_reference_sample_data, silver_and_gold_paths
+):
+    # Given
+    silver_zone_path, gold_zone_path = silver_and_gold_paths
+    with gzip.open(
+        silver_zone_path / "cross_reference_data_test.json.gz", "wt", encoding="utf-8"
+    ) as f:
+        json.dump(cross_reference_sample_data, f)
+    # When
+    _journal_with_max_drugs(silver_zone_path, gold_zone_path)
+    # Then
+    output_files = list(gold_zone_path.glob("the_journal_*.json"))
+    with open(output_files[0], "r") as f:
+        the_journal = json.load(f)
+    assert_that(the_journal, equal_to("Journal of emergency nursing"))
@@ -0,0 +1,169 @@
+import csv
+import io
+import mmap
+
+from hamcrest import (
+    assert_that,
+    empty,
+    equal_to,
+    has_length,
+)
+
+from servier.main import validate_rows
+from servier.models import PubClinical
+from servier.utils.helpers import read_raw_data
+from servier.utils import parallel_csv
+from servier.utils.parallel_csv import (
+    chunk_boundaries,
+    in_pool_worker,
+    process_pool,
+    read_csv_chunks,
+)
+
+CSV_CONTENT = (
+    "id,title,date,journal\n"
+    '1,"A title, with a comma",2020-01-01,Journal A\n'
+    '2,"A title\nspanning ""three""\nlines",2020-01-02,Journal B\n'
+    "3,Plain title,2020-01-03,Journal C\n"
+    '4,"Another ""quoted"" title",2020-01-04,"Journal\nD"\n'
+    "5,Last title,2020-01-05,Journal E\n"
+)
+
+
+def expected_rows():
+    return [tuple(row) for row in csv.reader(io.StringIO(CSV_CONTENT, newline=""))][1:]
+
+
+class TestChunkBoundaries:
+    def test_chunk_boundaries_should_never_split_inside_quoted_fields(self, tmp_path):
+        # Given
+        csv_file = tmp_path / "clinical_trials.csv"
+        csv_file.write_text(CSV_CONTENT)
+        header_end = CSV_CONTENT.index("\n") + 1
+
+        with open(csv_file, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            for chunk_size in range(1, len(CSV_CONTENT)):
+                # When
+                boundaries = chunk_boundaries(mm, header_end, chunk_size)
+                rows = [
+                    tuple(row)
+                    for start, end in boundaries
+                    for row in csv.reader(
+                        io.StringIO(mm[start:end].decode(), newline="")
+                    )
+                ]
+                # Then
+                assert_that(rows, equal_to(expected_rows()))
+
+
+class TestReadCsvChunks:
+    def test_read_csv_chunks_should_return_rows_in_file_order(self, tmp_path):
+        # Given
+        csv_file = tmp_path / "clinical_trials.csv"
+        csv_file.write_text(CSV_CONTENT)
+
+        # When
+        chunks = list(read_csv_chunks(csv_file, chunk_size=16, workers=2))
+
+        # Then
+        assert_that(
+            [row for chunk in chunks for row in chunk.rows], equal_to(expected_rows())
+        )
+        assert_that(
+            {(chunk.source_file, chunk.source_file_type) for chunk in chunks},
+            equal_to({("clinical_trials", "csv")}),
+        )
+
+    def test_read_csv_chunks_should_not_start_a_pool_in_a_pool_worker(
+        self, tmp_path, mocker
+    ):
+        # Given
+        csv_file = tmp_path / "clinical_trials.csv"
+        csv_file.write_text(CSV_CONTENT)
+        with process_pool(1) as executor:
+            worker_flag = executor.submit(in_pool_worker).result()
+        mocker.patch.object(parallel_csv, "_pool_worker", worker_flag)
+        pool = mocker.spy(parallel_csv, "process_pool")
+
+        # When
+        chunks = list(read_csv_chunks(csv_file, chunk_size=16, workers=2))
+
+        # Then
+        assert_that(worker_flag, equal_to(True))
+        assert_that(in_pool_worker(), equal_to(True))
+        assert_that(pool.call_count, equal_to(0))
+        assert_that(
+            [row for chunk in chunks for row in chunk.rows], equal_to(expected_rows())
+        )
+
+    def test_read_csv_chunks_should_return_nothing_for_empty_file(self, tmp_path):
+        # Given
+        csv_file = tmp_path / "clinical_trials.csv"
+        csv_file.write_text("")
+
+        # When / Then
+        assert_that(list(read_csv_chunks(csv_file)), empty())
+
+    def test_read_raw_data_should_use_chunked_reader_for_large_files(
+        self, tmp_path, mocker
+    ):
+        # Given
+        csv_file = tmp_path / "clinical_trials.csv"
+        csv_file.write_text(CSV_CONTENT)
+        mocker.patch("servier.utils.helpers.CSV_PARALLEL_MIN_BYTES", 1)
+
+        # When
+        result = list(read_raw_data(csv_file))
+
+        # Then
+        assert_that(result, has_length(5))
+        assert_that(
+            result[1],
+            equal_to(
+                {
+                    "id": "2",
+                    "title": 'A title\nspanning "three"\nlines',
+                    "date": "2020-01-02",
+                    "journal": "Journal B",
+                    "source_file": "clinical_trials",
+                    "source_file_type": "csv",
+                }
+            ),
+        )
+
+    def test_ragged_rows_should_be_rejected_whatever_the_reader(self, tmp_path, mocker):
+        # Given: a short row and a row split by an unquoted comma
+        csv_file = tmp_path / "clinical_trials.csv"
+        csv_file.write_text(
+            "id,title,date,journal\n"
+            "1,Plain title,2020-01-01,Journal A\n"
+            "2,Short title,2020-01-02\n"
+            "\n"
+            "3,Title, with a comma,2020-01-03,Journal C\n"
+        )
+        results = {}
+        for name, min_bytes in (("sequential", 2**40), ("chunked", 1)):
+            mocker.patch("servier.utils.helpers.CSV_PARALLEL_MIN_BYTES", min_bytes)
+            # When
+            results[name] = list(read_raw_data(csv_file))
+
+        # Then
+        assert_that(results["chunked"], equal_to(results["sequential"]))
+        assert_that(
+            results["chunked"][1],
+            equal_to(
+                {
+                    "values": ["2", "Short title", "2020-01-02"],
+                    "source_file": "clinical_trials",
+                    "source_file_type": "csv",
+                }
+            ),
+        )
+        valid, rejects = validate_rows(results["chunked"], PubClinical, "Pubtrials")
+        assert_that(valid, has_length(1))
+        assert_that(
+            rejects.counters,
+            equal_to({"title:missing": 2, "date:missing": 2, "journal:missing": 2}),
+        )
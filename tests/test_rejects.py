@@ -0,0 +1,132 @@
+import json
+import logging
+
+from hamcrest import (
+    assert_that,
+    equal_to,
+    has_length,
+)
+from pydantic import ValidationError
+
+from servier.models import Drug
+from servier.utils.rejects import RejectSink
+
+
+def validation_error(row):
+    try:
+        Drug(**row)
+    except ValidationError as e:
+        return e
+
+
+class TestRejectSink:
+    def test_reject_sink_should_stream_rejects_to_the_trash_file(self, tmp_path):
+        # Given
+        dest = tmp_path / "drugs_validation_errors.json"
+        rows = [{"atccode": "", "drug": f"DRUG_{i}"} for i in range(3)]
+
+        # When
+        with RejectSink(dest, "Drug") as rejects:
+            for row in rows:
+                rejects.add(row, validation_error(row))
+
+        # Then
+        assert_that(json.loads(dest.read_text()), equal_to(rows))
+        assert_that(list(rejects), has_length(0))
+        assert_that(rejects, has_length(3))
+
+    def test_reject_sink_should_not_create_the_trash_file_without_rejects(
+        self, tmp_path
+    ):
+        # Given
+        dest = tmp_path / "drugs_validation_errors.json"
+
+        # When
+        with RejectSink(dest, "Drug"):
+            pass
+
+        # Then
+        assert not dest.exists()
+
+    def test_reject_sink_should_count_rejects_per_error_type(self):
+        # Given
+        rows = [
+            {"atccode": "", "drug": "DRUG"},
+            {"atccode": "", "drug": ""},
+            {"drug": "DRUG"},
+        ]
+
+        # When
+        rejects = RejectSink(label="Drug")
+        for row in rows:
+            rejects.add(row, validation_error(row))
+
+        # Then
+        assert_that(
+            rejects.counters,
+            equal_to(
+                {
+                    "atccode:value_error": 2,
+                    "drug:value_error": 1,
+                    "atccode:missing": 1,
+                }
+            ),
+        )
+        assert_that(list(rejects), equal_to(rows))
+
+    def test_reject_sink_should_sample_log_records(self, caplog):
+        # Given
+        row = {"atccode": "", "drug": "DRUG"}
+        error = validation_error(row)
+        rejects = RejectSink(label="Drug", log_first=3, log_every=10)
+
+        # When
+        with caplog.at_level(logging.ERROR):
+            for _ in range(25):
+                rejects.add(row, error)
+
+        # Then
+        # occurrences 1, 2, 3, 10 and 20 are logged
+        assert_that(caplog.records, has_length(5))
+
+    def test_reject_sink_merge_should_add_rows_and_counters(self, tmp_path):
+        # Given
+        row = {"atccode": "", "drug": "DRUG"}
+        worker_rejects = RejectSink(label="Drug", defer_logging=True)
+        worker_rejects.add(row, validation_error(row))
+        dest = tmp_path / "drugs_validation_errors.json"
+
+        # When
+        with RejectSink(dest, "Drug") as rejects:
+            rejects.merge(worker_rejects)
+
+        # Then
+        assert_that(rejects.counters, equal_to({"atccode:value_error": 1}))
+        assert_that(json.loads(dest.read_text()), equal_to([row]))
+
+    def test_reject_sink_merge_should_sample_log_records_across_worker_sinks(
+        self, caplog
+    ):
+        # Given
+        row = {"atccode": "", "drug": "DRUG"}
+        error = validation_error(row)
+        worker_sinks = [
+            RejectSink(label="Drug", log_first=3, defer_logging=True) for _ in range(4)
+        ]
+        with caplog.at_level(logging.ERROR):
+            for worker_rejects in worker_sinks:
+                for _ in range(5):
+                    worker_rejects.add(row, error)
+        assert_that(caplog.records, has_length(0))
+        rejects = RejectSink(label="Drug", log_first=3, log_every=10)
+
+        # When
+        with caplog.at_level(logging.ERROR):
+            for worker_rejects in worker_sinks:
+                rejects.merge(worker_rejects)
+
+        # Then
+        # occurrences 1, 2, 3, 10 and 20 of the 20 rejects are logged, once
+        assert_that(caplog.records, has_length(5))
+        assert_that(rejects.counters, equal_to({"atccode:value_error": 20}))
+        assert_that(list(rejects), has_length(20))
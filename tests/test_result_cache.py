@@ -0,0 +1,114 @@
+import json
+import os
+
+from hamcrest import (
+    assert_that,
+    equal_to,
+    has_length,
+)
+
+from servier import gold
+from servier.gold import (
+    _get_drugs_from_journals_that_mention_a_specific_drug,
+    _journal_with_max_drugs,
+)
+from servier.utils.result_cache import ResultCache
+
+
+def read_result(gold_zone_path, pattern):
+    (file,) = gold_zone_path.glob(pattern)
+    return json.loads(file.read_text())
+
+
+class TestResultCache:
+    def test_cache_should_evict_the_least_recently_used_results(self, tmp_path):
+        # Given
+        with ResultCache(tmp_path / "cache.sqlite", max_entries=2) as cache:
+            cache.put("a", "A")
+            cache.put("b", ["B"])
+            # When
+            cache.get("a")
+            cache.put("c", None)
+            # Then
+            assert_that(cache, has_length(2))
+            assert_that(cache.get("a"), equal_to("A"))
+            assert_that(cache.get("b"), equal_to(None))
+
+    def test_digest_should_follow_the_content_of_the_file(self, tmp_path):
+        # Given
+        file = tmp_path / "snapshot.json"
+        file.write_text("[1]")
+        with ResultCache(tmp_path / "cache.sqlite") as cache:
+            first = cache.digest(file)
+            # When
+            file.write_text("[2]")
+            stat = file.stat()
+            os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            # Then
+            assert_that(cache.digest(file) != first)
+            assert_that(cache.digest(file), equal_to(cache.digest(file)))
+
+
+class TestGoldResultCache:
+    def test_repeated_calls_should_not_load_the_snapshot(
+        self, mocker, temp_json_file, cross_reference_sample_data, silver_and_gold_paths
+    ):
+        # Given
+        silver_zone_path, gold_zone_path = silver_and_gold_paths
+        temp_json_file(
+            silver_zone_path / "cross_reference_data_test.json",
+            cross_reference_sample_data,
+        )
+        _journal_with_max_drugs(silver_zone_path, gold_zone_path)
+        _get_drugs_from_journals_that_mention_a_specific_drug(
+            silver_zone_path, gold_zone_path, "DIPHENHYDRAMINE"
+        )
+        expected_journal = read_result(gold_zone_path, "the_journal_*.json")
+        load = mocker.spy(gold, "load_cross_reference_snapshot")
+        for file in gold_zone_path.glob("*.json"):
+            file.unlink()
+        # When
+        _journal_with_max_drugs(silver_zone_path, gold_zone_path)
+        # the drug is normalized, another case hits the same entry
+        _get_drugs_from_journals_that_mention_a_specific_drug(
+            silver_zone_path, gold_zone_path, " diphenhydramine"
+        )
+        # Then
+        assert_that(load.call_count, equal_to(0))
+        assert_that(
+            read_result(gold_zone_path, "the_journal_*.json"),
+            equal_to(expected_journal),
+        )
+        assert_that(
+            read_result(gold_zone_path, "drugs_by_journals_by_ diphenhydramine_*.json"),
+            equal_to(["DIPHENHYDRAMINE"]),
+        )
+
+    def test_a_new_snapshot_or_no_cache_should_recompute(
+        self, mocker, temp_json_file, cross_reference_sample_data, silver_and_gold_paths
+    ):
+        # Given
+        silver_zone_path, gold_zone_path = silver_and_gold_paths
+        temp_json_file(
+            silver_zone_path / "cross_reference_data_test.json",
+            cross_reference_sample_data,
+        )
+        _journal_with_max_drugs(silver_zone_path, gold_zone_path)
+        load = mocker.spy(gold, "load_cross_reference_snapshot")
+        # When
+        _journal_with_max_drugs(silver_zone_path, gold_zone_path, use_cache=False)
+        temp_json_file(
+            silver_zone_path / "cross_reference_data_test.json",
+            [
+                {**row, "journal": "Journal of food protection"}
+                for row in cross_reference_sample_data
+            ],
+            indent=None,
+        )
+        _journal_with_max_drugs(silver_zone_path, gold_zone_path)
+        # Then
+        assert_that(load.call_count, equal_to(2))
+        assert_that(
+            read_result(gold_zone_path, "the_journal_*.json"),
+            equal_to("Journal of food protection"),
+        )
@@ -0,0 +1,146 @@
+import json
+import sys
+import time
+
+import pytest
+from click.testing import CliRunner
+from hamcrest import (
+    assert_that,
+    contains_inanyorder,
+    equal_to,
+)
+
+from servier import (
+    gold,
+    main,
+)
+from servier.cli import cli
+from servier.config import PUBTRIALS_FIELD_NAMES
+from servier.gold import _gold_build
+from servier.main import _main_pipeline
+from servier.run_all import run_all
+
+
+@pytest.fixture
+def landing_zones(tmp_path, temp_csv_file):
+    publications, drugs = tmp_path / "publications", tmp_path / "drugs"
+    publications.mkdir()
+    drugs.mkdir()
+    temp_csv_file(
+        publications / "pubmed.csv",
+        PUBTRIALS_FIELD_NAMES,
+        [
+            {
+                "id": i,
+                "title": f"{'Aspirin' if i % 2 else 'Ibuprofen'} and Ethanol, study {i % 7}",
+                "date": "2020-01-01",
+                "journal": f"Journal {i % 3 + i % 2}",
+            }
+            for i in range(40)
+        ],
+    )
+    temp_csv_file(
+        drugs / "drugs.csv",
+        ["atccode", "drug"],
+        [
+            {"atccode": "A01", "drug": "ASPIRIN"},
+            {"atccode": "A02", "drug": "IBUPROFEN"},
+            {"atccode": "A03", "drug": "ETHANOL"},
+        ],
+    )
+    return publications, drugs
+
+
+def make_zones(root):
+    zones = root / "silver", root / "trash", root / "gold"
+    for zone in zones:
+        zone.mkdir(parents=True)
+    return zones
+
+
+def read_outputs(gold_zone_path):
+    return {
+        file.name: json.loads(file.read_text())
+        for file in gold_zone_path.glob("*.json")
+    }
+
+
+@pytest.mark.parametrize("layout", ["flat", "star"])
+def test_run_all_should_match_main_pipeline_then_gold_build(
+    mocker, tmp_path, landing_zones, layout
+):
+    # Given
+    drugs = ["ASPIRIN", "ethanol"]
+    silver, trash, gold_zone = make_zones(tmp_path / "separate")
+    _main_pipeline(*landing_zones, silver, trash, layout=layout)
+    _gold_build(silver, gold_zone, drugs, use_cache=False)
+    zones = make_zones(tmp_path / "run_all")
+    load = mocker.spy(gold, "load_cross_reference_snapshot")
+    # When
+    results = run_all(*landing_zones, *zones, drugs, layout=layout)
+    # Then: the silver snapshot is not read back
+    assert_that(load.call_count, equal_to(0))
+    assert_that(read_outputs(zones[2]), equal_to(read_outputs(gold_zone)))
+    assert_that(list(results), contains_inanyorder(*read_outputs(gold_zone)))
+    # the silver outputs are those of main-pipeline
+    assert_that(
+        sorted(file.name for file in zones[0].glob("*.json")),
+        equal_to(sorted(file.name for file in silver.glob("*.json"))),
+    )
+
+
+def test_run_all_should_build_from_silver_when_the_landing_did_not_change(
+    mocker, tmp_path, landing_zones
+):
+    # Given
+    silver, trash, gold_zone = make_zones(tmp_path)
+    args = [
+        "run-all",
+        f"--raw-pubclinical-data={landing_zones[0]}",
+        f"--raw-drug-data={landing_zones[1]}",
+        f"--silver-zone-path={silver}",
+        f"--trash-zone-path={trash}",
+        f"--gold-zone-path={gold_zone}",
+        "--drug=IBUPROFEN",
+    ]
+    first = CliRunner().invoke(cli, args)
+    assert first.exit_code == 0, first.output
+    expected = read_outputs(gold_zone)
+    for file in gold_zone.glob("*.json"):
+        file.unlink()
+    load = mocker.spy(gold, "load_cross_reference_snapshot")
+    # When
+    result = CliRunner().invoke(cli, args)
+    # Then
+    assert result.exit_code == 0, result.output
+    assert_that(load.call_count, equal_to(1))
+    assert_that(read_outputs(gold_zone), equal_to(expected))
+    assert_that(
+        result.output.splitlines(),
+        contains_inanyorder(*(str(gold_zone / name) for name in expected)),
+    )
+
+
+def test_run_all_without_numpy_should_write_the_cross_reference_rows(
+    mocker, tmp_path, landing_zones
+):
+    # Given: the gold outputs fall back to the rows, sorting them by journal
+    mocker.patch.dict(sys.modules, {"numpy": None, "servier.utils.columnar": None})
+    silver, trash, gold_zone = make_zones(tmp_path / "separate")
+    _main_pipeline(*landing_zones, silver, trash)
+    zones = make_zones(tmp_path / "run_all")
+    # the silver files are written once the gold outputs are computed
+    save_file_as_json = main.save_file_as_json
+    mocker.patch.object(
+        main,
+        "save_file_as_json",
+        lambda *args: time.sleep(0.2) or save_file_as_json(*args),
+    )
+    # When
+    run_all(*landing_zones, *zones, ["ASPIRIN"])
+    # Then
+    (expected,) = silver.glob("cross_reference_data_*.json")
+    (written,) = zones[0].glob("cross_reference_data_*.json")
+    assert_that(
+        json.loads(written.read_text()), equal_to(json.loads(expected.read_text()))
+    )
@@ -0,0 +1,107 @@
+import pathlib
+
+import pytest
+from click.testing import CliRunner
+from hamcrest import (
+    assert_that,
+    contains_string,
+    equal_to,
+)
+
+from servier.cli import cli
+from servier.config import ROOT_DIR
+from servier.sales_aggregates import (
+    get_watermark,
+    refresh_aggregates,
+)
+
+duckdb = pytest.importorskip("duckdb")
+
+QUERIES = [
+    ("question1.sql", "question1_aggregates.sql"),
+    ("question2.sql", "question2_aggregates.sql"),
+]
+
+
+@pytest.fixture
+def sales_db(tmp_path) -> pathlib.Path:
+    from duckdb_env_setup import generate
+
+    db_path = tmp_path / "sales.duckdb"
+    with duckdb.connect(str(db_path)) as conn:
+        generate(conn, products=50, transactions=5000, clients=20)
+    return db_path
+
+
+def assert_aggregates_match_base_queries(conn):
+    for base_query, aggregate_query in QUERIES:
+        expected = conn.sql((ROOT_DIR / base_query).read_text()).fetchall()
+        result = conn.sql((ROOT_DIR / aggregate_query).read_text()).fetchall()
+        assert_that(result, equal_to(expected))
+
+
+class TestRefreshAggregates:
+    def test_refresh_aggregates_should_answer_the_sales_questions(self, sales_db):
+        with duckdb.connect(str(sales_db)) as conn:
+            # When
+            count = refresh_aggregates(conn)
+            # Then
+            assert_that(count, equal_to(5000))
+            assert_that(get_watermark(conn), equal_to(5000))
+            assert_aggregates_match_base_queries(conn)
+
+    def test_refresh_aggregates_should_only_fold_new_transactions(self, sales_db):
+        with duckdb.connect(str(sales_db)) as conn:
+            # Given
+            refresh_aggregates(conn)
+            conn.execute(
+                """
+                INSERT INTO TRANSACTIONS
+                SELECT date, order_id + 5000, client_id, prod_id, prod_price, prod_qty
+                FROM TRANSACTIONS WHERE order_id <= 1000
+                """
+            )
+            # When
+            counts = [refresh_aggregates(conn), refresh_aggregates(conn)]
+            # Then
+            assert_that(counts, equal_to([1000, 0]))
+            assert_that(get_watermark(conn), equal_to(6000))
+            assert_aggregates_match_base_queries(conn)
+
+    @pytest.mark.parametrize("transactions", [5000, 3000])
+    def test_regenerated_transactions_should_be_aggregated_again(
+        self, sales_db, transactions
+    ):
+        from duckdb_env_setup import generate
+
+        with duckdb.connect(str(sales_db)) as conn:
+            # Given
+            refresh_aggregates(conn)
+            generate(conn, products=50, transactions=transactions, clients=20, seed=2)
+            # When
+            count = refresh_aggregates(conn)
+            # Then
+            assert_that(count, equal_to(transactions))
+            assert_aggregates_match_base_queries(conn)
+
+    def test_refresh_aggregates_should_rebuild_above_the_last_order_id(self, sales_db):
+        with duckdb.connect(str(sales_db)) as conn:
+            # Given
+            refresh_aggregates(conn)
+            conn.execute("DELETE FROM TRANSACTIONS WHERE order_id > 3000")
+            # When
+            count = refresh_aggregates(conn)
+            # Then
+            assert_that(count, equal_to(3000))
+            assert_that(get_watermark(conn), equal_to(3000))
+            assert_aggregates_match_base_queries(conn)
+
+
+def test_refresh_sales_aggregates_command(sales_db):
+    # When
+    result = CliRunner().invoke(
+        cli, ["refresh-sales-aggregates", f"--db-path={sales_db}"]
+    )
+    # Then
+    assert result.exit_code == 0, result.output
+    assert_that(result.output, contains_string("5,000 new transactions"))
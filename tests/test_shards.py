@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from hamcrest import (
+    assert_that,
+    contains_exactly,
+    equal_to,
+    has_length,
+)
+
+from servier.config import (
+    PUBTRIALS_FIELD_NAMES,
+    SHARDS_DIR,
+)
+from servier.main import _main_pipeline
+from servier.shards import (
+    merge_shard_rows,
+    merge_silver,
+)
+from servier.utils.helpers import find_silver_files
+
+
+@pytest.fixture
+def landing_zones(tmp_path, temp_csv_file):
+    publications, drugs = tmp_path / "publications", tmp_path / "drugs"
+    publications.mkdir()
+    drugs.mkdir()
+    temp_csv_file(
+        publications / "pubmed.csv",
+        PUBTRIALS_FIELD_NAMES,
+        [
+            {
+                "id": i,
+                "title": f"{'Aspirin' if i % 2 else 'Ibuprofen'} and Ethanol, study {i % 7}",
+                "date": "2020-01-01",
+                "journal": f"Journal {i % 3}",
+            }
+            for i in range(40)
+        ],
+    )
+    temp_csv_file(
+        drugs / "drugs.csv",
+        ["atccode", "drug"],
+        [
+            {"atccode": "A01", "drug": "ASPIRIN"},
+            {"atccode": "A02", "drug": "IBUPROFEN"},
+            {"atccode": "A03", "drug": "ETHANOL"},
+        ],
+    )
+    return publications, drugs
+
+
+def load_snapshot(silver, dataset):
+    rows = json.loads(find_silver_files(silver, dataset)[-1].read_text())
+    return sorted(
+        json.dumps({k: v for k, v in row.items() if k != "ingestion_timestamp"})
+        for row in rows
+    )
+
+
+@pytest.mark.parametrize(
+    "layout, datasets",
+    [
+        ("flat", ["pubclinical_data", "drugs_data", "cross_reference_data"]),
+        ("star", ["publication_dim", "drug_dim", "mention_fact"]),
+    ],
+)
+def test_merged_shards_should_match_an_unsharded_run(
+    tmp_path, landing_zones, layout, datasets
+):
+    # Given
+    zones = {}
+    for name in ("unsharded", "sharded"):
+        zones[name] = tmp_path / name / "silver", tmp_path / name / "trash"
+        for zone in zones[name]:
+            zone.mkdir(parents=True)
+    _main_pipeline(*landing_zones, *zones["unsharded"], layout=layout)
+    # When
+    for index in range(3):
+        _main_pipeline(
+            *landing_zones, *zones["sharded"], layout=layout, shard=(index, 3)
+        )
+    silver = zones["sharded"][0]
+    # the gold commands do not see the shards before the merge
+    assert_that(list(silver.glob("*.json")), has_length(0))
+    entry = merge_silver(silver)
+    # Then
+    for dataset in datasets:
+        assert_that(
+            load_snapshot(silver, dataset),
+            equal_to(load_snapshot(zones["unsharded"][0], dataset)),
+        )
+    drugs = entry["datasets"][datasets[1]]
+    assert_that(drugs["rows"], equal_to(3))
+    assert_that(drugs["duplicates"], equal_to(6))
+    catalog = json.loads((silver / SHARDS_DIR / "catalog.json").read_text())
+    assert_that(list(catalog.values()), contains_exactly(entry))
+
+
+def test_merge_silver_should_refuse_missing_shards(tmp_path, landing_zones):
+    # Given
+    silver, trash = tmp_path / "silver", tmp_path / "trash"
+    silver.mkdir()
+    trash.mkdir()
+    _main_pipeline(*landing_zones, silver, trash, shard=(1, 2))
+    # When / Then
+    with pytest.raises(ValueError, match=r"Missing shards \[0\]"):
+        merge_silver(silver)
+
+
+def test_merge_shard_rows_should_only_drop_rows_of_other_shards():
+    drug = {"atccode": "A01", "drug": "ASPIRIN"}
+    rows, duplicates = merge_shard_rows("drugs_data", [[drug, drug], [drug]])
+    assert_that(rows, equal_to([drug, drug]))
+    assert_that(duplicates, equal_to(1))
+    rows, duplicates = merge_shard_rows("cross_reference_data", [[drug], [drug]])
+    assert_that(rows, equal_to([drug, drug]))
+    assert_that(duplicates, equal_to(0))
@@ -0,0 +1,87 @@
+import datetime
+import json
+
+import pytest
+from click.testing import CliRunner
+from hamcrest import (
+    assert_that,
+    calling,
+    contains_string,
+    equal_to,
+    has_entries,
+    has_length,
+    raises,
+)
+
+from servier.cli import cli
+from servier.config import SQL_QUERIES
+from servier.sql_benchmark import (
+    percentile,
+    render_query,
+)
+
+
+class TestRenderQuery:
+    def test_render_query_should_replace_the_date_range(self):
+        # Given
+        sql = SQL_QUERIES[0].read_text()
+        # When
+        rendered = render_query(
+            sql, datetime.date(2020, 3, 1), datetime.date(2020, 3, 31)
+        )
+        # Then
+        assert_that(rendered, contains_string("BETWEEN '2020-03-01' AND '2020-03-31'"))
+
+    def test_render_query_should_raise_value_error_without_date_range(self):
+        assert_that(
+            calling(render_query).with_args(
+                "SELECT 1", datetime.date(2020, 3, 1), datetime.date(2020, 3, 31)
+            ),
+            raises(ValueError),
+        )
+
+
+def test_percentile_should_use_nearest_rank():
+    values = [5.0, 1.0, 4.0, 2.0, 3.0]
+    assert_that(
+        [percentile(values, q) for q in (0, 50, 90, 100)],
+        equal_to([1.0, 3.0, 5.0, 5.0]),
+    )
+
+
+def test_sql_benchmark_command_should_write_report_and_profiles(tmp_path):
+    # Given
+    duckdb = pytest.importorskip("duckdb")
+    from duckdb_env_setup import generate
+
+    db_path = tmp_path / "sales_10k.duckdb"
+    with duckdb.connect(str(db_path)) as conn:
+        generate(conn, products=50, transactions=10_000)
+    output = tmp_path / "report.json"
+
+    # When
+    result = CliRunner().invoke(
+        cli,
+        [
+            "sql-benchmark",
+            f"--db-path={db_path}",
+            f"--output={output}",
+            "--repeat=2",
+            "--start-date=2019-01-01",
+            "--end-date=2019-01-31",
+        ],
+    )
+
+    # Then
+    assert result.exit_code == 0, result.output
+    report = json.loads(output.read_text())
+    assert_that(report["results"], has_length(2))
+    assert_that(
+        report["results"][0],
+        has_entries(
+            scale="sales_10k", transactions=10_000, query="question1", rows_returned=31
+        ),
+    )
+    for result in report["results"]:
+        with open(result["profile"]) as f:
+            assert_that(f.read(), contains_string("Total Time"))
@@ -0,0 +1,167 @@
+import json
+import sqlite3
+
+from hamcrest import (
+    assert_that,
+    equal_to,
+    has_length,
+)
+
+from servier.main import (
+    curate_pubclinical_data,
+    validate_rows,
+)
+from servier.models import (
+    Drug,
+    PubClinical,
+)
+from servier.utils.validation_cache import (
+    SQLITE_MAX_VARIABLES,
+    ValidationCache,
+    decode_record,
+    encode_record,
+)
+
+ROWS = [
+    {
+        "title": f"Aspirin study \\xc3\\xa9 {i}",
+        "date": "1 January 2020",
+        "journal": "Journal",
+        "source_file": "pubmed",
+        "source_file_type": "csv",
+    }
+    for i in range(5)
+] + [
+    {
+        "title": "",
+        "date": "2020-01-01",
+        "journal": "Journal",
+        "source_file": "pubmed",
+        "source_file_type": "csv",
+    }
+]
+
+
+class TestValidationCache:
+    def test_cached_outcomes_should_equal_validation(self, tmp_path):
+        # Given
+        cache = tmp_path / "validation_cache.sqlite"
+        expected, expected_rejects = validate_rows(ROWS, PubClinical, "Pubtrials")
+        validate_rows(ROWS, PubClinical, "Pubtrials", cache=cache)
+
+        # When
+        with ValidationCache(cache) as validation_cache:
+            outcomes = list(validation_cache.validate(ROWS, PubClinical))
+
+        # Then
+        assert_that(validation_cache.hits, equal_to(6))
+        assert_that(
+            [record for _, record, error in outcomes if error is None],
+            equal_to(expected),
+        )
+        _, rejects = validate_rows(ROWS, PubClinical, "Pubtrials", cache=cache)
+        assert_that(rejects.counters, equal_to(expected_rejects.counters))
+        assert_that(list(rejects), equal_to(list(expected_rejects)))
+
+    def test_cached_payloads_should_be_json(self, tmp_path):
+        # Given
+        cache = tmp_path / "validation_cache.sqlite"
+        validate_rows(ROWS, PubClinical, "Pubtrials", cache=cache)
+
+        # When
+        with sqlite3.connect(cache) as conn:
+            payloads = [
+                payload for (payload,) in conn.execute("SELECT payload FROM entries")
+            ]
+
+        # Then
+        assert_that(payloads, has_length(6))
+        for payload in payloads:
+            assert_that(isinstance(json.loads(payload), dict), equal_to(True))
+
+    def test_decoded_records_should_equal_validated_ones(self):
+        # Given
+        records = [
+            PubClinical(**ROWS[0]),
+            Drug(atccode="A01", drug="ASPIRIN"),
+            Drug(atccode="A01", drug="ASPIRIN", source_file="drugs.json"),
+        ]
+
+        # When
+        decoded = [
+            decode_record(encode_record(record), type(record)) for record in records
+        ]
+
+        # Then
+        assert_that(decoded, equal_to(records))
+        assert_that(
+            [record.model_fields_set for record in decoded],
+            equal_to([record.model_fields_set for record in records]),
+        )
+        assert_that(type(decoded[0].date), equal_to(type(records[0].date)))
+
+    def test_batches_should_fit_the_sqlite_variable_limit(self, tmp_path):
+        # Given
+        cache = tmp_path / "validation_cache.sqlite"
+        rows = [
+            dict(ROWS[0], title=f"Study {i}") for i in range(SQLITE_MAX_VARIABLES + 5)
+        ]
+
+        # When
+        with ValidationCache(cache, batch_size=5000) as validation_cache:
+            outcomes = list(validation_cache.validate(rows, PubClinical))
+
+        # Then
+        assert_that(validation_cache.batch_size, equal_to(SQLITE_MAX_VARIABLES - 1))
+        assert_that(outcomes, has_length(len(rows)))
+        assert_that(validation_cache, has_length(len(rows)))
+
+    def test_model_changes_should_clear_the_cache(self, tmp_path, mocker):
+        # Given
+        cache = tmp_path / "validation_cache.sqlite"
+        validate_rows(ROWS, PubClinical, "Pubtrials", cache=cache)
+        mocker.patch(
+            "servier.utils.validation_cache.models_version", return_value="changed"
+        )
+
+        # When
+        with ValidationCache(cache) as validation_cache:
+            list(validation_cache.validate(ROWS, PubClinical))
+
+        # Then
+        assert_that(validation_cache.hits, equal_to(0))
+        assert_that(validation_cache.misses, equal_to(6))
+
+    def test_cache_should_evict_the_least_recently_used_entries(self, tmp_path):
+        # Given
+        cache = tmp_path / "validation_cache.sqlite"
+        with ValidationCache(cache, max_entries=5, batch_size=2) as validation_cache:
+            # When
+            list(validation_cache.validate(ROWS, PubClinical))
+            # Then: 6 entries > 5, evicted down to 90% of 5, i.e. the first batch
+            assert_that(validation_cache, has_length(4))
+        with ValidationCache(cache, max_entries=5) as validation_cache:
+            list(validation_cache.validate(ROWS[2:], PubClinical))
+            assert_that(validation_cache.hits, equal_to(4))
+            list(validation_cache.validate(ROWS[:2], PubClinical))
+            assert_that(validation_cache.misses, equal_to(2))
+
+    def test_curate_with_workers_should_share_the_cache(self, tmp_path, temp_json_file):
+        # Given
+        cache = tmp_path / "validation_cache.sqlite"
+        files = [
+            temp_json_file(f"pubmed_part-{shard:05d}.json", ROWS[shard::2])
+            for shard in range(2)
+        ]
+        expected = curate_pubclinical_data(files)
+
+        # When
+        first = curate_pubclinical_data(files, workers=2, cache=cache)
+        second = curate_pubclinical_data(files, workers=2, cache=cache)
+
+        # Then
+        for result in (first, second):
+            assert_that(result[0], equal_to(expected[0]))
+            assert_that(list(result[1]), equal_to(list(expected[1])))
+        with ValidationCache(cache) as validation_cache:
+            assert_that(validation_cache, has_length(6))
@@ -0,0 +1,168 @@
+import json
+
+import pytest
+from hamcrest import (
+    assert_that,
+    equal_to,
+    has_length,
+)
+
+from servier import watch
+from servier.config import PUBTRIALS_FIELD_NAMES
+from servier.utils.helpers import find_silver_files
+from servier.watch import LandingZoneWatcher
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def zones(tmp_path):
+    paths = {
+        name: tmp_path / name
+        for name in ("publications", "drugs", "silver", "trash", "gold")
+    }
+    for path in paths.values():
+        path.mkdir()
+    return paths
+
+
+def publication_rows(drug, count):
+    return [
+        {
+            "id": i,
+            "title": f"{drug} study {i}",
+            "date": "2020-01-01",
+            "journal": f"Journal of {drug.lower()}",
+        }
+        for i in range(count)
+    ]
+
+
+def drug_rows(*drugs):
+    return [{"atccode": f"A{i:02d}", "drug": drug} for i, drug in enumerate(drugs)]
+
+
+def cross_reference(zones):
+    return json.loads(
+        find_silver_files(zones["silver"], "cross_reference_data")[-1].read_text()
+    )
+
+
+def make_watcher(zones, clock):
+    return LandingZoneWatcher(
+        zones["publications"],
+        zones["drugs"],
+        zones["silver"],
+        zones["trash"],
+        zones["gold"],
+        gold_drugs=["aspirin"],
+        debounce=2.0,
+        clock=clock,
+    )
+
+
+def test_watcher_should_only_ingest_new_files_once_stable(mocker, zones, temp_csv_file):
+    # Given
+    clock = Clock()
+    temp_csv_file(
+        zones["drugs"] / "drugs.csv", ["atccode", "drug"], drug_rows("ASPIRIN")
+    )
+    temp_csv_file(
+        zones["publications"] / "pubmed.csv",
+        PUBTRIALS_FIELD_NAMES,
+        publication_rows("Aspirin", 3),
+    )
+    watcher = make_watcher(zones, clock)
+    curate = mocker.spy(watch, "curate_pubclinical_data")
+    # When / Then: the files are not stable yet
+    assert_that(watcher.poll(), equal_to(False))
+    clock.now = 2.0
+    assert_that(watcher.poll(), equal_to(True))
+    assert_that(cross_reference(zones), has_length(3))
+    assert_that(
+        json.loads(next(zones["gold"].glob("the_journal_*.json")).read_text()),
+        equal_to("Journal of aspirin"),
+    )
+    assert_that(
+        list(zones["gold"].glob("drugs_by_journals_by_aspirin_*.json")), has_length(1)
+    )
+    # a new shard is appended, the first file is not ingested again
+    temp_csv_file(
+        zones["publications"] / "pubmed_part-00002.csv",
+        PUBTRIALS_FIELD_NAMES,
+        publication_rows("Aspirin", 2),
+    )
+    assert_that(watcher.poll(), equal_to(False))
+    clock.now = 4.0
+    assert_that(watcher.poll(), equal_to(True))
+    assert_that(cross_reference(zones), has_length(5))
+    assert_that(
+        [call.args[0][0].name for call in curate.call_args_list],
+        equal_to(["pubmed.csv", "pubmed_part-00002.csv"]),
+    )
+    clock.now = 6.0
+    assert_that(watcher.poll(), equal_to(False))
+
+
+def test_watcher_should_match_again_when_the_drugs_change(zones, temp_csv_file):
+    # Given
+    clock = Clock()
+    temp_csv_file(
+        zones["drugs"] / "drugs.csv", ["atccode", "drug"], drug_rows("ASPIRIN")
+    )
+    temp_csv_file(
+        zones["publications"] / "pubmed.csv",
+        PUBTRIALS_FIELD_NAMES,
+        publication_rows("Aspirin", 2) + publication_rows("Ethanol", 3),
+    )
+    watcher = make_watcher(zones, clock)
+    watcher.poll()
+    clock.now = 2.0
+    watcher.poll()
+    assert_that(cross_reference(zones), has_length(2))
+    # When
+    temp_csv_file(
+        zones["drugs"] / "drugs.csv",
+        ["atccode", "drug"],
+        drug_rows("ASPIRIN", "ETHANOL"),
+    )
+    watcher.poll()
+    clock.now = 4.0
+    watcher.poll()
+    # Then
+    assert_that(cross_reference(zones), has_length(5))
+
+
+def test_restarted_watcher_should_not_ingest_processed_files_again(
+    mocker, zones, temp_csv_file
+):
+    # Given
+    clock = Clock()
+    temp_csv_file(
+        zones["drugs"] / "drugs.csv", ["atccode", "drug"], drug_rows("ASPIRIN")
+    )
+    temp_csv_file(
+        zones["publications"] / "pubmed.csv",
+        PUBTRIALS_FIELD_NAMES,
+        publication_rows("Aspirin", 3),
+    )
+    watcher = make_watcher(zones, clock)
+    watcher.poll()
+    clock.now = 2.0
+    watcher.poll()
+    # When
+    restarted = make_watcher(zones, clock)
+    curate = mocker.spy(watch, "curate_pubclinical_data")
+    restarted.poll()
+    clock.now = 4.0
+    # Then
+    assert_that(restarted.poll(), equal_to(False))
+    assert_that(curate.call_count, equal_to(0))
+    assert_that(restarted.files, has_length(1))
+    assert_that(next(iter(restarted.files.values())).cross_reference, has_length(3))